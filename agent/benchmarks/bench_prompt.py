@@ -0,0 +1,140 @@
+"""Microbenchmark: verbose vs compact opportunity encoding in recommendation prompts."""
+
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+from loguru import logger
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.yield_opportunity import YieldOpportunity
+from src.data.risk_scorer import RiskScorer
+from src.data.snapshot import OpportunitySnapshot
+from src.agent.gemini_client import GeminiClient
+from src.agent.prompt_encoding import encode_opportunities, estimate_tokens
+from src.agent.recommendation_engine import RecommendationEngine
+
+CANDIDATE_COUNTS = [20, 50, 100]
+# Previous prompts sent 20 verbose candidates; that size is the latency envelope
+ENVELOPE_CANDIDATES = 20
+
+
+def make_pools(n: int, seed: int = 0):
+    """Generate scored synthetic pools with realistic pool ids."""
+    rng = random.Random(seed)
+    pools = []
+    for i in range(n):
+        stellar = rng.random() < 0.3
+        pools.append(YieldOpportunity(
+            chain="Stellar" if stellar else rng.choice(["Ethereum", "Arbitrum", "Base"]),
+            project="Stellar DEX" if stellar else f"proj{i % 300}",
+            symbol=rng.choice(["USDC", "XLM/USDC", "WETH-USDC", "DAI"]),
+            pool=f"{rng.getrandbits(256):064x}" if stellar else str(uuid.UUID(int=rng.getrandbits(128))),
+            tvlUsd=rng.uniform(1e5, 1e9),
+            apy=rng.uniform(0, 60),
+            apyBase=rng.uniform(0, 30),
+            apyReward=rng.choice([None, rng.uniform(0, 30)]),
+            apyPct7D=rng.choice([None, rng.uniform(-10, 10)]),
+            stablecoin=rng.choice([True, False]),
+            ilRisk=rng.choice(["yes", "no"]),
+            exposure=rng.choice(["single", "multi"]),
+            predictedClass=rng.choice(["Stable/Up", "Down", None]),
+            predictedProbability=rng.choice([None, rng.randint(50, 99)]),
+        ))
+    RiskScorer.apply_scores(pools)
+    return pools
+
+
+def verbose_format(opportunities):
+    """Previous implementation: a ten-line prose block per pool."""
+    formatted = []
+    for i, opp in enumerate(opportunities, 1):
+        pool_id = opp.pool or f"{opp.project}-{opp.symbol}"
+        formatted.append(f"""
+{i}. {opp.project} - {opp.symbol} ({opp.chain})
+   - Pool ID: {pool_id}
+   - APY: {opp.apy:.2f}% (Base: {opp.apy_base or 0:.2f}%, Reward: {opp.apy_reward or 0:.2f}%)
+   - TVL: ${opp.tvl_usd:,.0f} USD
+   - Risk Tier: {opp.risk_tier.value if opp.risk_tier else 'N/A'} (Score: {opp.risk_score:.2f})
+   - Stablecoin: {opp.stablecoin}
+   - IL Risk: {opp.il_risk}
+   - Exposure: {opp.exposure}
+   - Prediction: {opp.predicted_class} ({opp.predicted_probability}% confidence)
+   - Volatility: {abs(opp.apy_pct_7d or 0):.2f}% (7d change)
+""".strip())
+    return "\n\n".join(formatted)
+
+
+class CapturingModel:
+    """Stand-in for the Gemini model that records prompts and allocates nothing."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return type("Response", (), {"text": json.dumps({"allocations": []})})()
+
+
+async def prompt_rows_end_to_end(pools, token_budget: int):
+    """Rows in the prompt an "ai" recommendation actually sends, and its token count."""
+    logger.disable("src")
+    engine = RecommendationEngine(gemini_api_key="bench")
+    engine.gemini = GeminiClient(api_key="bench", prompt_token_budget=token_budget)
+    engine.gemini.model = model = CapturingModel()
+
+    async def build(version):
+        return OpportunitySnapshot.build(version, {"defillama": pools})
+
+    engine.snapshots._build = build
+    try:
+        await engine.recommend(amount_usd=10000, risk_tolerance="high", mode="ai")
+    finally:
+        await engine.close()
+    [prompt] = model.prompts
+    return len(re.findall(r"^\d+,", prompt, re.MULTILINE)), estimate_tokens(prompt)
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """Best wall time of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    """Run the benchmark and print the results."""
+    pools = make_pools(max(CANDIDATE_COUNTS))
+
+    print(f"{'candidates':>10} {'verbose':>9} {'compact':>9} {'ratio':>6} {'encode':>8}")
+    for count in CANDIDATE_COUNTS:
+        candidates = pools[:count]
+        verbose = estimate_tokens(verbose_format(candidates))
+        compact = estimate_tokens(encode_opportunities(candidates)[0])
+        t_encode = best_of(lambda: encode_opportunities(candidates))
+        print(
+            f"{count:>10} {verbose:>7}tk {compact:>7}tk {verbose / compact:>5.1f}x "
+            f"{t_encode:>6.2f}ms"
+        )
+
+    # End to end: a recommendation whose table budget is the old 20-row table
+    envelope = estimate_tokens(verbose_format(pools[:ENVELOPE_CANDIDATES]))
+    sent, prompt_tokens = asyncio.run(prompt_rows_end_to_end(make_pools(300), envelope))
+    print(
+        f"\nSame budget as {ENVELOPE_CANDIDATES} verbose candidates (~{envelope} tokens): "
+        f"recommend(mode=\"ai\") sent {sent} candidates ({sent / ENVELOPE_CANDIDATES:.1f}x) "
+        f"in a ~{prompt_tokens} token prompt"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Microbenchmark: full sort vs top-k selection for opportunity ranking."""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.yield_opportunity import YieldOpportunity, RiskTier
+from src.data.opportunity_table import OpportunityTable
+from src.data.risk_scorer import RiskScorer
+
+CANDIDATES = 20_000
+TOP_K = 20
+STRATEGIES = ["risk_adjusted", "max_yield", "min_risk", "sharpe"]
+RISK_ORDER = {RiskTier.A: 0, RiskTier.B: 1, RiskTier.C: 2, RiskTier.D: 3}
+
+
+def make_pools(n: int, seed: int = 0):
+    """Generate scored synthetic pools."""
+    rng = random.Random(seed)
+    pools = [
+        YieldOpportunity(
+            chain=rng.choice(["Ethereum", "Stellar", "Arbitrum", "Base"]),
+            project=f"proj{i % 300}",
+            symbol="USDC",
+            pool=f"pool-{i}",
+            tvlUsd=rng.uniform(1e4, 1e8),
+            apy=round(rng.uniform(0, 60), 2),
+            apyPct7D=rng.choice([None, round(rng.uniform(-10, 10), 2)]),
+            stablecoin=rng.choice([True, False]),
+            ilRisk=rng.choice(["yes", "no"]),
+        )
+        for i in range(n)
+    ]
+    RiskScorer.apply_scores(pools)
+    return pools
+
+
+def sorted_ranking(pools, strategy):
+    """Previous implementation: sorted() with per-element key closures."""
+    if strategy == "max_yield":
+        return sorted(pools, key=lambda x: x.apy or 0, reverse=True)
+    if strategy == "min_risk":
+        return sorted(pools, key=lambda x: (RISK_ORDER.get(x.risk_tier, 4), -(x.apy or 0)))
+    if strategy == "sharpe":
+        def sharpe_score(opp):
+            volatility = abs(opp.apy_pct_7d or 1) if opp.apy_pct_7d else 1
+            return (opp.apy or 0) / max(volatility, 0.1)
+        return sorted(pools, key=sharpe_score, reverse=True)
+    return sorted(
+        pools,
+        key=lambda x: ((x.apy or 0) * 0.7) + ((x.risk_score or 0) * 3 * 0.3),
+        reverse=True
+    )
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """Best wall time of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    """Run the benchmark and print a table."""
+    pools = make_pools(CANDIDATES)
+    table = OpportunityTable.from_opportunities(pools)
+    table.precompute_rank_keys()
+
+    print(f"{CANDIDATES} candidates, top {TOP_K}")
+    print(f"{'strategy':>14} {'sorted()':>10} {'argsort':>9} {'top_k':>9} {'speedup':>8}")
+
+    for strategy in STRATEGIES:
+        expected = [p.pool for p in sorted_ranking(pools, strategy)[:TOP_K]]
+        assert [p.pool for p in table.materialize(table.top_k(TOP_K, strategy))] == expected
+
+        t_sorted = best_of(lambda: sorted_ranking(pools, strategy)[:TOP_K])
+        t_argsort = best_of(lambda: table.rank_order(strategy)[:TOP_K])
+        t_top_k = best_of(lambda: table.top_k(TOP_K, strategy))
+
+        print(
+            f"{strategy:>14} {t_sorted:>8.2f}ms {t_argsort:>7.2f}ms "
+            f"{t_top_k:>7.2f}ms {t_sorted / t_top_k:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Microbenchmark: scalar vs batch risk scoring."""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.models.yield_opportunity import YieldOpportunity
+from src.data.opportunity_table import Categorical
+from src.data.risk_scorer import RiskScorer
+
+SIZES = [1_000, 20_000, 200_000]
+
+
+def make_pools(n: int, seed: int = 0):
+    """Generate synthetic pools with a realistic mix of missing fields."""
+    rng = random.Random(seed)
+    return [
+        YieldOpportunity(
+            chain="Ethereum",
+            project=f"proj{i % 300}",
+            symbol="USDC",
+            pool=f"pool-{i}",
+            tvlUsd=rng.uniform(1e4, 1e8),
+            apy=rng.choice([None, rng.uniform(0, 60)]),
+            apyPct7D=rng.choice([None, rng.uniform(-10, 10)]),
+            apyMean30d=rng.choice([None, rng.uniform(0, 60)]),
+            stablecoin=rng.choice([None, True, False]),
+            ilRisk=rng.choice([None, "yes", "no"]),
+            exposure=rng.choice([None, "single", "multi"]),
+            predictedClass=rng.choice([None, "Stable/Up", "Down"]),
+            predictedProbability=rng.choice([None, rng.uniform(0, 100)]),
+        )
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    """Best wall time of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    """Run the benchmark and print a table."""
+    print(f"{'pools':>8} {'scalar x2':>11} {'scalar':>9} {'batch':>9} {'kernel':>9} {'speedup':>8}")
+
+    for n in SIZES:
+        pools = make_pools(n)
+
+        def scalar_twice():
+            # Previous ingest path: score, then score again inside classify
+            for pool in pools:
+                RiskScorer.calculate_risk_score(pool)
+                RiskScorer.classify_risk_tier(pool)
+
+        def scalar_once():
+            for pool in pools:
+                RiskScorer.tier_for_score(RiskScorer.calculate_risk_score(pool))
+
+        # Column extraction from models is included in "batch"; "kernel"
+        # is the vectorized pass alone over already-columnar data
+        def floats(attr):
+            return np.array(
+                [getattr(p, attr) if getattr(p, attr) is not None else np.nan for p in pools]
+            )
+
+        columns = dict(
+            apy=floats("apy"),
+            apy_pct_7d=floats("apy_pct_7d"),
+            apy_mean_30d=floats("apy_mean_30d"),
+            predicted_class=Categorical.encode(p.predicted_class for p in pools),
+            predicted_probability=floats("predicted_probability"),
+            il_risk=Categorical.encode(p.il_risk for p in pools),
+            exposure=Categorical.encode(p.exposure for p in pools),
+            stablecoin=np.array([bool(p.stablecoin) for p in pools]),
+        )
+
+        t_twice = best_of(scalar_twice, repeat=1 if n >= 200_000 else 3)
+        t_once = best_of(scalar_once, repeat=1 if n >= 200_000 else 3)
+        t_batch = best_of(lambda: RiskScorer.score_opportunities(pools))
+        t_kernel = best_of(lambda: RiskScorer.score_batch(**columns))
+
+        print(
+            f"{n:>8} {t_twice:>9.1f}ms {t_once:>7.1f}ms {t_batch:>7.1f}ms "
+            f"{t_kernel:>7.1f}ms {t_twice / t_batch:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
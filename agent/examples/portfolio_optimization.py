@@ -32,15 +32,19 @@ async def compare_risk_profiles(amount: float = 10000):
     
     async with RecommendationEngine() as engine:
         
-        for risk in risk_profiles:
-            print(f"🔍 Analyzing {risk.upper()} risk profile...")
-            
-            response = await engine.recommend(
-                amount_usd=amount,
-                risk_tolerance=risk,
-                preferred_chains=["Stellar", "Ethereum"],
-                max_opportunities=20
-            )
+        # One snapshot and one filter/rank pass per tier for all profiles
+        responses = await engine.recommend_batch([
+            {
+                "amount_usd": amount,
+                "risk_tolerance": risk,
+                "preferred_chains": ["Stellar", "Ethereum"],
+                "max_opportunities": 20,
+            }
+            for risk in risk_profiles
+        ])
+        
+        for risk, response in zip(risk_profiles, responses):
+            print(f"🔍 {risk.upper()} risk profile")
             
             if response.success:
                 results[risk] = response.recommendation
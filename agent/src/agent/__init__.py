@@ -1,9 +1,19 @@
 """AI agent modules."""
 
+from .allocation_resolver import AllocationMatch, AllocationResolver
 from .gemini_client import GeminiClient
+from .portfolio_optimizer import OptimizedPortfolio, PortfolioOptimizer, describe_portfolio
+from .prompt_encoding import encode_opportunities, estimate_tokens
 from .recommendation_engine import RecommendationEngine
 
 __all__ = [
+    "AllocationMatch",
+    "AllocationResolver",
     "GeminiClient",
+    "OptimizedPortfolio",
+    "PortfolioOptimizer",
+    "describe_portfolio",
+    "encode_opportunities",
+    "estimate_tokens",
     "RecommendationEngine",
 ]
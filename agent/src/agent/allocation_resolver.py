@@ -0,0 +1,218 @@
+"""Match allocations returned by the model to known opportunities."""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ..models.yield_opportunity import YieldOpportunity
+
+# Confidence of each match method (fuzzy matches scale by similarity)
+EXACT_ID_CONFIDENCE = 1.0
+PROJECT_SYMBOL_CONFIDENCE = 0.9
+TOKENS_CONFIDENCE = 0.8
+PROJECT_ONLY_CONFIDENCE = 0.6
+FUZZY_CONFIDENCE = 0.7
+# Ties broken by neither chain nor shortlist
+AMBIGUITY_PENALTY = 0.8
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class AllocationMatch:
+    """An opportunity matched to an allocation, with how it was matched."""
+
+    opportunity: YieldOpportunity
+    confidence: float
+    method: str
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase and collapse punctuation to single spaces ("Aave-V3" -> "aave v3")."""
+    return _NON_ALNUM.sub(" ", (text or "").lower()).strip()
+
+
+def tokens(*texts: Optional[str]) -> FrozenSet[str]:
+    """Set of normalized words across texts, ignoring order."""
+    return frozenset(word for text in texts for word in normalize(text).split())
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Character trigrams of a normalized string, padded at word boundaries."""
+    padded = f" {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class AllocationResolver:
+    """Resolve model allocations to opportunities through precompiled indexes.
+
+    Built over the opportunities the model was offered (which already
+    satisfy the request's filters), so no match can be a look-alike pool
+    the request excluded. An allocation is matched, in order, by exact
+    pool id, by normalized (project, symbol), by the set of words in
+    project and symbol (so "WETH-USDC" matches "USDC-WETH"), by project
+    alone when exactly one shortlisted pool has it, and finally by
+    trigram similarity. Every step is a hash lookup or a bounded scan,
+    so resolving an allocation takes O(1) expected time.
+
+    Keys shared by several pools (the same pair on many chains) are
+    narrowed by the allocation's chain, then by the shortlist the model
+    was shown; remaining ties go to the highest-TVL pool at reduced
+    confidence.
+    """
+
+    def __init__(
+        self,
+        opportunities: Iterable[YieldOpportunity],
+        min_similarity: float = 0.5,
+        max_posting: int = 256,
+        max_candidates: int = 32
+    ):
+        """
+        Build the indexes.
+
+        Args:
+            opportunities: Opportunities to match against
+            min_similarity: Minimum trigram similarity (Dice) of a fuzzy match
+            max_posting: Trigrams shared by more keys than this are too
+                common to narrow the search and are skipped
+            max_candidates: Keys scored exactly per fuzzy lookup
+        """
+        self.min_similarity = min_similarity
+        self.max_posting = max_posting
+        self.max_candidates = max_candidates
+
+        ranked = sorted(opportunities, key=lambda opp: -(opp.tvl_usd or 0.0))
+        self._by_id: Dict[str, YieldOpportunity] = {}
+        self._by_project_symbol: Dict[Tuple[str, str], List[YieldOpportunity]] = {}
+        self._by_tokens: Dict[FrozenSet[str], List[YieldOpportunity]] = {}
+        # Fuzzy index over distinct "project symbol" strings
+        key_positions: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._key_trigrams: List[FrozenSet[str]] = []
+        self._key_opportunities: List[List[YieldOpportunity]] = []
+        self._postings: Dict[str, List[int]] = {}
+
+        for opp in ranked:
+            if opp.pool:
+                self._by_id.setdefault(opp.pool, opp)
+            project, symbol = normalize(opp.project), normalize(opp.symbol)
+            self._by_project_symbol.setdefault((project, symbol), []).append(opp)
+            self._by_tokens.setdefault(tokens(opp.project, opp.symbol), []).append(opp)
+
+            key = f"{project} {symbol}"
+            position = key_positions.get(key)
+            if position is None:
+                position = key_positions[key] = len(self._keys)
+                grams = trigrams(key)
+                self._keys.append(key)
+                self._key_trigrams.append(grams)
+                self._key_opportunities.append([])
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(position)
+            self._key_opportunities[position].append(opp)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def resolve(
+        self,
+        allocation: Dict[str, Any],
+        shortlist: Sequence[YieldOpportunity] = ()
+    ) -> Optional[AllocationMatch]:
+        """
+        Match one allocation.
+
+        Args:
+            allocation: Allocation dict with pool_id/project/symbol/chain
+            shortlist: Opportunities the model was shown; preferred on ties
+
+        Returns:
+            AllocationMatch, or None if nothing matches confidently
+        """
+        pool_id = allocation.get("pool_id") or ""
+        project = allocation.get("project") or ""
+        symbol = allocation.get("symbol") or ""
+        chain = normalize(allocation.get("chain"))
+        preferred = {id(opp) for opp in shortlist}
+
+        opportunity = self._by_id.get(pool_id)
+        if opportunity is not None:
+            return AllocationMatch(opportunity, EXACT_ID_CONFIDENCE, "pool_id")
+
+        if project and symbol:
+            candidates = self._by_project_symbol.get((normalize(project), normalize(symbol)))
+            if candidates:
+                return self._pick(
+                    candidates, chain, preferred, PROJECT_SYMBOL_CONFIDENCE, "project_symbol"
+                )
+
+        # The prompt falls back to "project-symbol" as the pool id
+        for words in (tokens(project, symbol), tokens(pool_id)):
+            candidates = self._by_tokens.get(words) if words else None
+            if candidates:
+                return self._pick(candidates, chain, preferred, TOKENS_CONFIDENCE, "tokens")
+
+        if project and not symbol:
+            wanted = normalize(project)
+            matches = [opp for opp in shortlist if normalize(opp.project) == wanted]
+            if chain and len(matches) > 1:
+                matches = [opp for opp in matches if normalize(opp.chain) == chain] or matches
+            # A bare project name only identifies a pool if it is unambiguous
+            if len(matches) == 1:
+                return AllocationMatch(matches[0], PROJECT_ONLY_CONFIDENCE, "project")
+            return None
+
+        return self._fuzzy(
+            normalize(f"{project} {symbol}") if project or symbol else normalize(pool_id),
+            chain, preferred
+        )
+
+    def resolve_many(
+        self,
+        allocations: Sequence[Dict[str, Any]],
+        shortlist: Sequence[YieldOpportunity] = ()
+    ) -> List[Optional[AllocationMatch]]:
+        """Match allocations in order (see resolve)."""
+        return [self.resolve(allocation, shortlist) for allocation in allocations]
+
+    def _fuzzy(self, query: str, chain: str, preferred: Set[int]) -> Optional[AllocationMatch]:
+        if not query or not self._keys:
+            return None
+        query_grams = trigrams(query)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            posting = self._postings.get(gram)
+            if posting is not None and len(posting) <= self.max_posting:
+                shared.update(posting)
+
+        best_position, best_similarity = -1, 0.0
+        for position, _ in shared.most_common(self.max_candidates):
+            grams = self._key_trigrams[position]
+            similarity = 2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+            if similarity > best_similarity:
+                best_position, best_similarity = position, similarity
+        if best_similarity < self.min_similarity:
+            return None
+        return self._pick(
+            self._key_opportunities[best_position], chain, preferred,
+            FUZZY_CONFIDENCE * best_similarity, "fuzzy"
+        )
+
+    @staticmethod
+    def _pick(
+        candidates: List[YieldOpportunity],
+        chain: str,
+        preferred: Set[int],
+        confidence: float,
+        method: str
+    ) -> AllocationMatch:
+        """Narrow candidates by chain, then shortlist; they are in TVL order."""
+        if len(candidates) > 1 and chain:
+            candidates = [opp for opp in candidates if normalize(opp.chain) == chain] or candidates
+        if len(candidates) > 1 and preferred:
+            candidates = [opp for opp in candidates if id(opp) in preferred] or candidates
+        if len(candidates) > 1:
+            confidence *= AMBIGUITY_PENALTY
+        return AllocationMatch(candidates[0], round(confidence, 4), method)
@@ -1,8 +1,9 @@
 """Gemini 2.0 Flash AI client for yield analysis."""
 
+import asyncio
 import os
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from loguru import logger
 from pydantic import BaseModel, Field
 
@@ -13,6 +14,14 @@ except ImportError:
     raise
 
 from ..models.yield_opportunity import YieldOpportunity, RiskDistribution
+from .portfolio_optimizer import OptimizedPortfolio
+from .prompt_encoding import LEGEND, encode_opportunities, estimate_tokens
+
+
+# Text fields requested by get_narrative
+NARRATIVE_FIELDS = (
+    "summary", "key_risks", "opportunities", "rationale", "reasoning"
+)
 
 
 class AllocationSchema(BaseModel):
@@ -49,14 +58,37 @@ class GeminiClient:
     
     MODEL_NAME = "gemini-2.0-flash-exp"
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        prompt_token_budget: Optional[int] = None,
+        max_prompt_rows: Optional[int] = None
+    ):
         """
         Initialize Gemini client.
         
         Args:
             api_key: Gemini API key (defaults to GEMINI_API_KEY env var)
+            max_concurrency: Maximum in-flight Gemini calls
+                (defaults to GEMINI_MAX_CONCURRENCY or 8)
+            timeout_seconds: Per-call timeout
+                (defaults to GEMINI_TIMEOUT_SECONDS or 60)
+            prompt_token_budget: Estimated tokens for the opportunity table
+                in a recommendation prompt; decides how many candidates are
+                sent (defaults to GEMINI_PROMPT_TOKEN_BUDGET or 2000)
+            max_prompt_rows: Most candidates a prompt may hold however small
+                they encode (defaults to GEMINI_MAX_PROMPT_ROWS or 200)
         """
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.max_concurrency = max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        self.timeout_seconds = timeout_seconds or float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+        self.prompt_token_budget = prompt_token_budget or int(
+            os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", "2000")
+        )
+        self.max_prompt_rows = max_prompt_rows or int(os.getenv("GEMINI_MAX_PROMPT_ROWS", "200"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
         
         if not self.api_key:
             raise ValueError(
@@ -92,30 +124,92 @@ class GeminiClient:
         
         logger.info(f"Gemini client initialized with model: {self.MODEL_NAME}")
     
+    async def _generate(
+        self,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Call Gemini without blocking the event loop.
+        
+        Calls are bounded by a semaphore and a per-call timeout. Cancelling
+        the awaiting task (e.g. on client disconnect) abandons the call and
+        frees its slot.
+        
+        Args:
+            prompt: Prompt text
+            generation_config: Optional generation config
+            
+        Returns:
+            Gemini response
+            
+        Raises:
+            TimeoutError: If the call exceeds timeout_seconds
+        """
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self.model.generate_content_async(
+                        prompt,
+                        generation_config=generation_config
+                    ),
+                    timeout=self.timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"Gemini call timed out after {self.timeout_seconds:g}s"
+                ) from None
+    
     def _format_opportunities(
         self,
         opportunities: List[YieldOpportunity],
-        limit: int = 20
-    ) -> str:
-        """Format opportunities for AI context."""
-        formatted = []
+        token_budget: Optional[int] = None
+    ) -> Tuple[str, int]:
+        """
+        Format opportunities for AI context as a compact CSV table.
+        
+        Args:
+            opportunities: Ranked opportunities
+            token_budget: Estimated token budget of the table
+                (defaults to prompt_token_budget)
+            
+        Returns:
+            (table text, number of opportunities included)
+        """
+        return encode_opportunities(
+            opportunities,
+            token_budget=token_budget or self.prompt_token_budget,
+            max_rows=self.max_prompt_rows
+        )
+    
+    def prompt_capacity(self, opportunities: List[YieldOpportunity]) -> int:
+        """
+        Count the leading opportunities a recommendation prompt has room for.
         
-        for i, opp in enumerate(opportunities[:limit], 1):
-            pool_id = opp.pool or f"{opp.project}-{opp.symbol}"
-            formatted.append(f"""
-{i}. {opp.project} - {opp.symbol} ({opp.chain})
-   - Pool ID: {pool_id}
-   - APY: {opp.apy:.2f}% (Base: {opp.apy_base or 0:.2f}%, Reward: {opp.apy_reward or 0:.2f}%)
-   - TVL: ${opp.tvl_usd:,.0f} USD
-   - Risk Tier: {opp.risk_tier.value if opp.risk_tier else 'N/A'} (Score: {opp.risk_score:.2f})
-   - Stablecoin: {opp.stablecoin}
-   - IL Risk: {opp.il_risk}
-   - Exposure: {opp.exposure}
-   - Prediction: {opp.predicted_class} ({opp.predicted_probability}% confidence)
-   - Volatility: {abs(opp.apy_pct_7d or 0):.2f}% (7d change)
-""".strip())
+        Args:
+            opportunities: Ranked opportunities
+            
+        Returns:
+            Number of opportunities that fit prompt_token_budget and max_prompt_rows
+        """
+        return self._format_opportunities(opportunities)[1]
+    
+    @staticmethod
+    def _resolve_row_references(
+        recommendation: Dict[str, Any],
+        opportunities: Sequence[YieldOpportunity]
+    ) -> Dict[str, Any]:
+        """Replace row numbers given as pool_id with the ID of that row's pool.
         
-        return "\n\n".join(formatted)
+        opportunities must be exactly the rows of the prompt's table, in
+        order; other numbers are left as they are.
+        """
+        for alloc in recommendation.get("allocations") or []:
+            reference = str(alloc.get("pool_id", "")).strip().lstrip("#")
+            if reference.isdigit() and 1 <= int(reference) <= len(opportunities):
+                opp = opportunities[int(reference) - 1]
+                alloc["pool_id"] = opp.pool or f"{opp.project}-{opp.symbol}"
+        return recommendation
     
     def _normalize_recommendation_fields(self, recommendation: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -203,8 +297,14 @@ class GeminiClient:
         preferred_chains: Optional[List[str]] = None,
         min_liquidity_usd: Optional[float] = None,
         risk_distribution: Optional[RiskDistribution] = None
-    ) -> str:
-        """Build the recommendation prompt for Gemini (simplified for structured output)."""
+    ) -> Tuple[str, int]:
+        """
+        Build the recommendation prompt for Gemini (simplified for structured output).
+        
+        Returns:
+            (prompt, number of leading opportunities in its table; row
+            numbers refer to these only)
+        """
         
         chains_str = ", ".join(preferred_chains) if preferred_chains else "Any"
         liquidity_str = f"${min_liquidity_usd:,.0f}" if min_liquidity_usd else "No minimum"
@@ -220,7 +320,11 @@ Market Risk Distribution:
 - Overall: {risk_distribution.grade}
 """
         
-        opportunities_str = self._format_opportunities(opportunities)
+        opportunities_str, included = self._format_opportunities(opportunities)
+        if included < len(opportunities):
+            logger.info(
+                f"Prompt token budget fits {included} of {len(opportunities)} opportunities"
+            )
         
         prompt = f"""You are a DeFi yield analyst. Create a personalized portfolio recommendation.
 
@@ -232,17 +336,17 @@ USER CONTEXT:
 
 {risk_dist_str}
 
-OPPORTUNITIES ({len(opportunities)} available):
+OPPORTUNITIES ({included} available, CSV; {LEGEND}):
 {opportunities_str}
 
 CRITICAL: Return a JSON object with this EXACT structure:
 {{
   "allocations": [
     {{
-      "pool_id": "from the opportunity list above",
-      "project": "exact project name from list",
-      "chain": "exact chain name from list",
-      "symbol": "exact symbol from list",
+      "pool_id": "row number n from the table above",
+      "project": "exact project name from the table",
+      "chain": "exact chain name from the table",
+      "symbol": "exact symbol from the table",
       "allocation_percentage": percentage as float (0-100),
       "allocation_usd": dollar amount,
       "expected_apy": APY as float,
@@ -274,15 +378,15 @@ CRITICAL: Return a JSON object with this EXACT structure:
 
 REQUIREMENTS:
 1. Recommend 3-5 allocations totaling 100% of capital
-2. Use ONLY opportunities from the numbered list above
+2. Use ONLY opportunities from the table above
 3. Copy project, chain, and symbol names EXACTLY as shown
-4. For pool_id, use the project name if pool ID not available
+4. For pool_id, give the row number (n column) of the opportunity
 5. Diversify across protocols, chains, risk tiers
 6. Match risk tolerance
 7. Calculate all numeric fields accurately
 """
         
-        return prompt
+        return prompt, included
     
     async def get_recommendation(
         self,
@@ -315,7 +419,7 @@ REQUIREMENTS:
             )
             
             # Build prompt
-            prompt = self._build_recommendation_prompt(
+            prompt, included = self._build_recommendation_prompt(
                 opportunities=opportunities,
                 amount_usd=amount_usd,
                 risk_tolerance=risk_tolerance,
@@ -324,10 +428,12 @@ REQUIREMENTS:
                 risk_distribution=risk_distribution
             )
             
+            logger.debug(f"Recommendation prompt: ~{estimate_tokens(prompt)} tokens")
+            
             # Generate response with JSON output
             # Note: Using response_mime_type without schema for better compatibility
             # This still ensures valid JSON but allows more flexibility
-            response = self.model.generate_content(
+            response = await self._generate(
                 prompt,
                 generation_config={
                     "temperature": 0.7,
@@ -350,6 +456,10 @@ REQUIREMENTS:
             
             # Normalize field names (Gemini sometimes uses different names)
             recommendation = self._normalize_recommendation_fields(recommendation)
+            # Row numbers past the table are not candidates the model saw
+            recommendation = self._resolve_row_references(
+                recommendation, opportunities[:included]
+            )
             
             # Validate against our schema (optional but recommended)
             try:
@@ -373,7 +483,76 @@ REQUIREMENTS:
             logger.error(f"Error getting recommendation from Gemini: {e}")
             raise
     
-    def analyze_opportunity(
+    async def get_narrative(
+        self,
+        portfolio: OptimizedPortfolio,
+        risk_tolerance: str,
+        preferred_chains: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the narrative for an already optimized portfolio.
+        
+        Only text fields are requested; allocations and metrics come from
+        the optimizer and are passed in as facts. The prompt holds no
+        dollar amounts (positions are weights), so a narrative cached for
+        one amount never quotes the wrong one for another.
+        
+        Args:
+            portfolio: Portfolio computed by PortfolioOptimizer
+            risk_tolerance: User's risk tolerance (low/medium/high)
+            preferred_chains: Optional list of preferred chains
+            
+        Returns:
+            Dict with summary, key_risks, opportunities, rationale and
+            reasoning (list aligned with positions)
+        """
+        chains_str = ", ".join(preferred_chains) if preferred_chains else "Any"
+        positions_str = "\n".join(
+            f"{i}. {p.opportunity.project} - {p.opportunity.symbol} ({p.opportunity.chain}): "
+            f"{p.weight * 100:.1f}%, expected APY {p.expected_apy:.2f}%, "
+            f"risk tier {p.risk_tier.value}, APY volatility {p.volatility:.2f}, "
+            f"TVL ${p.opportunity.tvl_usd or 0:,.0f}, stablecoin {p.opportunity.stablecoin}, "
+            f"IL risk {p.opportunity.il_risk}"
+            for i, p in enumerate(portfolio.positions, 1)
+        )
+        prompt = f"""You are a DeFi yield analyst. Explain this portfolio; do not change it.
+Refer to positions by percentage; do not mention dollar amounts.
+
+USER CONTEXT:
+- Allocated: {sum(p.weight for p in portfolio.positions) * 100:.1f}% of the amount
+- Risk: {risk_tolerance}
+- Chains: {chains_str}
+
+PORTFOLIO (weighted expected APY {portfolio.weighted_expected_apy:.2f}%, \
+risk grade {portfolio.risk_grade}, diversification {portfolio.diversification_score:.0f}/100):
+{positions_str}
+
+Return a JSON object with this EXACT structure:
+{{
+  "summary": "executive summary of the portfolio",
+  "key_risks": ["risk 1", "risk 2", "risk 3"],
+  "opportunities": ["opportunity 1", "opportunity 2", "opportunity 3"],
+  "rationale": "why this construction suits the user",
+  "reasoning": ["one sentence per position, in the order listed"]
+}}
+"""
+        try:
+            response = await self._generate(
+                prompt,
+                generation_config={
+                    "temperature": 0.4,
+                    "max_output_tokens": 1024,
+                    "response_mime_type": "application/json",
+                }
+            )
+            narrative = json.loads(response.text.strip())
+            return {key: narrative[key] for key in NARRATIVE_FIELDS if key in narrative}
+            
+        except Exception as e:
+            logger.error(f"Error getting narrative from Gemini: {e}")
+            raise
+    
+    async def analyze_opportunity(
         self,
         opportunity: YieldOpportunity,
         amount_usd: float
@@ -410,7 +589,7 @@ Provide:
 5. Recommendation (invest/avoid/consider)
 """
             
-            response = self.model.generate_content(prompt)
+            response = await self._generate(prompt)
             return response.text
             
         except Exception as e:
@@ -0,0 +1,443 @@
+"""Deterministic local portfolio optimizer over ranked opportunities."""
+
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..data.risk_scorer import RiskDistributionAccumulator, RiskScorer
+from ..models.yield_opportunity import RiskTier, YieldOpportunity
+
+# Baseline APY uncertainty (percentage points) per tier, added to observed volatility
+TIER_SIGMA: Dict[RiskTier, float] = {
+    RiskTier.A: 1.0,
+    RiskTier.B: 2.0,
+    RiskTier.C: 4.0,
+    RiskTier.D: 8.0,
+}
+
+# Maximum share of capital per tier, by the most risky tier the request allows
+TIER_CAPS: Dict[RiskTier, Dict[RiskTier, float]] = {
+    RiskTier.A: {RiskTier.A: 1.0},
+    RiskTier.B: {RiskTier.A: 1.0, RiskTier.B: 0.6},
+    RiskTier.C: {RiskTier.A: 1.0, RiskTier.B: 0.7, RiskTier.C: 0.4},
+    RiskTier.D: {RiskTier.A: 1.0, RiskTier.B: 0.7, RiskTier.C: 0.4, RiskTier.D: 0.2},
+}
+
+# Exponent on variance: conservative requests penalize risk more
+RISK_AVERSION: Dict[RiskTier, float] = {
+    RiskTier.A: 1.0,
+    RiskTier.B: 0.75,
+    RiskTier.C: 0.5,
+    RiskTier.D: 0.5,
+}
+
+PROJECTION_DAYS: Dict[str, int] = {"1d": 1, "7d": 7, "30d": 30, "365d": 365}
+
+# Soft caps are loosened by these factors in turn when candidates cannot satisfy them
+CAP_RELAXATION = (1.0, 1.25, 1.5, 2.0, math.inf)
+
+MAX_ITERATIONS = 100
+EPSILON = 1e-9
+
+
+@dataclass(frozen=True)
+class OptimizedPosition:
+    """One position of an optimized portfolio."""
+
+    opportunity: YieldOpportunity
+    weight: float
+    allocation_usd: float
+    expected_apy: float
+    risk_tier: RiskTier
+    volatility: float
+
+
+@dataclass(frozen=True)
+class OptimizedPortfolio:
+    """Allocations and aggregate metrics computed by PortfolioOptimizer."""
+
+    amount_usd: float
+    positions: List[OptimizedPosition]
+    total_allocated_usd: float
+    weighted_expected_apy: float
+    projected_returns: Dict[str, float]
+    diversification_score: float
+    risk_grade: str
+    confidence_score: float
+    caps: Mapping[str, float] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+
+class PortfolioOptimizer:
+    """Mean-variance allocation under position, protocol, chain and tier caps.
+
+    Each candidate's expected APY is its current APY blended with its
+    30-day mean, and its variance combines observed APY volatility with
+    a baseline per risk tier. Pools are treated as uncorrelated, so the
+    unconstrained optimum weights each one by expected APY over variance.
+    Weights are then water-filled under the caps: capital a capped pool
+    or group cannot take is redistributed to the ones with room left, in
+    proportion to their scores. The smallest positions are then dropped
+    until at most max_positions remain, none below min_weight, unless
+    dropping one would leave capital unallocated.
+
+    A group cap is raised to an equal split when the candidates span too
+    few groups to satisfy it (e.g. every candidate is on one chain), and
+    the per-pool cap just enough for the pools to hold all capital. If
+    the caps still conflict, all of them are loosened in steps until the
+    capital is placed. The per-pool TVL cap is never raised; capital no
+    pool can absorb is left unallocated.
+    """
+
+    def __init__(
+        self,
+        max_positions: Optional[int] = None,
+        min_weight: Optional[float] = None,
+        max_position_share: Optional[float] = None,
+        max_protocol_share: Optional[float] = None,
+        max_chain_share: Optional[float] = None,
+        max_tvl_share: Optional[float] = None
+    ):
+        """
+        Initialize optimizer.
+
+        Args:
+            max_positions: Maximum pools in a portfolio
+                (defaults to PORTFOLIO_MAX_POSITIONS or 5)
+            min_weight: Smallest position kept, as a share of capital
+                (defaults to PORTFOLIO_MIN_WEIGHT or 0.05)
+            max_position_share: Maximum share of capital per pool
+                (defaults to PORTFOLIO_MAX_POSITION_SHARE or 0.35)
+            max_protocol_share: Maximum share of capital per protocol
+                (defaults to PORTFOLIO_MAX_PROTOCOL_SHARE or 0.4)
+            max_chain_share: Maximum share of capital per chain
+                (defaults to PORTFOLIO_MAX_CHAIN_SHARE or 0.6)
+            max_tvl_share: Maximum position size as a share of the pool's TVL
+                (defaults to PORTFOLIO_MAX_TVL_SHARE or 0.01)
+        """
+        self.max_positions = max_positions or int(os.getenv("PORTFOLIO_MAX_POSITIONS", "5"))
+        self.min_weight = _setting(min_weight, "PORTFOLIO_MIN_WEIGHT", 0.05)
+        self.max_position_share = _setting(max_position_share, "PORTFOLIO_MAX_POSITION_SHARE", 0.35)
+        self.max_protocol_share = _setting(max_protocol_share, "PORTFOLIO_MAX_PROTOCOL_SHARE", 0.4)
+        self.max_chain_share = _setting(max_chain_share, "PORTFOLIO_MAX_CHAIN_SHARE", 0.6)
+        self.max_tvl_share = _setting(max_tvl_share, "PORTFOLIO_MAX_TVL_SHARE", 0.01)
+
+    def optimize(
+        self,
+        opportunities: Sequence[YieldOpportunity],
+        amount_usd: float,
+        max_risk_tier: RiskTier = RiskTier.B
+    ) -> OptimizedPortfolio:
+        """
+        Allocate capital across ranked candidates.
+
+        Args:
+            opportunities: Candidate opportunities (already filtered and ranked)
+            amount_usd: Capital to allocate in USD
+            max_risk_tier: Most risky tier the request allows; selects tier
+                caps and risk aversion
+
+        Returns:
+            OptimizedPortfolio (with no positions if no candidate has a positive APY)
+        """
+        start = time.perf_counter()
+        candidates = list(opportunities)
+        tiers = [RiskScorer.risk_tier_of(opp) for opp in candidates]
+        mu = np.array([_expected_apy(opp) for opp in candidates], dtype=float)
+        volatility = np.array([_volatility(opp) for opp in candidates], dtype=float)
+        sigma = np.array([TIER_SIGMA[tier] for tier in tiers], dtype=float) + volatility
+        tier_caps = TIER_CAPS[max_risk_tier]
+        tier_cap = np.array([tier_caps.get(tier, 0.0) for tier in tiers], dtype=float)
+        tvl = np.array([opp.tvl_usd or 0.0 for opp in candidates], dtype=float)
+        tvl_cap = (
+            np.where(np.isfinite(tvl), tvl, 0.0) * self.max_tvl_share / amount_usd
+            if amount_usd > 0 else np.ones(len(candidates))
+        )
+
+        scores = np.where(
+            (mu > 0) & (tier_cap > 0),
+            np.fmax(mu, 0.0) / sigma ** (2 * RISK_AVERSION[max_risk_tier]),
+            0.0
+        )
+        def allocate(active: np.ndarray) -> Tuple[np.ndarray, float]:
+            if not len(active):
+                return np.zeros(0), 1.0
+            return self._capped_weights(
+                scores[active],
+                np.minimum(tvl_cap[active], 1.0),
+                [
+                    ([candidates[i].project.lower() for i in active], self.max_protocol_share),
+                    ([candidates[i].chain.lower() for i in active], self.max_chain_share),
+                ],
+                [tiers[i] for i in active],
+                tier_caps
+            )
+
+        active = np.flatnonzero(scores > 0)
+        weights, relaxation = allocate(active)
+        allocated = weights.sum()
+        # Drop the smallest position until the portfolio is small enough,
+        # keeping any pool without which less capital could be placed or
+        # caps would have to be loosened further
+        required = np.zeros(len(candidates), dtype=bool)
+        while len(active) > 1:
+            droppable = (weights < self.min_weight) | (len(active) > self.max_positions)
+            droppable &= ~required[active]
+            if not droppable.any():
+                break
+            drop = np.flatnonzero(droppable)[np.argmin(weights[droppable])]
+            remaining = np.delete(active, drop)
+            trial, trial_relaxation = allocate(remaining)
+            if trial.sum() < allocated - 1e-6 or trial_relaxation > relaxation:
+                required[active[drop]] = True
+                continue
+            active, weights = remaining, trial
+
+        positions = [
+            OptimizedPosition(
+                opportunity=candidates[i],
+                weight=float(weight),
+                allocation_usd=float(weight * amount_usd),
+                expected_apy=float(mu[i]),
+                risk_tier=tiers[i],
+                volatility=float(volatility[i])
+            )
+            for i, weight in zip(active, weights)
+            if weight > EPSILON
+        ]
+        positions.sort(key=lambda position: -position.weight)
+        return self._summarize(positions, amount_usd, start)
+
+    def _capped_weights(
+        self,
+        scores: np.ndarray,
+        limits: np.ndarray,
+        groups: List[Tuple[List[str], float]],
+        tiers: List[RiskTier],
+        tier_caps: Mapping[RiskTier, float]
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Weights proportional to scores under all caps.
+
+        Args:
+            scores: Unconstrained weight of each pool
+            limits: Hard per-pool limits (TVL share)
+            groups: (group key per pool, cap) for protocol and chain
+            tiers: Risk tier per pool
+            tier_caps: Cap per tier
+
+        Returns:
+            (weights, factor the soft caps were loosened by to place the capital)
+        """
+        target = min(1.0, float(limits.sum()))
+        position_cap = _relaxed_cap(limits, self.max_position_share)
+        constraints = [_group_constraint(keys, cap) for keys, cap in groups]
+        tier_codes, tier_keys = _encode(tiers)
+        tier_limits = np.array([tier_caps[tier] for tier in tier_keys], dtype=float)
+        # A tier cap only relaxes up to an equal split between the tiers present
+        constraints.append((tier_codes, np.maximum(tier_limits, 1.0 / len(tier_keys))))
+
+        for factor in CAP_RELAXATION:
+            weights = _water_fill(
+                scores,
+                np.minimum(limits, position_cap * factor),
+                [(codes, caps * factor) for codes, caps in constraints]
+            )
+            if weights.sum() >= target - 1e-6:
+                break
+        return weights, factor
+
+    def _summarize(
+        self,
+        positions: List[OptimizedPosition],
+        amount_usd: float,
+        start: float
+    ) -> OptimizedPortfolio:
+        weights = np.array([position.weight for position in positions])
+        allocated = float(weights.sum()) if len(positions) else 0.0
+        weighted_apy = (
+            float(weights @ np.array([p.expected_apy for p in positions])) / allocated
+            if allocated > 0 else 0.0
+        )
+        total_allocated_usd = allocated * amount_usd
+        grade = RiskDistributionAccumulator()
+        for position in positions:
+            # Whole percentage points of capital per tier weight the grade
+            grade.add_tier(position.risk_tier, max(1, round(position.weight * 100)))
+        with_history = sum(
+            position.weight for position in positions
+            if position.opportunity.apy_mean_30d is not None
+        )
+        return OptimizedPortfolio(
+            amount_usd=amount_usd,
+            positions=positions,
+            total_allocated_usd=total_allocated_usd,
+            weighted_expected_apy=weighted_apy,
+            projected_returns={
+                period: total_allocated_usd * weighted_apy / 100 * days / 365
+                for period, days in PROJECTION_DAYS.items()
+            },
+            diversification_score=self._diversification_score(positions),
+            risk_grade=grade.grade,
+            # Share of capital whose expected APY is backed by 30-day history
+            confidence_score=50.0 + 50.0 * (with_history / allocated) if allocated > 0 else 0.0,
+            caps={
+                "position": self.max_position_share,
+                "protocol": self.max_protocol_share,
+                "chain": self.max_chain_share,
+                "tvl": self.max_tvl_share,
+            },
+            elapsed_ms=(time.perf_counter() - start) * 1000
+        )
+
+    def _diversification_score(self, positions: List[OptimizedPosition]) -> float:
+        """0-100 from concentration (1 - HHI) across pools, protocols and chains."""
+        if not positions:
+            return 0.0
+        full_spread = 1.0 - 1.0 / max(self.max_positions, 2)
+        score = 0.0
+        for share, key in (
+            (0.5, lambda p: id(p.opportunity)),
+            (0.3, lambda p: p.opportunity.project.lower()),
+            (0.2, lambda p: p.opportunity.chain.lower()),
+        ):
+            totals: Dict[object, float] = {}
+            for position in positions:
+                totals[key(position)] = totals.get(key(position), 0.0) + position.weight
+            total = sum(totals.values())
+            hhi = sum((weight / total) ** 2 for weight in totals.values())
+            score += share * min(1.0, (1.0 - hhi) / full_spread)
+        return round(100 * score, 1)
+
+
+def _setting(value: Optional[float], env_var: str, default: float) -> float:
+    return value if value is not None else float(os.getenv(env_var, str(default)))
+
+
+def _expected_apy(opp: YieldOpportunity) -> float:
+    """Current APY blended with its 30-day mean when known."""
+    apy = opp.apy
+    if apy is None or not math.isfinite(apy):
+        return math.nan
+    if opp.apy_mean_30d is not None and math.isfinite(opp.apy_mean_30d):
+        return 0.5 * (apy + opp.apy_mean_30d)
+    return apy
+
+
+def _volatility(opp: YieldOpportunity) -> float:
+    """APY volatility proxy used by the risk scorer: max(|7d change|, |APY - 30d mean|)."""
+    candidates = []
+    if opp.apy_pct_7d is not None:
+        candidates.append(abs(opp.apy_pct_7d))
+    if opp.apy is not None and opp.apy_mean_30d is not None:
+        candidates.append(abs(opp.apy - opp.apy_mean_30d))
+    finite = [value for value in candidates if math.isfinite(value)]
+    return max(finite) if finite else 0.0
+
+
+def _water_fill(
+    scores: np.ndarray,
+    position_caps: np.ndarray,
+    constraints: List[Tuple[np.ndarray, np.ndarray]]
+) -> np.ndarray:
+    """Spread capital by score; capped pools and groups pass their excess to the rest."""
+    weights = np.zeros(len(scores))
+    for _ in range(MAX_ITERATIONS):
+        room = position_caps - weights > EPSILON
+        for codes, caps in constraints:
+            totals = np.bincount(codes, weights=weights, minlength=len(caps))
+            room &= (caps - totals > EPSILON)[codes]
+        deficit = 1.0 - weights.sum()
+        if deficit <= EPSILON or not room.any():
+            break
+        weights[room] += deficit * scores[room] / scores[room].sum()
+        np.minimum(weights, position_caps, out=weights)
+        for codes, caps in constraints:
+            totals = np.bincount(codes, weights=weights, minlength=len(caps))
+            scale = np.minimum(1.0, caps / np.maximum(totals, EPSILON))
+            weights *= scale[codes]
+    return weights
+
+
+def _relaxed_cap(limits: np.ndarray, cap: float) -> float:
+    """Smallest cap >= cap at which pools with these hard limits can hold all capital."""
+    if np.minimum(limits, cap).sum() >= 1.0:
+        return cap
+    ordered = np.sort(limits)
+    below = 0.0
+    for k, limit in enumerate(ordered):
+        # Pools before k are held at their limits; the rest share the remainder
+        level = (1.0 - below) / (len(ordered) - k)
+        if level <= limit:
+            return max(cap, float(level))
+        below += limit
+    return 1.0
+
+
+def _encode(keys: Sequence[object]) -> Tuple[np.ndarray, List[object]]:
+    """Integer codes for keys, and the distinct keys in first-seen order."""
+    positions: Dict[object, int] = {}
+    codes = np.array([positions.setdefault(key, len(positions)) for key in keys], dtype=np.intp)
+    return codes, list(positions)
+
+
+def _group_constraint(keys: Sequence[str], cap: float) -> Tuple[np.ndarray, np.ndarray]:
+    codes, distinct = _encode(keys)
+    return codes, np.full(len(distinct), max(cap, 1.0 / len(distinct)))
+
+
+def describe_portfolio(portfolio: OptimizedPortfolio) -> Dict[str, object]:
+    """
+    Deterministic narrative for a portfolio, used when no AI narrative is requested or available.
+
+    Args:
+        portfolio: Portfolio computed by PortfolioOptimizer
+
+    Returns:
+        Dict with summary, key_risks, opportunities, rationale and
+        reasoning (list aligned with positions)
+    """
+    positions = portfolio.positions
+    chains = sorted({p.opportunity.chain for p in positions})
+    key_risks = []
+    for p in positions:
+        label = f"{p.opportunity.project} {p.opportunity.symbol}"
+        if p.risk_tier in (RiskTier.C, RiskTier.D):
+            key_risks.append(f"{label} is risk tier {p.risk_tier.value}")
+        elif (p.opportunity.il_risk or "").lower() == "yes":
+            key_risks.append(f"Impermanent loss exposure in {label}")
+        elif p.volatility >= 2:
+            key_risks.append(f"{label} APY moved {p.volatility:.1f} points recently")
+    if portfolio.total_allocated_usd < portfolio.amount_usd - 0.01:
+        key_risks.append(
+            f"${portfolio.amount_usd - portfolio.total_allocated_usd:,.2f} left unallocated "
+            f"by pool size limits"
+        )
+    caps = portfolio.caps
+    return {
+        "summary": (
+            f"{len(positions)}-position portfolio across {', '.join(chains) or 'no chains'} "
+            f"with {portfolio.weighted_expected_apy:.2f}% weighted expected APY "
+            f"and risk grade {portfolio.risk_grade}."
+        ),
+        "key_risks": key_risks[:3],
+        "opportunities": [
+            f"{p.opportunity.project} {p.opportunity.symbol} on {p.opportunity.chain} "
+            f"at {p.expected_apy:.2f}% expected APY"
+            for p in sorted(positions, key=lambda p: -p.expected_apy)[:3]
+        ],
+        "rationale": (
+            "Weights are proportional to expected APY over APY variance, capped at "
+            f"{caps.get('position', 0):.0%} per pool, {caps.get('protocol', 0):.0%} per protocol "
+            f"and {caps.get('chain', 0):.0%} per chain, with per-tier limits for the risk tolerance."
+        ),
+        "reasoning": [
+            f"{p.weight:.1%} for {p.expected_apy:.2f}% expected APY at risk tier "
+            f"{p.risk_tier.value} (APY volatility {p.volatility:.2f})"
+            for p in positions
+        ],
+    }
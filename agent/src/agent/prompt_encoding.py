@@ -0,0 +1,113 @@
+"""Compact, token-budgeted encoding of opportunities for LLM prompts."""
+
+import csv
+import io
+import math
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from ..models.yield_opportunity import YieldOpportunity
+
+_WORD = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# Short column key, meaning (for the legend), and value for one opportunity
+COLUMNS: List[Tuple[str, str, Callable[[YieldOpportunity], str]]] = [
+    ("n", "row number", lambda opp: ""),  # filled in by encode_opportunities
+    ("proj", "project", lambda opp: opp.project),
+    ("chain", "chain", lambda opp: opp.chain),
+    ("sym", "symbol", lambda opp: opp.symbol),
+    ("apy", "APY %", lambda opp: _number(opp.apy, 2)),
+    ("base", "base APY %", lambda opp: _number(opp.apy_base, 1)),
+    ("rwd", "reward APY %", lambda opp: _number(opp.apy_reward, 1)),
+    ("tvl", "TVL $M", lambda opp: _number(opp.tvl_usd / 1e6 if opp.tvl_usd else None, 2)),
+    ("tier", "risk tier A-D", lambda opp: opp.risk_tier.value if opp.risk_tier else ""),
+    ("score", "risk score, higher is safer", lambda opp: _number(opp.risk_score, 1)),
+    ("stbl", "stablecoin 1/0", lambda opp: _flag(opp.stablecoin)),
+    ("il", "impermanent loss risk", lambda opp: opp.il_risk or ""),
+    ("exp", "exposure", lambda opp: opp.exposure or ""),
+    ("pred", "predicted APY trend", lambda opp: opp.predicted_class or ""),
+    ("d7", "7d APY change %", lambda opp: _number(opp.apy_pct_7d, 1)),
+]
+
+HEADER = ",".join(key for key, _, _ in COLUMNS)
+LEGEND = "; ".join(f"{key}={meaning}" for key, meaning, _ in COLUMNS)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the LLM token count of text without calling the model.
+
+    Counts letter runs (one token per 4 letters, rounded up), digit runs
+    (one per 3 digits) and each punctuation character. This slightly
+    overestimates subword tokenizers on prose and numbers, so a budget
+    computed from it is conservative.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    tokens = 0
+    for piece in _WORD.findall(text):
+        if piece.isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def encode_opportunities(
+    opportunities: Sequence[YieldOpportunity],
+    token_budget: Optional[int] = None,
+    max_rows: Optional[int] = None
+) -> Tuple[str, int]:
+    """
+    Encode opportunities as a CSV table, keeping as many rows as fit a budget.
+
+    Rows are numbered from 1 in input order (the model refers to a pool
+    by its row number) and added until the next row would exceed the
+    budget, so the best-ranked candidates are always the ones sent.
+
+    Args:
+        opportunities: Ranked opportunities
+        token_budget: Maximum estimated tokens of the table, header included
+            (None for no limit)
+        max_rows: Maximum rows (None for no limit)
+
+    Returns:
+        (CSV text, number of opportunities included)
+    """
+    lines = [HEADER]
+    used = estimate_tokens(HEADER) + 1
+    limit = len(opportunities) if max_rows is None else min(max_rows, len(opportunities))
+    for row_number, opp in enumerate(opportunities[:limit], 1):
+        line = _csv_line([str(row_number)] + [value(opp) for _, _, value in COLUMNS[1:]])
+        cost = estimate_tokens(line) + 1
+        if token_budget is not None and used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines), len(lines) - 1
+
+
+def _csv_line(values: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(values)
+    return buffer.getvalue()
+
+
+def _number(value: Optional[float], digits: int) -> str:
+    """Round and drop trailing zeros ("5.10" -> "5.1"); empty if unknown."""
+    if value is None or not math.isfinite(value):
+        return ""
+    text = f"{value:.{digits}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _flag(value: Optional[bool]) -> str:
+    return "" if value is None else str(int(bool(value)))
@@ -1,8 +1,12 @@
 """Recommendation engine orchestrating data fetching and AI analysis."""
 
+import asyncio
+import functools
+import os
 import time
+import httpx
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Awaitable, Callable, Hashable, List, Optional, Dict, Any, Sequence, Tuple
 from loguru import logger
 
 from ..models.yield_opportunity import YieldOpportunity, RiskTier
@@ -13,7 +17,23 @@ from ..models.recommendation import (
 )
 from ..data.aggregator import DataAggregator
 from ..data.risk_scorer import compute_risk_distribution
-from .gemini_client import GeminiClient
+from ..data.snapshot import OpportunitySnapshot, SnapshotRefresher
+from ..utils.singleflight import SingleFlight
+from .allocation_resolver import AllocationResolver
+from .gemini_client import GeminiClient, NARRATIVE_FIELDS
+from .portfolio_optimizer import OptimizedPortfolio, PortfolioOptimizer, describe_portfolio
+from .result_cache import RecommendationCache, RecommendationKey, rescale_recommendation
+
+# "local": optimizer numbers with a Gemini narrative; "numbers": optimizer
+# only, no Gemini call; "ai": Gemini chooses the allocations
+RECOMMENDATION_MODES = ("local", "numbers", "ai")
+
+# Candidates the optimizer modes consider when a request sets no limit; in
+# "ai" mode the Gemini prompt's token budget decides instead
+DEFAULT_MAX_OPPORTUNITIES = 20
+
+# (risk tier, chains, min TVL, min APY, ranking strategy, limit) -> ranked shortlist
+ShortlistKey = Tuple[str, Tuple[str, ...], Optional[float], Optional[float], str, int]
 
 
 class RecommendationEngine:
@@ -22,17 +42,54 @@ class RecommendationEngine:
     def __init__(
         self,
         gemini_api_key: Optional[str] = None,
-        horizon_url: Optional[str] = None
+        horizon_url: Optional[str] = None,
+        http_limits: Optional[httpx.Limits] = None,
+        refresh_interval_seconds: Optional[float] = None,
+        result_cache: Optional[RecommendationCache] = None,
+        optimizer: Optional[PortfolioOptimizer] = None,
+        mode: Optional[str] = None,
+        narrative_timeout_seconds: Optional[float] = None
     ):
         """
         Initialize recommendation engine.
         
+        The engine is safe to share across concurrent requests; create it once
+        and call close() on shutdown.
+        
         Args:
             gemini_api_key: Optional Gemini API key
             horizon_url: Optional custom Horizon API URL
+            http_limits: Optional connection pool limits for upstream APIs
+            refresh_interval_seconds: Opportunity snapshot refresh interval
+                (defaults to SNAPSHOT_REFRESH_SECONDS or 300)
+            result_cache: Optional recommendation cache (one is created
+                by default)
+            optimizer: Optional local portfolio optimizer (one is created
+                by default)
+            mode: Default recommendation mode, one of RECOMMENDATION_MODES
+                (defaults to RECOMMENDATION_MODE or "local")
+            narrative_timeout_seconds: How long "local" mode waits for the
+                Gemini narrative before returning the numbers alone
+                (defaults to RECOMMENDATION_NARRATIVE_TIMEOUT_SECONDS or 15)
         """
-        self.aggregator = DataAggregator(horizon_url=horizon_url)
+        if refresh_interval_seconds is None:
+            refresh_interval_seconds = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "300"))
+        if narrative_timeout_seconds is None:
+            narrative_timeout_seconds = float(
+                os.getenv("RECOMMENDATION_NARRATIVE_TIMEOUT_SECONDS", "15")
+            )
+        
+        self.aggregator = DataAggregator(horizon_url=horizon_url, http_limits=http_limits)
+        self.snapshots = SnapshotRefresher(
+            self.aggregator.build_snapshot,
+            interval_seconds=refresh_interval_seconds
+        )
         self.gemini = GeminiClient(api_key=gemini_api_key)
+        self.result_cache = result_cache or RecommendationCache()
+        self.optimizer = optimizer or PortfolioOptimizer()
+        self.mode = self._check_mode(mode or os.getenv("RECOMMENDATION_MODE", "local"))
+        self.narrative_timeout_seconds = narrative_timeout_seconds
+        self._inflight = SingleFlight()
         
         logger.info("Recommendation engine initialized")
     
@@ -43,27 +100,122 @@ class RecommendationEngine:
         preferred_chains: Optional[List[str]] = None,
         min_liquidity_usd: Optional[float] = 50000,
         min_apy: Optional[float] = None,
-        max_opportunities: int = 20,
-        ranking_strategy: str = "risk_adjusted"
+        max_opportunities: Optional[int] = None,
+        ranking_strategy: str = "risk_adjusted",
+        mode: Optional[str] = None
     ) -> RecommendationResponse:
         """
         Generate personalized yield recommendations.
         
+        In "local" and "numbers" modes allocations and metrics come from
+        the PortfolioOptimizer in milliseconds, computed for the exact
+        amount on every request. "local" also asks Gemini for the
+        narrative, waiting at most narrative_timeout_seconds; narratives
+        are cached per portfolio, including one that arrives after the
+        deadline, and identical concurrent requests share one Gemini call.
+        "numbers" never calls Gemini. "ai" has Gemini choose the
+        allocations; its results are cached per amount bucket and
+        identical concurrent requests share one computation.
+        
         Args:
             amount_usd: Investment amount in USD
             risk_tolerance: User's risk tolerance (low/medium/high)
             preferred_chains: Optional list of preferred blockchains
             min_liquidity_usd: Minimum TVL requirement
             min_apy: Minimum APY requirement
-            max_opportunities: Maximum opportunities to consider
+            max_opportunities: Optional limit on the opportunities to
+                consider; in "ai" mode as many as fit the Gemini prompt's
+                token budget are sent (up to this limit), otherwise
+                DEFAULT_MAX_OPPORTUNITIES when unset
             ranking_strategy: How to rank opportunities
+            mode: Recommendation mode (defaults to the engine's mode)
             
         Returns:
             RecommendationResponse with allocations and analysis
         """
+        return await self._respond(
+            snapshot=None,
+            shortlists=None,
+            amount_usd=amount_usd,
+            risk_tolerance=risk_tolerance,
+            preferred_chains=preferred_chains,
+            min_liquidity_usd=min_liquidity_usd,
+            min_apy=min_apy,
+            max_opportunities=max_opportunities,
+            ranking_strategy=ranking_strategy,
+            mode=mode
+        )
+    
+    async def recommend_batch(
+        self,
+        profiles: Sequence[Dict[str, Any]]
+    ) -> List[RecommendationResponse]:
+        """
+        Generate recommendations for many profiles in one call.
+        
+        All profiles are served from one snapshot, and profiles with the
+        same filters (risk tier, chains, minimums, ranking) share one
+        filter and rank pass. Profiles are processed concurrently; Gemini
+        calls stay bounded by the client's concurrency limit, and identical
+        profiles share one computation (see recommend).
+        
+        Args:
+            profiles: Keyword arguments of recommend, one dict per profile
+            
+        Returns:
+            One RecommendationResponse per profile, in input order; a
+            failed profile has success=False and its error
+        """
+        start_time = time.time()
+        try:
+            snapshot = await self.snapshots.get()
+        except Exception as e:
+            logger.error(f"Batch recommendation failed: {e}")
+            execution_time = (time.time() - start_time) * 1000
+            return [
+                RecommendationResponse(success=False, error=str(e), execution_time_ms=execution_time)
+                for _ in profiles
+            ]
+        
+        shortlists: Dict[ShortlistKey, List[YieldOpportunity]] = {}
+        
+        async def respond(profile: Dict[str, Any]) -> RecommendationResponse:
+            try:
+                return await self._respond(snapshot=snapshot, shortlists=shortlists, **profile)
+            except TypeError as e:
+                # Unknown or missing profile fields
+                return RecommendationResponse(
+                    success=False,
+                    error=f"Invalid profile: {e}",
+                    execution_time_ms=(time.time() - start_time) * 1000
+                )
+        
+        responses = await asyncio.gather(*(respond(profile) for profile in profiles))
+        logger.info(
+            f"Batch of {len(profiles)} recommendations "
+            f"({sum(response.success for response in responses)} succeeded, "
+            f"{len(shortlists)} shortlists) in {(time.time() - start_time) * 1000:.0f}ms"
+        )
+        return list(responses)
+    
+    async def _respond(
+        self,
+        snapshot: Optional[OpportunitySnapshot],
+        shortlists: Optional[Dict[ShortlistKey, List[YieldOpportunity]]],
+        amount_usd: float,
+        risk_tolerance: str = "medium",
+        preferred_chains: Optional[List[str]] = None,
+        min_liquidity_usd: Optional[float] = 50000,
+        min_apy: Optional[float] = None,
+        max_opportunities: Optional[int] = None,
+        ranking_strategy: str = "risk_adjusted",
+        mode: Optional[str] = None
+    ) -> RecommendationResponse:
+        """Serve one recommendation, optionally from a given snapshot and shared shortlists."""
         start_time = time.time()
         
         try:
+            mode = self._check_mode(mode or self.mode)
             logger.info(
                 f"Generating recommendation: amount=${amount_usd}, "
                 f"risk={risk_tolerance}, chains={preferred_chains}"
@@ -71,64 +223,53 @@ class RecommendationEngine:
             
             # Step 1: Determine risk tier filter based on tolerance
             max_risk_tier = self._risk_tolerance_to_tier(risk_tolerance)
+            if max_opportunities is None:
+                # The prompt budget trims "ai" shortlists (see _generate_recommendation)
+                max_opportunities = (
+                    self.gemini.max_prompt_rows if mode == "ai" else DEFAULT_MAX_OPPORTUNITIES
+                )
             
-            # Step 2: Fetch and filter opportunities
-            logger.info("Fetching yield opportunities from all sources...")
-            opportunities = await self.aggregator.fetch_all_opportunities(
+            # Step 2: Read the current snapshot and serve cached results for it
+            if snapshot is None:
+                snapshot = await self.snapshots.get()
+            cache_key = self.result_cache.make_key(
+                risk_tier=max_risk_tier.value,
                 chains=preferred_chains,
-                min_tvl_usd=min_liquidity_usd,
+                min_liquidity_usd=min_liquidity_usd,
                 min_apy=min_apy,
-                max_risk_tier=max_risk_tier,
-                include_stellar_native=True
-            )
-            
-            if not opportunities:
-                raise ValueError(
-                    "No opportunities found matching the criteria. "
-                    "Try relaxing filters."
-                )
-            
-            logger.info(f"Found {len(opportunities)} matching opportunities")
-            
-            # Step 3: Rank opportunities
-            ranked_opportunities = self.aggregator.rank_opportunities(
-                opportunities,
-                strategy=ranking_strategy
-            )
-            
-            # Limit to top N
-            top_opportunities = ranked_opportunities[:max_opportunities]
-            
-            # Step 4: Compute risk distribution
-            risk_distribution = compute_risk_distribution(top_opportunities)
-            
-            logger.info(
-                f"Risk distribution: {risk_distribution.grade} "
-                f"({len(top_opportunities)} opportunities)"
-            )
-            
-            # Step 5: Get AI recommendation
-            logger.info("Requesting AI analysis from Gemini...")
-            ai_response = await self.gemini.get_recommendation(
-                opportunities=top_opportunities,
                 amount_usd=amount_usd,
-                risk_tolerance=risk_tolerance,
-                preferred_chains=preferred_chains,
-                min_liquidity_usd=min_liquidity_usd,
-                risk_distribution=risk_distribution
+                max_opportunities=max_opportunities,
+                ranking_strategy=ranking_strategy,
+                snapshot_version=snapshot.version,
+                mode=mode
             )
-            
-            # Step 6: Build recommendation object
-            recommendation = self._build_recommendation(
-                ai_response=ai_response,
-                opportunities=top_opportunities,
+            generate = functools.partial(
+                self._generate_recommendation,
+                snapshot=snapshot,
                 amount_usd=amount_usd,
                 risk_tolerance=risk_tolerance,
+                max_risk_tier=max_risk_tier,
                 preferred_chains=preferred_chains,
                 min_liquidity_usd=min_liquidity_usd,
-                data_age_seconds=0  # Real-time for now
+                min_apy=min_apy,
+                max_opportunities=max_opportunities,
+                ranking_strategy=ranking_strategy,
+                mode=mode,
+                cache_key=cache_key,
+                shortlists=shortlists
             )
             
+            if mode != "ai":
+                # Optimizer caps (e.g. max_tvl_share) do not scale with the
+                # amount, so the numbers are computed for every request;
+                # only the narrative is cached (see _generate_recommendation)
+                recommendation = await generate()
+            else:
+                recommendation = await self._cached_recommendation(
+                    cache_key, generate, amount_usd, risk_tolerance, preferred_chains,
+                    int(snapshot.age_seconds())
+                )
+            
             execution_time = (time.time() - start_time) * 1000
             
             logger.info(
@@ -155,6 +296,259 @@ class RecommendationEngine:
                 execution_time_ms=execution_time
             )
     
+    async def _cached_recommendation(
+        self,
+        cache_key: RecommendationKey,
+        generate: Callable[[], Awaitable[Recommendation]],
+        amount_usd: float,
+        risk_tolerance: str,
+        preferred_chains: Optional[List[str]],
+        data_age_seconds: int
+    ) -> Recommendation:
+        """Serve an AI recommendation from the cache, computing it once per key on a miss."""
+        recommendation = self.result_cache.get(
+            cache_key,
+            amount_usd=amount_usd,
+            risk_tolerance=risk_tolerance,
+            preferred_chains=preferred_chains,
+            data_age_seconds=data_age_seconds
+        )
+        if recommendation is not None:
+            logger.info("Recommendation served from cache")
+            return recommendation
+        
+        # Compute once per key, even for concurrent requests
+        async def compute() -> Recommendation:
+            result = await generate()
+            self.result_cache.set(cache_key, result)
+            return result
+        
+        recommendation = await self._inflight.do(str(cache_key), compute)
+        
+        if (recommendation.requested_amount_usd != amount_usd
+                or recommendation.risk_tolerance != risk_tolerance
+                or recommendation.preferred_chains != preferred_chains):
+            recommendation = rescale_recommendation(
+                recommendation,
+                amount_usd=amount_usd,
+                risk_tolerance=risk_tolerance,
+                preferred_chains=preferred_chains,
+                data_age_seconds=recommendation.data_freshness_seconds
+            )
+        return recommendation
+    
+    async def _generate_recommendation(
+        self,
+        snapshot: OpportunitySnapshot,
+        amount_usd: float,
+        risk_tolerance: str,
+        max_risk_tier: RiskTier,
+        preferred_chains: Optional[List[str]],
+        min_liquidity_usd: Optional[float],
+        min_apy: Optional[float],
+        max_opportunities: int,
+        ranking_strategy: str,
+        mode: str = "ai",
+        cache_key: Optional[RecommendationKey] = None,
+        shortlists: Optional[Dict[ShortlistKey, List[YieldOpportunity]]] = None
+    ) -> Recommendation:
+        """Filter and rank a snapshot, then allocate locally or with Gemini."""
+        shortlist_key: ShortlistKey = (
+            max_risk_tier.value,
+            tuple(sorted({c.strip().lower() for c in preferred_chains or []})),
+            min_liquidity_usd,
+            min_apy,
+            ranking_strategy,
+            max_opportunities
+        )
+        top_opportunities = shortlists.get(shortlist_key) if shortlists is not None else None
+        if top_opportunities is None:
+            top_opportunities = self._shortlist(
+                snapshot,
+                max_risk_tier=max_risk_tier,
+                preferred_chains=preferred_chains,
+                min_liquidity_usd=min_liquidity_usd,
+                min_apy=min_apy,
+                max_opportunities=max_opportunities,
+                ranking_strategy=ranking_strategy
+            )
+            if shortlists is not None:
+                shortlists[shortlist_key] = top_opportunities
+        
+        if mode == "ai":
+            # Offer Gemini (and match its answer against) only the rows its prompt fits
+            top_opportunities = top_opportunities[:self.gemini.prompt_capacity(top_opportunities)]
+        
+        # Compute risk distribution
+        risk_distribution = compute_risk_distribution(top_opportunities)
+        
+        logger.info(
+            f"Risk distribution: {risk_distribution.grade} "
+            f"({len(top_opportunities)} opportunities)"
+        )
+        
+        if mode != "ai":
+            portfolio = self.optimizer.optimize(top_opportunities, amount_usd, max_risk_tier)
+            if not portfolio.positions:
+                raise ValueError(
+                    "No opportunities with a positive expected APY match the criteria. "
+                    "Try relaxing filters."
+                )
+            logger.info(
+                f"Optimized {len(portfolio.positions)} positions in {portfolio.elapsed_ms:.1f}ms"
+            )
+            build = functools.partial(
+                self._build_optimized_recommendation,
+                portfolio,
+                risk_tolerance=risk_tolerance,
+                preferred_chains=preferred_chains,
+                min_liquidity_usd=min_liquidity_usd,
+                data_age_seconds=int(snapshot.age_seconds()),
+                data_sources=snapshot.sources
+            )
+            if mode == "numbers":
+                return build(None)
+            
+            # The narrative is the slow part; reuse it for the same portfolio
+            composition = tuple(
+                (position.opportunity.pool or position.opportunity.project, round(position.weight, 3))
+                for position in portfolio.positions
+            )
+            narrative = None
+            if cache_key is not None:
+                narrative = self.result_cache.get_narrative(cache_key, composition)
+            if narrative is None:
+                def remember(narrative: Dict[str, Any]):
+                    if cache_key is not None:
+                        self.result_cache.set_narrative(cache_key, composition, narrative)
+                
+                narrative = await self._narrate(
+                    portfolio, risk_tolerance, preferred_chains, on_late=remember,
+                    key=("narrative", str(cache_key), composition)
+                )
+                if narrative is not None:
+                    remember(narrative)
+            return build(narrative)
+        
+        # Get AI recommendation
+        logger.info("Requesting AI analysis from Gemini...")
+        ai_response = await self.gemini.get_recommendation(
+            opportunities=top_opportunities,
+            amount_usd=amount_usd,
+            risk_tolerance=risk_tolerance,
+            preferred_chains=preferred_chains,
+            min_liquidity_usd=min_liquidity_usd,
+            risk_distribution=risk_distribution
+        )
+        
+        # Build recommendation object
+        return self._build_recommendation(
+            ai_response=ai_response,
+            opportunities=top_opportunities,
+            amount_usd=amount_usd,
+            risk_tolerance=risk_tolerance,
+            preferred_chains=preferred_chains,
+            min_liquidity_usd=min_liquidity_usd,
+            data_age_seconds=int(snapshot.age_seconds()),
+            data_sources=snapshot.sources
+        )
+    
+    def _shortlist(
+        self,
+        snapshot: OpportunitySnapshot,
+        max_risk_tier: RiskTier,
+        preferred_chains: Optional[List[str]],
+        min_liquidity_usd: Optional[float],
+        min_apy: Optional[float],
+        max_opportunities: int,
+        ranking_strategy: str
+    ) -> List[YieldOpportunity]:
+        """Filter a snapshot and materialize the top ranked opportunities."""
+        candidates = self.aggregator.select_table(
+            snapshot,
+            chains=preferred_chains,
+            min_tvl_usd=min_liquidity_usd,
+            min_apy=min_apy,
+            max_risk_tier=max_risk_tier,
+            include_stellar_native=True
+        )
+        
+        if len(candidates) == 0:
+            raise ValueError(
+                "No opportunities found matching the criteria. "
+                "Try relaxing filters."
+            )
+        
+        logger.info(f"Found {len(candidates)} matching opportunities")
+        
+        # Rank candidates and materialize only the top N
+        return self.aggregator.top_opportunities(
+            candidates,
+            strategy=ranking_strategy,
+            limit=max_opportunities
+        )
+    
+    async def _narrate(
+        self,
+        portfolio: OptimizedPortfolio,
+        risk_tolerance: str,
+        preferred_chains: Optional[List[str]],
+        on_late: Optional[Callable[[Dict[str, Any]], None]] = None,
+        key: Optional[Hashable] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Ask Gemini for a portfolio's narrative, waiting at most narrative_timeout_seconds.
+        
+        Args:
+            portfolio: Optimized portfolio to describe
+            risk_tolerance: User's risk tolerance
+            preferred_chains: Preferred chains
+            on_late: Called with the narrative if it arrives after the deadline
+            key: Optional key under which concurrent identical requests
+                share one Gemini call
+            
+        Returns:
+            Narrative fields, or None if Gemini failed or missed the deadline
+        """
+        def fetch() -> Awaitable[Dict[str, Any]]:
+            return self.gemini.get_narrative(portfolio, risk_tolerance, preferred_chains)
+        
+        task = asyncio.ensure_future(fetch() if key is None else self._inflight.do(key, fetch))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.narrative_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.info(
+                f"Narrative not ready after {self.narrative_timeout_seconds:g}s; "
+                f"returning optimizer output"
+            )
+            task.add_done_callback(functools.partial(self._deliver_late_narrative, on_late))
+            return None
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"Narrative unavailable; returning optimizer output: {e}")
+            return None
+    
+    @staticmethod
+    def _deliver_late_narrative(
+        on_late: Optional[Callable[[Dict[str, Any]], None]],
+        task: asyncio.Future
+    ):
+        if task.cancelled() or task.exception() is not None:
+            return  # get_narrative already logged the failure
+        if on_late is not None:
+            on_late(task.result())
+    
+    @staticmethod
+    def _check_mode(mode: str) -> str:
+        mode = mode.lower()
+        if mode not in RECOMMENDATION_MODES:
+            raise ValueError(
+                f"Unknown recommendation mode {mode!r}; expected one of {RECOMMENDATION_MODES}"
+            )
+        return mode
+    
     def _risk_tolerance_to_tier(self, tolerance: str) -> RiskTier:
         """Convert risk tolerance string to max risk tier."""
         tolerance = tolerance.lower()
@@ -176,77 +570,39 @@ class RecommendationEngine:
         risk_tolerance: str,
         preferred_chains: Optional[List[str]],
         min_liquidity_usd: Optional[float],
-        data_age_seconds: int
+        data_age_seconds: int,
+        data_sources: Optional[List[str]] = None
     ) -> Recommendation:
-        """Build Recommendation object from AI response."""
-        
-        # Create opportunity lookup with multiple strategies
-        opp_lookup = {}
-        
-        for opp in opportunities:
-            # Strategy 1: pool ID (if available)
-            if opp.pool:
-                opp_lookup[opp.pool] = opp
-            
-            # Strategy 2: project-symbol combination
-            key = f"{opp.project}-{opp.symbol}"
-            opp_lookup[key] = opp
-            
-            # Strategy 3: lowercase variations for fuzzy matching
-            opp_lookup[key.lower()] = opp
-            opp_lookup[opp.project.lower()] = opp
-            opp_lookup[opp.symbol.lower()] = opp
+        """Build Recommendation object from AI response.
+
+        Allocations are matched only against the shortlist the model was
+        offered, which already satisfies the request's filters; a similar
+        name elsewhere in the snapshot (another tier, chain or TVL) is
+        never picked. Unmatched allocations are dropped.
+        """
+        resolver = AllocationResolver(opportunities)
         
         # Parse allocations
         allocations = []
         for alloc_data in ai_response.get("allocations", []):
-            # Find matching opportunity
-            pool_id = alloc_data.get("pool_id", "")
-            project = alloc_data.get("project", "")
-            symbol = alloc_data.get("symbol", "")
-            
-            # Try different lookup strategies in order of specificity
-            opportunity = None
-            
-            # 1. Try exact pool_id
-            if pool_id and pool_id in opp_lookup:
-                opportunity = opp_lookup[pool_id]
-            
-            # 2. Try project-symbol combo
-            if not opportunity and project and symbol:
-                key = f"{project}-{symbol}"
-                opportunity = opp_lookup.get(key) or opp_lookup.get(key.lower())
-            
-            # 3. Try case-insensitive project match
-            if not opportunity and project:
-                opportunity = opp_lookup.get(project.lower())
-            
-            # 4. Fuzzy search through all opportunities
-            if not opportunity:
-                for opp in opportunities:
-                    if (project and symbol and 
-                        opp.project.lower() == project.lower() and 
-                        opp.symbol.lower() == symbol.lower()):
-                        opportunity = opp
-                        break
-                    elif project and opp.project.lower() == project.lower():
-                        opportunity = opp
-                        break
-            
-            if not opportunity:
+            match = resolver.resolve(alloc_data, shortlist=opportunities)
+            if match is None:
                 logger.warning(
                     f"Could not find opportunity for allocation: "
-                    f"pool_id={pool_id}, project={project}, symbol={symbol}"
+                    f"pool_id={alloc_data.get('pool_id', '')}, "
+                    f"project={alloc_data.get('project', '')}, "
+                    f"symbol={alloc_data.get('symbol', '')}"
                 )
                 continue
             
             allocation = PortfolioAllocation(
-                opportunity=opportunity,
+                opportunity=match.opportunity,
                 allocation_percentage=alloc_data.get("allocation_percentage", 0),
                 allocation_usd=alloc_data.get("allocation_usd", 0),
                 expected_apy=alloc_data.get("expected_apy", 0),
                 risk_tier=RiskTier(alloc_data.get("risk_tier", "B")),
-                reasoning=alloc_data.get("reasoning", "")
+                reasoning=alloc_data.get("reasoning", ""),
+                match_confidence=match.confidence
             )
             
             allocations.append(allocation)
@@ -270,9 +626,84 @@ class RecommendationEngine:
             estimated_fees=ai_response.get("estimated_fees", {}),
             confidence_score=ai_response.get("confidence_score", 0),
             timestamp=datetime.utcnow().isoformat(),
-            data_freshness_seconds=data_age_seconds
+            data_freshness_seconds=data_age_seconds,
+            data_sources=data_sources or []
         )
     
+    def _build_optimized_recommendation(
+        self,
+        portfolio: OptimizedPortfolio,
+        narrative: Optional[Dict[str, Any]],
+        risk_tolerance: str,
+        preferred_chains: Optional[List[str]],
+        min_liquidity_usd: Optional[float],
+        data_age_seconds: int,
+        data_sources: Optional[List[str]] = None
+    ) -> Recommendation:
+        """Build Recommendation from optimizer output and an optional AI narrative.
+
+        Numbers always come from the optimizer; narrative fields of the
+        wrong type or missing fall back to describe_portfolio.
+        """
+        defaults = describe_portfolio(portfolio)
+        text = dict(defaults)
+        for key in NARRATIVE_FIELDS:
+            value = (narrative or {}).get(key)
+            if isinstance(value, type(defaults[key])) and value:
+                text[key] = value
+        reasoning = text["reasoning"]
+        
+        allocations = [
+            PortfolioAllocation(
+                opportunity=position.opportunity,
+                allocation_percentage=min(100.0, position.weight * 100),
+                allocation_usd=position.allocation_usd,
+                expected_apy=position.expected_apy,
+                risk_tier=position.risk_tier,
+                reasoning=str(reasoning[i]) if i < len(reasoning) else defaults["reasoning"][i],
+                match_confidence=1.0
+            )
+            for i, position in enumerate(portfolio.positions)
+        ]
+        
+        return Recommendation(
+            requested_amount_usd=portfolio.amount_usd,
+            risk_tolerance=risk_tolerance,
+            preferred_chains=preferred_chains,
+            min_liquidity_usd=min_liquidity_usd,
+            allocations=allocations,
+            total_allocated_usd=portfolio.total_allocated_usd,
+            weighted_expected_apy=portfolio.weighted_expected_apy,
+            overall_risk_grade=portfolio.risk_grade,
+            diversification_score=portfolio.diversification_score,
+            summary=text["summary"],
+            key_risks=[str(risk) for risk in text["key_risks"]],
+            opportunities=[str(item) for item in text["opportunities"]],
+            rationale=text["rationale"],
+            projected_returns=portfolio.projected_returns,
+            estimated_fees={},
+            confidence_score=portfolio.confidence_score,
+            timestamp=datetime.utcnow().isoformat(),
+            data_freshness_seconds=data_age_seconds,
+            data_sources=data_sources or []
+        )
+    
+    async def get_pools(self, pool_ids: List[str]) -> Dict[str, Optional[YieldOpportunity]]:
+        """
+        Resolve pool IDs against the current snapshot in one batch.
+        
+        Pools missing from the snapshot are fetched individually from the
+        sources (see DataAggregator.lookup_pools).
+        
+        Args:
+            pool_ids: Pool IDs
+            
+        Returns:
+            Dict of pool ID -> opportunity (None if unknown), in input order
+        """
+        snapshot = await self.snapshots.get()
+        return await self.aggregator.lookup_pools(snapshot, pool_ids)
+    
     async def analyze_portfolio(
         self,
         current_holdings: List[Dict[str, Any]]
@@ -280,17 +711,70 @@ class RecommendationEngine:
         """
         Analyze an existing portfolio.
         
+        Holdings are resolved by pool ID in one batch (see get_pools).
+        
         Args:
-            current_holdings: List of current holdings with amounts
+            current_holdings: List of holdings with "pool_id" and "amount_usd"
             
         Returns:
             Analysis text
+            
+        Raises:
+            ValueError: If no holding matches a known pool
+        """
+        pools = await self.get_pools([h.get("pool_id", "") for h in current_holdings])
+        positions = []
+        unknown = []
+        for holding in current_holdings:
+            opportunity = pools.get(holding.get("pool_id", ""))
+            if opportunity is None:
+                unknown.append(str(holding.get("pool_id")))
+            else:
+                positions.append((opportunity, float(holding.get("amount_usd") or 0)))
+        if not positions:
+            raise ValueError("None of the holdings match a known pool")
+        
+        total = sum(amount for _, amount in positions)
+        weighted_apy = (
+            sum((opp.apy or 0) * amount for opp, amount in positions) / total if total else 0.0
+        )
+        distribution = compute_risk_distribution([opp for opp, _ in positions])
+        tiers = ", ".join(
+            f"{metric.tier.value}: {metric.percentage:.0f}%"
+            for metric in distribution.distribution
+        )
+        lines = [
+            f"Portfolio: ${total:,.2f} across {len(positions)} positions",
+            f"Weighted APY: {weighted_apy:.2f}%",
+            f"Risk grade: {distribution.grade} ({tiers})",
+        ]
+        for opp, amount in sorted(positions, key=lambda position: -position[1]):
+            tier = opp.risk_tier.value if opp.risk_tier else "N/A"
+            lines.append(
+                f"- {opp.project} {opp.symbol} ({opp.chain}): ${amount:,.2f} "
+                f"@ {opp.apy or 0:.2f}% APY, risk tier {tier}"
+            )
+        if unknown:
+            lines.append(f"Unknown pools: {', '.join(unknown)}")
+        return "\n".join(lines)
+    
+    def start(self):
+        """
+        Start refreshing opportunity snapshots in the background.
+        
+        Stellar pool trade volume (for fee APY) is followed by its own
+        background task. With STELLAR_LIVE_STREAM enabled, Stellar pool
+        state is also followed live so snapshot refreshes read it without
+        network calls.
         """
-        # TODO: Implement portfolio analysis
-        raise NotImplementedError("Portfolio analysis coming soon")
+        if os.getenv("STELLAR_LIVE_STREAM", "false").lower() in ("1", "true", "yes"):
+            self.aggregator.stellar.start_live()
+        self.aggregator.stellar.volumes.start()
+        self.snapshots.start()
     
     async def close(self):
-        """Close all connections."""
+        """Stop background refresh and close all connections."""
+        await self.snapshots.stop()
         await self.aggregator.close()
     
     async def __aenter__(self):
@@ -0,0 +1,223 @@
+"""Cache of generated recommendations keyed on canonical request parameters."""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from ..models.recommendation import Recommendation
+from ..utils.cache import CacheStats, LRUCache
+
+
+@dataclass(frozen=True)
+class RecommendationKey:
+    """Normalized recommendation inputs.
+
+    Requests that differ only in chain order/case or by an amount within the
+    same bucket map to the same key.
+    """
+
+    risk_tier: str
+    chains: Tuple[str, ...]
+    min_liquidity_usd: Optional[float]
+    min_apy: Optional[float]
+    amount_bucket: int
+    max_opportunities: int
+    ranking_strategy: str
+    snapshot_version: int
+    mode: str = "local"
+
+    def __str__(self) -> str:
+        return (
+            f"rec:v{self.snapshot_version}:{self.risk_tier}:{','.join(self.chains)}:"
+            f"{self.min_liquidity_usd}:{self.min_apy}:{self.amount_bucket}:"
+            f"{self.max_opportunities}:{self.ranking_strategy}:{self.mode}"
+        )
+
+
+class RecommendationCache:
+    """Cache recommendations per snapshot version and amount bucket.
+
+    Whole recommendations are cached for Gemini-allocated ("ai") results
+    and rescaled to the requested amount on a hit. Locally optimized
+    portfolios are cheap to recompute and their caps do not scale with
+    the amount, so only their narratives are cached.
+    """
+
+    def __init__(
+        self,
+        amount_granularity_usd: Optional[float] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        """
+        Initialize recommendation cache.
+
+        Args:
+            amount_granularity_usd: Width of an amount bucket in USD
+                (defaults to RECOMMENDATION_AMOUNT_BUCKET_USD or 1000)
+            ttl_seconds: Maximum entry age
+                (defaults to RECOMMENDATION_CACHE_TTL_SECONDS or 600)
+            max_entries: Maximum cached recommendations
+                (defaults to RECOMMENDATION_CACHE_MAX_ENTRIES or 512)
+        """
+        if amount_granularity_usd is None:
+            amount_granularity_usd = float(os.getenv("RECOMMENDATION_AMOUNT_BUCKET_USD", "1000"))
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "600"))
+        if max_entries is None:
+            max_entries = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "512"))
+
+        self.amount_granularity_usd = amount_granularity_usd
+        self._cache = LRUCache(default_ttl=ttl_seconds, max_entries=max_entries)
+        self._snapshot_version: Optional[int] = None
+
+    def make_key(
+        self,
+        risk_tier: str,
+        chains: Optional[List[str]],
+        min_liquidity_usd: Optional[float],
+        min_apy: Optional[float],
+        amount_usd: float,
+        max_opportunities: int,
+        ranking_strategy: str,
+        snapshot_version: int,
+        mode: str = "local"
+    ) -> RecommendationKey:
+        """Build the canonical cache key for a request."""
+        return RecommendationKey(
+            risk_tier=risk_tier,
+            chains=tuple(sorted({c.strip().lower() for c in chains or []})),
+            min_liquidity_usd=float(min_liquidity_usd) if min_liquidity_usd is not None else None,
+            min_apy=float(min_apy) if min_apy is not None else None,
+            amount_bucket=round(amount_usd / self.amount_granularity_usd),
+            max_opportunities=max_opportunities,
+            ranking_strategy=ranking_strategy,
+            snapshot_version=snapshot_version,
+            mode=mode
+        )
+
+    def get(
+        self,
+        key: RecommendationKey,
+        amount_usd: float,
+        risk_tolerance: str,
+        preferred_chains: Optional[List[str]],
+        data_age_seconds: int
+    ) -> Optional[Recommendation]:
+        """
+        Look up a cached recommendation rescaled to the exact request.
+
+        Args:
+            key: Canonical request key
+            amount_usd: Exact requested amount
+            risk_tolerance: Risk tolerance as requested
+            preferred_chains: Chains as requested
+            data_age_seconds: Current snapshot age
+
+        Returns:
+            Rescaled Recommendation, or None on a miss
+        """
+        self._expire_stale_versions(key.snapshot_version)
+
+        cached: Optional[Recommendation] = self._cache.get(str(key))
+        if cached is None:
+            return None
+
+        return rescale_recommendation(
+            cached,
+            amount_usd=amount_usd,
+            risk_tolerance=risk_tolerance,
+            preferred_chains=preferred_chains,
+            data_age_seconds=data_age_seconds
+        )
+
+    def set(self, key: RecommendationKey, recommendation: Recommendation):
+        """Store a recommendation under its canonical key."""
+        self._expire_stale_versions(key.snapshot_version)
+        if key.snapshot_version == self._snapshot_version:
+            self._cache.set(str(key), recommendation)
+
+    def get_narrative(self, key: RecommendationKey, composition: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        Look up the narrative cached for a portfolio.
+
+        Args:
+            key: Canonical request key
+            composition: Hashable description of the portfolio's positions and weights
+
+        Returns:
+            Narrative fields, or None on a miss
+        """
+        self._expire_stale_versions(key.snapshot_version)
+        return self._cache.get(f"{key}:narrative:{composition}")
+
+    def set_narrative(self, key: RecommendationKey, composition: Tuple, narrative: Dict[str, Any]):
+        """Store the narrative for a portfolio (see get_narrative)."""
+        self._expire_stale_versions(key.snapshot_version)
+        if key.snapshot_version == self._snapshot_version:
+            self._cache.set(f"{key}:narrative:{composition}", narrative)
+
+    def clear(self):
+        """Drop all cached recommendations."""
+        self._cache.clear()
+
+    def stats(self) -> CacheStats:
+        """Return hit/miss/eviction counters."""
+        return self._cache.stats()
+
+    def _expire_stale_versions(self, snapshot_version: int):
+        # Entries are only valid for the snapshot they were computed from
+        if self._snapshot_version is None or snapshot_version > self._snapshot_version:
+            if self._snapshot_version is not None:
+                logger.info(
+                    f"Snapshot v{snapshot_version} published; "
+                    f"expiring recommendations for v{self._snapshot_version}"
+                )
+                self._cache.clear()
+            self._snapshot_version = snapshot_version
+
+
+def rescale_recommendation(
+    recommendation: Recommendation,
+    amount_usd: float,
+    risk_tolerance: str,
+    preferred_chains: Optional[List[str]],
+    data_age_seconds: int
+) -> Recommendation:
+    """
+    Copy a recommendation with dollar amounts scaled to a new request amount.
+
+    Percentages, APYs and narrative fields are unchanged; allocation amounts,
+    the allocated total and projected returns scale linearly.
+
+    Args:
+        recommendation: Recommendation to copy
+        amount_usd: Target amount in USD
+        risk_tolerance: Risk tolerance to report
+        preferred_chains: Chains to report
+        data_age_seconds: Snapshot age to report
+
+    Returns:
+        New Recommendation for the exact amount
+    """
+    base_amount = recommendation.requested_amount_usd
+    factor = amount_usd / base_amount if base_amount else 1.0
+
+    allocations = [
+        alloc.model_copy(update={"allocation_usd": alloc.allocation_usd * factor})
+        for alloc in recommendation.allocations
+    ]
+
+    return recommendation.model_copy(update={
+        "requested_amount_usd": amount_usd,
+        "risk_tolerance": risk_tolerance,
+        "preferred_chains": preferred_chains,
+        "allocations": allocations,
+        "total_allocated_usd": recommendation.total_allocated_usd * factor,
+        "projected_returns": {
+            period: value * factor
+            for period, value in recommendation.projected_returns.items()
+        },
+        "data_freshness_seconds": data_age_seconds,
+    })
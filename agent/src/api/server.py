@@ -1,20 +1,49 @@
 """FastAPI server for AI-powered yield recommendations."""
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Any, Awaitable, Optional, List
 import os
 from loguru import logger
 
 from ..agent.recommendation_engine import RecommendationEngine
-from ..models.recommendation import RecommendationResponse
+from ..models.recommendation import BatchRecommendationResponse, RecommendationResponse
+from ..utils.http import http_limits_from_env
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared recommendation engine on startup and close it on shutdown.
+
+    The engine keeps its opportunity snapshot fresh in the background so
+    requests never wait on upstream APIs after the first refresh.
+    """
+    try:
+        app.state.engine = RecommendationEngine(http_limits=http_limits_from_env())
+        app.state.engine.start()
+    except ValueError as e:
+        # Missing configuration (e.g. GEMINI_API_KEY) should not stop health checks
+        logger.error(f"Recommendation engine unavailable: {e}")
+        app.state.engine = None
+    
+    try:
+        yield
+    finally:
+        if app.state.engine is not None:
+            await app.state.engine.close()
+            logger.info("Recommendation engine closed")
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Stellar Yield Agent API",
     description="AI-powered yield recommendations using Google Gemini 2.0 Flash",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -58,6 +87,76 @@ class RecommendationRequest(BaseModel):
         description="Minimum APY percentage",
         example=5.0
     )
+    max_opportunities: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Optional limit on candidates considered (ai mode: as many as fit the "
+            "prompt budget; other modes default to 20)"
+        ),
+        example=50
+    )
+    mode: Optional[str] = Field(
+        default=None,
+        pattern="^(local|numbers|ai)$",
+        description=(
+            "local: optimizer allocations with an AI narrative; numbers: optimizer "
+            "only, no AI call; ai: AI-chosen allocations (default: RECOMMENDATION_MODE)"
+        ),
+        example="numbers"
+    )
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Request model for recommendations for several profiles at once."""
+    
+    profiles: List[RecommendationRequest] = Field(
+        min_length=1,
+        max_length=int(os.getenv("RECOMMENDATION_BATCH_MAX_PROFILES", "20")),
+        description="Profiles to recommend for; results are returned in the same order"
+    )
+
+
+def get_engine(request: Request) -> RecommendationEngine:
+    """Return the app-wide recommendation engine."""
+    engine = getattr(request.app.state, "engine", None)
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Recommendation engine unavailable")
+    return engine
+
+
+async def run_until_disconnect(
+    http_request: Request,
+    awaitable: Awaitable[Any],
+    poll_interval: float = 0.5
+) -> Any:
+    """
+    Await work for a request, cancelling it if the client disconnects.
+    
+    Args:
+        http_request: Incoming HTTP request
+        awaitable: Work to run on behalf of the request
+        poll_interval: Seconds between disconnect checks
+        
+    Returns:
+        Result of the awaitable
+        
+    Raises:
+        HTTPException: 499 if the client went away before completion
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected; cancelling recommendation")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
 
 
 @app.get("/")
@@ -80,12 +179,18 @@ async def health_check():
 
 
 @app.post("/api/recommendations", response_model=RecommendationResponse)
-async def get_recommendations(request: RecommendationRequest):
+async def get_recommendations(
+    request: RecommendationRequest,
+    http_request: Request,
+    engine: RecommendationEngine = Depends(get_engine)
+):
     """
     Generate AI-powered yield recommendations.
     
     Args:
         request: Recommendation request parameters
+        http_request: Raw HTTP request (used to detect client disconnects)
+        engine: Shared recommendation engine
         
     Returns:
         RecommendationResponse with allocations and analysis
@@ -99,26 +204,31 @@ async def get_recommendations(request: RecommendationRequest):
             f"risk={request.risk_tolerance}"
         )
         
-        async with RecommendationEngine() as engine:
-            response = await engine.recommend(
+        response = await run_until_disconnect(
+            http_request,
+            engine.recommend(
                 amount_usd=request.amount_usd,
                 risk_tolerance=request.risk_tolerance,
                 preferred_chains=request.preferred_chains,
                 min_liquidity_usd=request.min_liquidity_usd,
                 min_apy=request.min_apy,
-                max_opportunities=20
+                max_opportunities=request.max_opportunities,
+                mode=request.mode
             )
-            
-            if not response.success:
-                logger.error(f"Recommendation failed: {response.error}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=response.error or "Failed to generate recommendation"
-                )
-            
-            logger.info("Recommendation generated successfully")
-            return response
-            
+        )
+        
+        if not response.success:
+            logger.error(f"Recommendation failed: {response.error}")
+            raise HTTPException(
+                status_code=500,
+                detail=response.error or "Failed to generate recommendation"
+            )
+        
+        logger.info("Recommendation generated successfully")
+        return response
+        
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -127,20 +237,74 @@ async def get_recommendations(request: RecommendationRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/api/recommendations/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(
+    request: BatchRecommendationRequest,
+    http_request: Request,
+    engine: RecommendationEngine = Depends(get_engine)
+):
+    """
+    Generate recommendations for several profiles from one snapshot.
+    
+    A failed profile does not fail the batch; its result carries the error.
+    
+    Args:
+        request: Profiles to recommend for
+        http_request: Raw HTTP request (used to detect client disconnects)
+        engine: Shared recommendation engine
+        
+    Returns:
+        BatchRecommendationResponse with one result per profile, in order
+    """
+    start_time = time.perf_counter()
+    logger.info(f"Batch recommendation request: {len(request.profiles)} profiles")
+    
+    results = await run_until_disconnect(
+        http_request,
+        engine.recommend_batch([profile.model_dump() for profile in request.profiles])
+    )
+    succeeded = sum(result.success for result in results)
+    
+    return BatchRecommendationResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        execution_time_ms=(time.perf_counter() - start_time) * 1000
+    )
+
+
 @app.get("/api/health/detailed")
-async def detailed_health():
+async def detailed_health(request: Request):
     """Detailed health check with service dependencies."""
     try:
         # Check if Gemini API key is configured
         gemini_key = os.getenv("GEMINI_API_KEY")
         gemini_status = "configured" if gemini_key else "missing"
+        engine = getattr(request.app.state, "engine", None)
         
         return {
             "status": "ok",
             "service": "agent-api",
             "dependencies": {
                 "gemini_api": gemini_status,
+                "recommendation_engine": "ready" if engine is not None else "unavailable",
             },
+            "caches": {
+                "recommendations": engine.result_cache.stats().to_dict(),
+                "upstream_payloads": (
+                    engine.aggregator.payload_cache.stats()
+                    if engine.aggregator.payload_cache is not None else None
+                ),
+            } if engine is not None else {},
+            "stellar_live": (
+                engine.aggregator.stellar.live.stats()
+                if engine is not None and engine.aggregator.stellar.live is not None else None
+            ),
+            "stellar_volume": (
+                engine.aggregator.stellar.volumes.last_report.to_dict()
+                if engine is not None and engine.aggregator.stellar.volumes.last_report is not None
+                else None
+            ),
             "environment": {
                 "api_port": os.getenv("API_PORT", "8000"),
                 "log_level": os.getenv("LOG_LEVEL", "INFO"),
@@ -1,13 +1,44 @@
 """Data fetching and processing modules."""
 
-from .risk_scorer import RiskScorer, classify_risk_tier, compute_risk_distribution
+from .risk_scorer import (
+    RiskScorer,
+    RiskDistributionAccumulator,
+    classify_risk_tier,
+    compute_risk_distribution,
+)
 from .defillama_fetcher import DefiLlamaFetcher
 from .aggregator import DataAggregator
+from .opportunity_table import OpportunityTable
+from .filters import FilterSpec
+from .ingest import IngestReport, build_opportunities
+from .horizon_crawler import CrawlReport, HorizonPoolCrawler
+from .horizon_stream import HorizonLiveStream, LivePoolTable
+from .pool_volume import PoolVolumeTracker
+from .price_resolver import AssetPriceResolver, compute_reserve_tvl
+from .snapshot import OpportunitySnapshot, SnapshotRefresher
+from .sources import DataSource, SourceResult, fetch_sources
 
 __all__ = [
     "RiskScorer",
+    "RiskDistributionAccumulator",
     "classify_risk_tier",
     "compute_risk_distribution",
     "DefiLlamaFetcher",
     "DataAggregator",
+    "OpportunityTable",
+    "FilterSpec",
+    "IngestReport",
+    "build_opportunities",
+    "HorizonPoolCrawler",
+    "CrawlReport",
+    "HorizonLiveStream",
+    "LivePoolTable",
+    "PoolVolumeTracker",
+    "AssetPriceResolver",
+    "compute_reserve_tvl",
+    "OpportunitySnapshot",
+    "SnapshotRefresher",
+    "DataSource",
+    "SourceResult",
+    "fetch_sources",
 ]
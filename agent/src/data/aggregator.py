@@ -1,26 +1,121 @@
 """Data aggregator combining multiple sources."""
 
-from typing import List, Optional, Dict, Any
+import asyncio
+import os
+import httpx
+import numpy as np
+from typing import Awaitable, Callable, Iterable, List, Optional, Dict
 from loguru import logger
 
 from ..models.yield_opportunity import YieldOpportunity, RiskTier
+from ..utils.http import create_http_client
+from ..utils.http_cache import PayloadCache
+from ..utils.singleflight import SingleFlight
 from .defillama_fetcher import DefiLlamaFetcher
 from .stellar_fetcher import StellarFetcher
-from .risk_scorer import RiskScorer
+from .opportunity_table import OpportunityTable
+from .filters import FilterSpec
+from .snapshot import OpportunitySnapshot
+from .sources import DataSource, fetch_sources
+
+DEFILLAMA_SOURCE = "defillama"
+STELLAR_DEX_SOURCE = "stellar_dex"
 
 
 class DataAggregator:
     """Aggregate yield data from multiple sources."""
     
-    def __init__(self, horizon_url: Optional[str] = None):
+    def __init__(
+        self,
+        horizon_url: Optional[str] = None,
+        http_limits: Optional[httpx.Limits] = None,
+        timeout: int = 30,
+        source_timeout_seconds: Optional[float] = None
+    ):
         """
         Initialize data aggregator.
         
+        Both fetchers share one pooled HTTP client so keep-alive connections
+        are reused for the lifetime of the aggregator, and one on-disk
+        payload cache (HTTP_CACHE_DIR) for conditional requests.
+        
         Args:
             horizon_url: Optional custom Horizon API URL
+            http_limits: Optional connection pool limits for the shared client
+            timeout: Request timeout in seconds
+            source_timeout_seconds: Default per-source fetch budget
+                (defaults to SOURCE_TIMEOUT_SECONDS or 20)
         """
-        self.defillama = DefiLlamaFetcher()
-        self.stellar = StellarFetcher(horizon_url) if horizon_url else StellarFetcher()
+        if source_timeout_seconds is None:
+            source_timeout_seconds = float(os.getenv("SOURCE_TIMEOUT_SECONDS", "20"))
+        self.source_timeout_seconds = source_timeout_seconds
+        
+        self.client = create_http_client(timeout=timeout, limits=http_limits)
+        self.payload_cache = PayloadCache.from_env()
+        self.defillama = DefiLlamaFetcher(
+            timeout=timeout, client=self.client, payload_cache=self.payload_cache
+        )
+        if horizon_url:
+            self.stellar = StellarFetcher(
+                horizon_url, timeout=timeout, client=self.client,
+                payload_cache=self.payload_cache
+            )
+        else:
+            self.stellar = StellarFetcher(
+                timeout=timeout, client=self.client, payload_cache=self.payload_cache
+            )
+        
+        # Floor pushed into snapshot ingest (see INGEST_MIN_TVL_USD)
+        self.ingest_spec = FilterSpec.ingest_floor_from_env()
+        
+        self._inflight = SingleFlight()
+        self.sources: Dict[str, DataSource] = {}
+        self.register_source(
+            DEFILLAMA_SOURCE,
+            self.defillama.fetch_pools,
+            filtered_fetch=lambda spec: self.defillama.fetch_pools(spec=spec),
+            lookup=self.defillama.get_pools_by_id
+        )
+        self.register_source(
+            STELLAR_DEX_SOURCE,
+            self.stellar.fetch_stellar_yields,
+            filtered_fetch=lambda spec: self.stellar.fetch_stellar_yields(spec=spec),
+            lookup=self.stellar.get_pools_by_id
+        )
+    
+    def register_source(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[List[YieldOpportunity]]],
+        timeout_seconds: Optional[float] = None,
+        filtered_fetch: Optional[Callable[[FilterSpec], Awaitable[List[YieldOpportunity]]]] = None,
+        lookup: Optional[
+            Callable[[List[str]], Awaitable[Dict[str, Optional[YieldOpportunity]]]]
+        ] = None
+    ):
+        """
+        Register an opportunity source fetched on every snapshot build.
+        
+        Sources are fetched concurrently, so adding one does not lengthen
+        the critical path beyond its own timeout. Concurrent fetches of the
+        same source are coalesced into one upstream call.
+        
+        Args:
+            name: Unique source name (reported in responses)
+            fetch: Coroutine function returning scored opportunities
+            timeout_seconds: Optional per-source timeout override
+            filtered_fetch: Optional coroutine function taking a FilterSpec
+                and applying it during ingest (predicate pushdown)
+            lookup: Optional coroutine function fetching specific pool IDs
+                (see lookup_pools)
+        """
+        self.sources[name] = DataSource(
+            name=name,
+            fetch=self._inflight.wrap(("source", name), fetch),
+            timeout_seconds=timeout_seconds or self.source_timeout_seconds,
+            filtered_fetch=filtered_fetch,
+            lookup=lookup
+        )
     
     async def fetch_all_opportunities(
         self,
@@ -43,48 +138,201 @@ class DataAggregator:
         Returns:
             Aggregated and filtered list of opportunities
         """
-        all_opportunities = []
-        
-        # Fetch from DeFiLlama
-        if chains:
-            for chain in chains:
-                try:
-                    logger.info(f"Fetching {chain} opportunities from DeFiLlama")
-                    opportunities = await self.defillama.fetch_chain_pools(chain)
-                    all_opportunities.extend(opportunities)
-                except Exception as e:
-                    logger.error(f"Failed to fetch {chain} from DeFiLlama: {e}")
-        else:
-            try:
-                logger.info("Fetching all opportunities from DeFiLlama")
-                opportunities = await self.defillama.fetch_pools()
-                all_opportunities.extend(opportunities)
-            except Exception as e:
-                logger.error(f"Failed to fetch from DeFiLlama: {e}")
-        
-        # Fetch native Stellar pools if requested
-        if include_stellar_native and (not chains or "stellar" in [c.lower() for c in chains]):
-            try:
-                logger.info("Fetching native Stellar DEX pools")
-                stellar_opportunities = await self.stellar.fetch_stellar_yields()
-                all_opportunities.extend(stellar_opportunities)
-            except Exception as e:
-                logger.error(f"Failed to fetch Stellar native pools: {e}")
-        
-        # Apply filters
-        filtered_opportunities = self._apply_filters(
-            all_opportunities,
+        wants_stellar = not chains or "stellar" in [c.lower() for c in chains]
+        sources = [
+            name for name in self.sources
+            if name != STELLAR_DEX_SOURCE or (include_stellar_native and wants_stellar)
+        ]
+        # Push the request's filters into ingest; select_opportunities
+        # re-applies them to sources that cannot filter themselves
+        spec = FilterSpec.create(
+            chains=chains,
+            min_tvl_usd=min_tvl_usd,
+            min_apy=min_apy,
+            max_risk_tier=max_risk_tier
+        )
+        snapshot = await self.build_snapshot(version=0, sources=sources, spec=spec)
+        
+        return self.select_opportunities(
+            snapshot,
+            chains=chains,
+            min_tvl_usd=min_tvl_usd,
+            min_apy=min_apy,
+            max_risk_tier=max_risk_tier,
+            include_stellar_native=include_stellar_native
+        )
+    
+    async def build_snapshot(
+        self,
+        version: int,
+        sources: Optional[List[str]] = None,
+        spec: Optional[FilterSpec] = None
+    ) -> OpportunitySnapshot:
+        """
+        Fetch registered sources concurrently and freeze the results.
+        
+        Slow or failing sources are recorded in the snapshot's source_errors
+        while the others still contribute.
+        
+        Args:
+            version: Version number to stamp on the snapshot
+            sources: Optional subset of source names (default: all registered)
+            spec: Filters pushed down to sources that support them
+                (defaults to the ingest floor)
+            
+        Returns:
+            OpportunitySnapshot with opportunities per source
+        """
+        if spec is None:
+            spec = self.ingest_spec
+        selected = [
+            self._pushdown(source, spec)
+            for name, source in self.sources.items()
+            if sources is None or name in sources
+        ]
+        results = await fetch_sources(selected)
+        
+        return OpportunitySnapshot.build(
+            version=version,
+            by_source={r.name: r.opportunities for r in results if r.ok},
+            source_errors={r.name: r.error for r in results if not r.ok}
+        )
+    
+    def _pushdown(self, source: DataSource, spec: Optional[FilterSpec]) -> DataSource:
+        """Bind spec to a source's filtered fetch, coalescing identical fetches."""
+        if spec is None or spec.is_empty or source.filtered_fetch is None:
+            return source
+        
+        filtered_fetch = source.filtered_fetch
+        return DataSource(
+            name=source.name,
+            fetch=self._inflight.wrap(
+                ("source", source.name, spec),
+                lambda: filtered_fetch(spec)
+            ),
+            timeout_seconds=source.timeout_seconds,
+            lookup=source.lookup
+        )
+    
+    async def lookup_pools(
+        self,
+        snapshot: OpportunitySnapshot,
+        pool_ids: Iterable[str]
+    ) -> Dict[str, Optional[YieldOpportunity]]:
+        """
+        Resolve pool IDs through the snapshot's id index.
+        
+        IDs the snapshot does not have are passed to every source with a
+        lookup, concurrently and within each source's timeout, instead of
+        rebuilding the snapshot. A failing source only leaves its pools
+        unresolved.
+        
+        Args:
+            snapshot: Snapshot to read from
+            pool_ids: Pool IDs
+            
+        Returns:
+            Dict of pool ID -> opportunity (None if no source has it), in input order
+        """
+        found = snapshot.get_many(pool_ids)
+        missing = [pool_id for pool_id, opp in found.items() if opp is None]
+        sources = [source for source in self.sources.values() if source.lookup is not None]
+        if not missing or not sources:
+            return found
+        
+        logger.info(f"{len(missing)} pools not in snapshot v{snapshot.version}, looking them up")
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(source.lookup(missing), timeout=source.timeout_seconds)
+                for source in sources
+            ),
+            return_exceptions=True
+        )
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                error = str(result) or type(result).__name__
+                logger.warning(f"Pool lookup in {source.name} failed: {error}")
+                continue
+            for pool_id, opp in result.items():
+                if opp is not None and found.get(pool_id) is None:
+                    found[pool_id] = opp
+        return found
+    
+    def select_table(
+        self,
+        snapshot: OpportunitySnapshot,
+        chains: Optional[List[str]] = None,
+        min_tvl_usd: Optional[float] = None,
+        min_apy: Optional[float] = None,
+        max_risk_tier: Optional[RiskTier] = None,
+        include_stellar_native: bool = True
+    ) -> OpportunityTable:
+        """
+        Filter a snapshot's columnar table with one vectorized mask.
+        
+        Args:
+            snapshot: Snapshot to read from
+            chains: Filter by specific chains
+            min_tvl_usd: Minimum TVL in USD
+            min_apy: Minimum APY percentage
+            max_risk_tier: Maximum acceptable risk tier
+            include_stellar_native: Include native Stellar DEX pools
+            
+        Returns:
+            OpportunityTable of matching rows
+        """
+        sources = None
+        if not include_stellar_native:
+            sources = [name for name in snapshot.by_source if name != STELLAR_DEX_SOURCE]
+        
+        table = snapshot.table
+        mask = table.filter_mask(
+            chains=chains,
+            sources=sources,
             min_tvl_usd=min_tvl_usd,
             min_apy=min_apy,
             max_risk_tier=max_risk_tier
         )
+        filtered = table.take(mask)
         
         logger.info(
-            f"Aggregated {len(filtered_opportunities)} opportunities "
-            f"from {len(all_opportunities)} total"
+            f"Aggregated {len(filtered)} opportunities "
+            f"from {len(table)} total (snapshot v{snapshot.version})"
         )
         
-        return filtered_opportunities
+        return filtered
+    
+    def select_opportunities(
+        self,
+        snapshot: OpportunitySnapshot,
+        chains: Optional[List[str]] = None,
+        min_tvl_usd: Optional[float] = None,
+        min_apy: Optional[float] = None,
+        max_risk_tier: Optional[RiskTier] = None,
+        include_stellar_native: bool = True
+    ) -> List[YieldOpportunity]:
+        """
+        Select and filter opportunities from a snapshot without any I/O.
+        
+        Args:
+            snapshot: Snapshot to read from
+            chains: Filter by specific chains
+            min_tvl_usd: Minimum TVL in USD
+            min_apy: Minimum APY percentage
+            max_risk_tier: Maximum acceptable risk tier
+            include_stellar_native: Include native Stellar DEX pools
+            
+        Returns:
+            Filtered list of opportunities
+        """
+        return self.select_table(
+            snapshot,
+            chains=chains,
+            min_tvl_usd=min_tvl_usd,
+            min_apy=min_apy,
+            max_risk_tier=max_risk_tier,
+            include_stellar_native=include_stellar_native
+        ).materialize()
     
     def _apply_filters(
         self,
@@ -93,39 +341,20 @@ class DataAggregator:
         min_apy: Optional[float] = None,
         max_risk_tier: Optional[RiskTier] = None
     ) -> List[YieldOpportunity]:
-        """Apply filters to opportunities."""
-        filtered = opportunities
-        
-        # TVL filter
-        if min_tvl_usd is not None:
-            filtered = [
-                opp for opp in filtered
-                if opp.tvl_usd is not None and opp.tvl_usd >= min_tvl_usd
-            ]
-        
-        # APY filter
-        if min_apy is not None:
-            filtered = [
-                opp for opp in filtered
-                if opp.apy is not None and opp.apy >= min_apy
-            ]
-        
-        # Risk tier filter
-        if max_risk_tier is not None:
-            risk_order = {RiskTier.A: 0, RiskTier.B: 1, RiskTier.C: 2, RiskTier.D: 3}
-            max_risk_level = risk_order[max_risk_tier]
-            
-            filtered = [
-                opp for opp in filtered
-                if opp.risk_tier is not None and risk_order[opp.risk_tier] <= max_risk_level
-            ]
-        
-        return filtered
+        """Apply filters to opportunities as vectorized masks."""
+        table = OpportunityTable.from_opportunities(opportunities)
+        mask = table.filter_mask(
+            min_tvl_usd=min_tvl_usd,
+            min_apy=min_apy,
+            max_risk_tier=max_risk_tier
+        )
+        return table.materialize(np.flatnonzero(mask))
     
     def rank_opportunities(
         self,
         opportunities: List[YieldOpportunity],
-        strategy: str = "risk_adjusted"
+        strategy: str = "risk_adjusted",
+        limit: Optional[int] = None
     ) -> List[YieldOpportunity]:
         """
         Rank opportunities by different strategies.
@@ -137,59 +366,41 @@ class DataAggregator:
                 - "max_yield": Highest APY first
                 - "min_risk": Lowest risk first
                 - "sharpe": Risk-adjusted return (simplified)
+            limit: Optional number of top opportunities to return; selects
+                them without sorting the whole list
                 
         Returns:
             Sorted list of opportunities
         """
-        if strategy == "max_yield":
-            return sorted(
-                opportunities,
-                key=lambda x: x.apy or 0,
-                reverse=True
-            )
-        
-        elif strategy == "min_risk":
-            risk_order = {RiskTier.A: 0, RiskTier.B: 1, RiskTier.C: 2, RiskTier.D: 3}
-            return sorted(
-                opportunities,
-                key=lambda x: (
-                    risk_order.get(x.risk_tier, 4),
-                    -(x.apy or 0)
-                )
-            )
-        
-        elif strategy == "sharpe":
-            # Simplified Sharpe ratio: APY / risk_volatility
-            def sharpe_score(opp: YieldOpportunity) -> float:
-                apy = opp.apy or 0
-                volatility = abs(opp.apy_pct_7d or 1) if opp.apy_pct_7d else 1
-                return apy / max(volatility, 0.1)
-            
-            return sorted(
-                opportunities,
-                key=sharpe_score,
-                reverse=True
-            )
+        table = OpportunityTable.from_opportunities(opportunities)
+        if limit is not None:
+            return table.materialize(table.top_k(limit, strategy))
+        return table.materialize(table.rank_order(strategy))
+    
+    def top_opportunities(
+        self,
+        table: OpportunityTable,
+        strategy: str = "risk_adjusted",
+        limit: int = 20
+    ) -> List[YieldOpportunity]:
+        """
+        Rank a table and materialize only the best rows.
         
-        else:  # "risk_adjusted" (default)
-            # Combine risk score and APY
-            def risk_adjusted_score(opp: YieldOpportunity) -> float:
-                apy = opp.apy or 0
-                risk_score = opp.risk_score or 0
-                # Higher risk score = safer, so we add it
-                # Scale: APY weighted 70%, risk 30%
-                return (apy * 0.7) + (risk_score * 3 * 0.3)
+        Args:
+            table: Candidate rows (e.g. from select_table)
+            strategy: Ranking strategy (see rank_opportunities)
+            limit: Number of rows to return
             
-            return sorted(
-                opportunities,
-                key=risk_adjusted_score,
-                reverse=True
-            )
+        Returns:
+            Top opportunities, best first
+        """
+        return table.materialize(table.top_k(limit, strategy))
     
     async def close(self):
         """Close all data source connections."""
         await self.defillama.close()
         await self.stellar.close()
+        await self.client.aclose()
     
     async def __aenter__(self):
         """Async context manager entry."""
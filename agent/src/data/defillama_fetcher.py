@@ -1,10 +1,21 @@
 """DeFiLlama API data fetcher."""
 
+import os
+import time
+from collections import OrderedDict
 import httpx
-from typing import List, Optional, Dict, Any
+import numpy as np
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from loguru import logger
 
 from ..models.yield_opportunity import YieldOpportunity
+from ..utils.http import create_http_client
+from ..utils.http_cache import PayloadCache
+from ..utils.json_stream import iter_json_array
+from ..utils.singleflight import SingleFlight
+from .filters import FilterSpec
+from .ingest import IngestReport, build_opportunities
+from .opportunity_table import TIER_ORDER
 from .risk_scorer import RiskScorer
 
 
@@ -12,87 +23,118 @@ class DefiLlamaFetcher:
     """Fetch yield data from DeFiLlama API."""
     
     BASE_URL = "https://yields.llama.fi"
+    SOURCE = "defillama"
+    # Parsed results kept per (chain, project, spec) for unchanged payloads
+    PARSED_MEMO_SIZE = 32
     
-    def __init__(self, timeout: int = 30):
+    def __init__(
+        self,
+        timeout: int = 30,
+        client: Optional[httpx.AsyncClient] = None,
+        limits: Optional[httpx.Limits] = None,
+        stream: Optional[bool] = None,
+        payload_cache: Optional[PayloadCache] = None
+    ):
         """
         Initialize DeFiLlama fetcher.
         
         Args:
             timeout: Request timeout in seconds
+            client: Optional shared HTTP client (not closed by this fetcher)
+            limits: Optional connection pool limits for an owned client
+            stream: Parse /pools incrementally in fetch_pools
+                (defaults to DEFILLAMA_STREAM or false)
+            payload_cache: Optional on-disk cache used for conditional GETs
         """
+        if stream is None:
+            stream = os.getenv("DEFILLAMA_STREAM", "false").lower() in ("1", "true", "yes")
+        self.stream = stream
         self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        self._owns_client = client is None
+        self.client = client or create_http_client(timeout=timeout, limits=limits)
+        self.last_ingest_report: Optional[IngestReport] = None
+        self.payload_cache = payload_cache
+        self._parsed: "OrderedDict[Tuple, Tuple[str, List[YieldOpportunity], IngestReport, float]]" = OrderedDict()
+        # Pool id -> raw record of every pool in the last /pools payload
+        self._raw_by_id: Optional[Dict[str, Dict[str, Any]]] = None
+        # Pool id -> opportunity built from _raw_by_id by a lookup
+        self._by_id: Dict[str, Optional[YieldOpportunity]] = {}
+        self._inflight = SingleFlight()
     
     async def fetch_pools(
         self,
         chain: Optional[str] = None,
-        project: Optional[str] = None
+        project: Optional[str] = None,
+        spec: Optional[FilterSpec] = None
     ) -> List[YieldOpportunity]:
         """
         Fetch yield pools from DeFiLlama.
         
+        Filters are pushed down into ingest: cheap chain/project/TVL/APY
+        checks run on the raw dicts, survivors are scored in one batch,
+        and only pools that also pass the tier filter become
+        YieldOpportunity models (see build_opportunities for the sampled
+        validation); the counts are kept in last_ingest_report. Every
+        fetch, filtered or not, replaces the pool id index that
+        get_pools_by_id answers from.
+        
         Args:
             chain: Filter by blockchain (e.g., 'Stellar', 'Ethereum')
             project: Filter by project name
+            spec: Optional filters applied before model construction
             
         Returns:
             List of YieldOpportunity objects with risk scores computed
         """
+        if self.stream:
+            return [
+                opportunity
+                async for opportunity in self.stream_pools(chain=chain, project=project, spec=spec)
+            ]
+        
         try:
             url = f"{self.BASE_URL}/pools"
             
-            logger.info(f"Fetching DeFiLlama pools: chain={chain}, project={project}")
+            logger.info(
+                f"Fetching DeFiLlama pools: chain={chain}, project={project}, spec={spec}"
+            )
             
-            response = await self.client.get(url)
-            response.raise_for_status()
+            version = None
+            if self.payload_cache is None:
+                response = await self.client.get(url)
+                response.raise_for_status()
+                data = response.json()
+            else:
+                payload = await self.payload_cache.get(self.client, url, source=self.SOURCE)
+                version = payload.version
+                reused = self._reuse_parsed((chain, project, spec), version)
+                if reused is not None:
+                    # The index already holds this payload version
+                    return reused
+                data = payload.json()
             
-            data = response.json()
+            parse_start = time.perf_counter()
             pools_data = data.get("data", [])
             
             logger.info(f"Fetched {len(pools_data)} pools from DeFiLlama")
+            self._index_raw(pools_data)
             
-            # Parse and filter pools
-            opportunities = []
-            for pool_data in pools_data:
-                try:
-                    # Apply filters
-                    pool_chain = (pool_data.get("chain") or "").lower()
-                    pool_project = (pool_data.get("project") or "").lower()
-                    
-                    # Check if pool has required metrics
-                    if pool_data.get("tvlUsd") is None or pool_data.get("apy") is None:
-                        continue
-                    
-                    # Apply chain filter
-                    if chain and pool_chain != chain.lower():
-                        continue
-                    
-                    # Apply project filter
-                    if project and pool_project != project.lower():
-                        continue
-                    
-                    # Parse predictions if available
-                    predictions = pool_data.get("predictions") or {}
-                    pool_data["predictedClass"] = predictions.get("predictedClass")
-                    pool_data["predictedProbability"] = predictions.get("predictedProbability")
-                    pool_data["binnedConfidence"] = predictions.get("binnedConfidence")
-                    
-                    # Create opportunity
-                    opportunity = YieldOpportunity(**pool_data)
-                    
-                    # Calculate risk score and tier
-                    opportunity.risk_score = RiskScorer.calculate_risk_score(opportunity)
-                    opportunity.risk_tier = RiskScorer.classify_risk_tier(opportunity)
-                    
-                    opportunities.append(opportunity)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to parse pool: {e}")
-                    continue
+            # Cheap checks on the raw dicts
+            candidates = [
+                pool_data for pool_data in pools_data
+                if self._accept_raw(pool_data, chain, project, spec)
+            ]
+            opportunities, self.last_ingest_report = self._build_batch(candidates, spec)
+            if version is not None:
+                self._remember_parsed(
+                    (chain, project, spec), version, opportunities,
+                    (time.perf_counter() - parse_start) * 1000
+                )
             
             logger.info(
                 f"Parsed {len(opportunities)} valid opportunities "
-                f"(chain={chain}, project={project})"
+                f"(chain={chain}, project={project}, "
+                f"{self.last_ingest_report.slow_path} fully validated)"
             )
             
             return opportunities
@@ -104,6 +146,178 @@ class DefiLlamaFetcher:
             logger.error(f"Error fetching DeFiLlama pools: {e}")
             raise
     
+    async def stream_pools(
+        self,
+        chain: Optional[str] = None,
+        project: Optional[str] = None,
+        spec: Optional[FilterSpec] = None,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[YieldOpportunity]:
+        """
+        Stream yield pools from DeFiLlama as the response body arrives.
+        
+        `data[]` items are decoded incrementally from the byte stream and
+        filtered immediately; survivors are scored and built in batches.
+        Peak memory is bounded by batch_size plus the pool id index (the
+        raw record of each pool) rather than the whole payload. Counts are
+        kept in last_ingest_report, and the index replaced, once the
+        stream completes.
+        With a payload_cache the body is written to disk as it streams, and
+        a 304 or connection failure streams the cached body instead.
+        
+        Args:
+            chain: Filter by blockchain (e.g., 'Stellar', 'Ethereum')
+            project: Filter by project name
+            spec: Optional filters applied before model construction
+            batch_size: Pools scored and built together
+                (defaults to DEFILLAMA_STREAM_BATCH_SIZE or 1000)
+            
+        Yields:
+            YieldOpportunity objects with risk scores computed, in payload order
+        """
+        if batch_size is None:
+            batch_size = int(os.getenv("DEFILLAMA_STREAM_BATCH_SIZE", "1000"))
+        
+        url = f"{self.BASE_URL}/pools"
+        logger.info(
+            f"Streaming DeFiLlama pools: chain={chain}, project={project}, spec={spec}"
+        )
+        
+        if self.payload_cache is not None:
+            opened = self.payload_cache.stream(self.client, url, source=self.SOURCE)
+        else:
+            opened = self.client.stream("GET", url)
+        
+        report = IngestReport()
+        seen = kept = 0
+        records: List[Dict[str, Any]] = []
+        async with opened as response:
+            if self.payload_cache is None:
+                response.raise_for_status()
+            
+            batch: List[Dict[str, Any]] = []
+            async for pool_data in iter_json_array(response.aiter_bytes()):
+                seen += 1
+                records.append(pool_data)
+                if self._accept_raw(pool_data, chain, project, spec):
+                    batch.append(pool_data)
+                if len(batch) >= batch_size:
+                    opportunities, batch_report = self._build_batch(batch, spec)
+                    report.merge(batch_report)
+                    kept += len(opportunities)
+                    batch = []
+                    for opportunity in opportunities:
+                        yield opportunity
+            
+            if batch:
+                opportunities, batch_report = self._build_batch(batch, spec)
+                report.merge(batch_report)
+                kept += len(opportunities)
+                for opportunity in opportunities:
+                    yield opportunity
+        
+        self.last_ingest_report = report
+        self._index_raw(records)
+        logger.info(
+            f"Streamed {seen} pools from DeFiLlama, kept {kept} "
+            f"({report.slow_path} fully validated)"
+        )
+    
+    def _index_raw(self, records: List[Dict[str, Any]]):
+        """Replace the id index with the raw records of a complete /pools payload."""
+        # Filters only apply after download, so the payload always lists every pool
+        self._raw_by_id = {
+            pool_data["pool"]: pool_data for pool_data in records if pool_data.get("pool")
+        }
+        self._by_id = {}
+    
+    def _reuse_parsed(
+        self,
+        key: Tuple,
+        version: Optional[str]
+    ) -> Optional[List[YieldOpportunity]]:
+        """Return the memoized result for key if it was parsed from this payload version."""
+        memo = self._parsed.get(key)
+        if version is None or memo is None or memo[0] != version:
+            return None
+        self._parsed.move_to_end(key)
+        _, opportunities, report, parse_ms = memo
+        self.last_ingest_report = report
+        self.payload_cache.record_parsed_reuse(self.SOURCE, parse_ms)
+        logger.info(f"DeFiLlama payload unchanged, reusing {len(opportunities)} parsed pools")
+        return list(opportunities)
+    
+    def _remember_parsed(
+        self,
+        key: Tuple,
+        version: str,
+        opportunities: List[YieldOpportunity],
+        parse_ms: float
+    ):
+        self._parsed[key] = (version, list(opportunities), self.last_ingest_report, parse_ms)
+        self._parsed.move_to_end(key)
+        while len(self._parsed) > self.PARSED_MEMO_SIZE:
+            self._parsed.popitem(last=False)
+    
+    @staticmethod
+    def _accept_raw(
+        pool_data: Dict[str, Any],
+        chain: Optional[str],
+        project: Optional[str],
+        spec: Optional[FilterSpec]
+    ) -> bool:
+        """Apply the cheap raw-dict filters and flatten predictions in place."""
+        try:
+            # Apply filters
+            pool_chain = (pool_data.get("chain") or "").lower()
+            pool_project = (pool_data.get("project") or "").lower()
+            
+            # Check if pool has required metrics
+            if pool_data.get("tvlUsd") is None or pool_data.get("apy") is None:
+                return False
+            
+            # Apply chain filter
+            if chain and pool_chain != chain.lower():
+                return False
+            
+            # Apply project filter
+            if project and pool_project != project.lower():
+                return False
+            
+            # Apply pushed-down numeric filters
+            if spec is not None and not spec.accepts_raw(pool_data):
+                return False
+            
+            # Parse predictions if available
+            predictions = pool_data.get("predictions") or {}
+            pool_data["predictedClass"] = predictions.get("predictedClass")
+            pool_data["predictedProbability"] = predictions.get("predictedProbability")
+            pool_data["binnedConfidence"] = predictions.get("binnedConfidence")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Failed to parse pool: {e}")
+            return False
+    
+    @staticmethod
+    def _build_batch(
+        candidates: List[Dict[str, Any]],
+        spec: Optional[FilterSpec]
+    ) -> Tuple[List[YieldOpportunity], IngestReport]:
+        """Score candidates in one pass, apply the tier filter and build models."""
+        # Calculate risk scores and tiers in one vectorized pass
+        scores, tiers = RiskScorer.score_records(candidates)
+        keep = spec.tier_mask(tiers) if spec is not None else np.ones(len(tiers), dtype=bool)
+        
+        # Build models for the survivors only, via the trusted bulk path
+        survivors = []
+        for index in np.flatnonzero(keep).tolist():
+            pool_data = candidates[index]
+            pool_data["risk_score"] = float(scores[index])
+            pool_data["risk_tier"] = TIER_ORDER[tiers[index]]
+            survivors.append(pool_data)
+        return build_opportunities(survivors, source="defillama")
+    
     async def fetch_chain_pools(self, chain: str) -> List[YieldOpportunity]:
         """
         Fetch pools for a specific chain.
@@ -138,15 +352,54 @@ class DefiLlamaFetcher:
         Returns:
             YieldOpportunity or None if not found
         """
-        pools = await self.fetch_pools()
-        for pool in pools:
-            if pool.pool == pool_id:
-                return pool
-        return None
+        return (await self.get_pools_by_id([pool_id]))[pool_id]
+    
+    async def get_pools_by_id(
+        self,
+        pool_ids: List[str]
+    ) -> Dict[str, Optional[YieldOpportunity]]:
+        """
+        Look up pools by ID from the index of the last /pools payload.
+        
+        DeFiLlama has no per-pool endpoint. The index holds every pool
+        of the payload the last fetch downloaded, and is replaced each
+        time the snapshot is rebuilt (see SnapshotRefresher), so lookups
+        never download inline; only a cold fetcher that has not fetched
+        yet downloads /pools once, shared by concurrent callers. Hits
+        are scored and built on first lookup and reused until the index
+        is replaced.
+        
+        Args:
+            pool_ids: Pool identifiers
+            
+        Returns:
+            Dict of pool ID -> YieldOpportunity (None if not found), in input order
+        """
+        if pool_ids and self._raw_by_id is None:
+            logger.info(f"No DeFiLlama pool index yet, fetching it for {len(pool_ids)} lookups")
+            await self._inflight.do("index", self.fetch_pools)
+        
+        raw_by_id = self._raw_by_id or {}
+        unbuilt = [
+            pool_id for pool_id in dict.fromkeys(pool_ids)
+            if pool_id not in self._by_id and pool_id in raw_by_id
+        ]
+        if unbuilt:
+            # Copies, since the records are shared with the ingest path
+            candidates = [
+                record for record in (dict(raw_by_id[pool_id]) for pool_id in unbuilt)
+                if self._accept_raw(record, None, None, None)
+            ]
+            opportunities, _ = self._build_batch(candidates, None)
+            built = {opp.pool: opp for opp in opportunities}
+            for pool_id in unbuilt:
+                self._by_id[pool_id] = built.get(pool_id)
+        return {pool_id: self._by_id.get(pool_id) for pool_id in pool_ids}
     
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Close the HTTP client if this fetcher owns it."""
+        if self._owns_client:
+            await self.client.aclose()
     
     async def __aenter__(self):
         """Async context manager entry."""
@@ -0,0 +1,137 @@
+"""Filter specifications that can be pushed down into source ingest."""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+import numpy as np
+
+from ..models.yield_opportunity import RiskTier
+from .opportunity_table import TIER_CODES
+
+
+def _lower_set(values: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    if not values:
+        return None
+    return frozenset(v.strip().lower() for v in values)
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """Opportunity filters a source can apply before building models.
+
+    Semantics match OpportunityTable.filter_mask: chains/projects compare
+    case-insensitively and missing TVL, APY or tier never pass their
+    respective filters. Specs are hashable, so identical pushed-down
+    fetches can be coalesced.
+    """
+
+    chains: Optional[FrozenSet[str]] = None
+    projects: Optional[FrozenSet[str]] = None
+    min_tvl_usd: Optional[float] = None
+    min_apy: Optional[float] = None
+    max_risk_tier: Optional[RiskTier] = None
+
+    @classmethod
+    def create(
+        cls,
+        chains: Optional[Iterable[str]] = None,
+        projects: Optional[Iterable[str]] = None,
+        min_tvl_usd: Optional[float] = None,
+        min_apy: Optional[float] = None,
+        max_risk_tier: Optional[RiskTier] = None
+    ) -> "FilterSpec":
+        """
+        Build a normalized spec.
+
+        Args:
+            chains: Allowed chains
+            projects: Allowed projects
+            min_tvl_usd: Minimum TVL in USD
+            min_apy: Minimum APY percentage
+            max_risk_tier: Maximum acceptable risk tier
+
+        Returns:
+            FilterSpec
+        """
+        return cls(
+            chains=_lower_set(chains),
+            projects=_lower_set(projects),
+            min_tvl_usd=float(min_tvl_usd) if min_tvl_usd is not None else None,
+            min_apy=float(min_apy) if min_apy is not None else None,
+            max_risk_tier=max_risk_tier
+        )
+
+    @classmethod
+    def ingest_floor_from_env(cls) -> Optional["FilterSpec"]:
+        """
+        Floor applied when ingesting snapshots shared by all requests.
+
+        Reads INGEST_MIN_TVL_USD and INGEST_MIN_APY (0 or unset disables
+        each). Requests asking for less than the floor will not see the
+        pools below it.
+
+        Returns:
+            FilterSpec, or None when no floor is configured
+        """
+        min_tvl_usd = float(os.getenv("INGEST_MIN_TVL_USD", "0")) or None
+        min_apy = float(os.getenv("INGEST_MIN_APY", "0")) or None
+        spec = cls.create(min_tvl_usd=min_tvl_usd, min_apy=min_apy)
+        return None if spec.is_empty else spec
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the spec lets every opportunity through."""
+        return self == FilterSpec()
+
+    @property
+    def needs_risk_tier(self) -> bool:
+        """Whether accepting a pool depends on its risk tier."""
+        return self.max_risk_tier is not None
+
+    def accepts_raw(self, record: Dict[str, Any]) -> bool:
+        """
+        Cheap checks on a raw DeFiLlama-style dict (camelCase keys).
+
+        Does not evaluate max_risk_tier, which needs the pool's score;
+        see tier_mask.
+
+        Args:
+            record: Raw upstream record
+
+        Returns:
+            True if the record passes the chain, project, TVL and APY checks
+        """
+        if self.chains is not None and (record.get("chain") or "").lower() not in self.chains:
+            return False
+        if self.projects is not None and (record.get("project") or "").lower() not in self.projects:
+            return False
+        if self.min_tvl_usd is not None and not _at_least(record.get("tvlUsd"), self.min_tvl_usd):
+            return False
+        if self.min_apy is not None and not _at_least(record.get("apy"), self.min_apy):
+            return False
+        return True
+
+    def tier_mask(self, tier_codes: np.ndarray) -> np.ndarray:
+        """
+        Vectorized max_risk_tier check over tier codes.
+
+        Args:
+            tier_codes: Tier codes as returned by RiskScorer.score_batch
+
+        Returns:
+            Boolean mask of rows within the maximum tier
+        """
+        tier_codes = np.asarray(tier_codes)
+        if self.max_risk_tier is None:
+            return np.ones(len(tier_codes), dtype=bool)
+        return tier_codes <= TIER_CODES[self.max_risk_tier]
+
+
+def _at_least(value: Any, minimum: float) -> bool:
+    if value is None:
+        return False
+    try:
+        return float(value) >= minimum
+    except (TypeError, ValueError):
+        return False
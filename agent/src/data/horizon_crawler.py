@@ -0,0 +1,292 @@
+"""Paginated crawler for Horizon liquidity pools."""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from ..utils.rate_limit import RateLimiter
+
+PageHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+@dataclass
+class CrawlReport:
+    """Counters from one crawl."""
+
+    full: bool = False
+    pages: int = 0
+    records: int = 0
+    new_pools: int = 0
+    updated_pools: int = 0
+    total_pools: int = 0
+    cursor: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        return {**asdict(self), "elapsed_ms": round(self.elapsed_ms, 1)}
+
+
+class HorizonPoolCrawler:
+    """Crawl every Horizon liquidity pool by following `_links.next` cursors.
+
+    Pages are requested in ascending paging-token order. A producer task
+    fetches and decodes pages into a bounded queue while the consumer
+    merges (and optionally parses) the previous page, so network and CPU
+    work overlap. Pool records and the cursor of the last merged record
+    are persisted.
+
+    A pool's paging token is its id (a hash), not its creation order, so
+    the cursor only splits the id space: an incremental crawl requests
+    the pools whose id sorts after it. That resumes an interrupted sweep
+    where it stopped, but after a completed sweep it only finds the new
+    pools that happen to sort last; new pools elsewhere, reserve changes
+    and removed pools are picked up by the next full sweep, which is
+    merged into the stored set and runs once the last one is older than
+    full_recrawl_seconds.
+
+    Cursor pagination is inherently sequential per crawl; the limiter
+    bounds concurrency and request rate across everything sharing it.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        horizon_url: str = "https://horizon.stellar.org",
+        state_path: Optional[str] = None,
+        page_size: Optional[int] = None,
+        prefetch_pages: Optional[int] = None,
+        full_recrawl_seconds: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_pages: int = 1000,
+        max_retries: int = 3
+    ):
+        """
+        Initialize crawler.
+
+        Args:
+            client: HTTP client
+            horizon_url: Horizon API base URL
+            state_path: JSON file for the cursor and pool records
+                (defaults to HORIZON_CRAWL_STATE_PATH; empty keeps state in memory)
+            page_size: Records per page (defaults to HORIZON_PAGE_SIZE or 200, Horizon's maximum)
+            prefetch_pages: Pages fetched ahead of the consumer
+                (defaults to HORIZON_PREFETCH_PAGES or 2)
+            full_recrawl_seconds: Age after which the next crawl sweeps every
+                pool (defaults to HORIZON_FULL_RECRAWL_SECONDS, else
+                SNAPSHOT_REFRESH_SECONDS or 300, so each periodic snapshot
+                refresh sees current reserves)
+            limiter: Concurrency/rate budget (defaults to RateLimiter.from_env("HORIZON"))
+            max_pages: Safety stop for a single crawl
+            max_retries: Retries for 429 and 5xx responses
+        """
+        if state_path is None:
+            state_path = os.getenv("HORIZON_CRAWL_STATE_PATH", "")
+        self.client = client
+        self.horizon_url = horizon_url.rstrip("/")
+        self.state_path = Path(state_path) if state_path else None
+        self.page_size = page_size or int(os.getenv("HORIZON_PAGE_SIZE", "200"))
+        self.prefetch_pages = prefetch_pages or int(os.getenv("HORIZON_PREFETCH_PAGES", "2"))
+        if full_recrawl_seconds is None:
+            full_recrawl_seconds = float(
+                os.getenv("HORIZON_FULL_RECRAWL_SECONDS")
+                or os.getenv("SNAPSHOT_REFRESH_SECONDS", "300")
+            )
+        self.full_recrawl_seconds = full_recrawl_seconds
+        self.limiter = limiter or RateLimiter.from_env("HORIZON")
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+
+        self.cursor: Optional[str] = None
+        self.full_crawl_at = 0.0
+        self._pools: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._load_state()
+
+    @property
+    def pools(self) -> List[Dict[str, Any]]:
+        """Raw pool records in paging-token order."""
+        return list(self._pools.values())
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    async def crawl(
+        self,
+        on_page: Optional[PageHandler] = None,
+        full: Optional[bool] = None
+    ) -> CrawlReport:
+        """
+        Fetch pools whose id sorts after the persisted cursor (or all pools) and merge them.
+
+        Concurrent calls are serialized so pages are merged in order.
+
+        Args:
+            on_page: Awaited with each page's records after they are merged
+            full: Force (True) or skip (False) a full crawl; by default a
+                full crawl runs when the state is missing or stale
+
+        Returns:
+            CrawlReport
+        """
+        async with self._lock:
+            if full is None:
+                full = (
+                    self.cursor is None
+                    or time.time() - self.full_crawl_at > self.full_recrawl_seconds
+                )
+            return await self._crawl(on_page, full)
+
+    async def _crawl(self, on_page: Optional[PageHandler], full: bool) -> CrawlReport:
+        start = time.perf_counter()
+        started_at = time.time()
+        report = CrawlReport(full=full)
+        pools = self._pools
+        seen = set()
+        cursor = None if full else self.cursor
+
+        queue: "asyncio.Queue[Optional[List[Dict[str, Any]]]]" = asyncio.Queue(
+            maxsize=self.prefetch_pages
+        )
+        producer = asyncio.create_task(self._produce(cursor, queue))
+        completed = False
+        try:
+            while True:
+                records = await queue.get()
+                if records is None:
+                    break
+                report.pages += 1
+                report.records += len(records)
+                for record in records:
+                    pool_id = record.get("id")
+                    if pool_id is None:
+                        continue
+                    if pool_id in pools:
+                        report.updated_pools += 1
+                    else:
+                        report.new_pools += 1
+                    pools[pool_id] = record
+                    seen.add(pool_id)
+                    self.cursor = cursor = record.get("paging_token") or pool_id
+                if on_page is not None:
+                    await on_page(records)
+            # Re-raise any producer failure
+            await producer
+            completed = True
+        finally:
+            if not producer.done():
+                producer.cancel()
+            if full and (report.pages or completed):
+                # An interrupted sweep resumes incrementally from its cursor;
+                # pools that disappeared are pruned only by a completed sweep
+                self.full_crawl_at = started_at
+                if completed:
+                    self._pools = {k: v for k, v in pools.items() if k in seen}
+            # Partial progress is kept: the cursor only covers merged records
+            self._save_state()
+
+        report.total_pools = len(self._pools)
+        report.cursor = self.cursor
+        report.elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Horizon crawl ({'full' if full else 'incremental'}): {report.pages} pages, "
+            f"{report.new_pools} new, {report.updated_pools} updated, "
+            f"{report.total_pools} pools total"
+        )
+        return report
+
+    async def _produce(
+        self,
+        cursor: Optional[str],
+        queue: "asyncio.Queue[Optional[List[Dict[str, Any]]]]"
+    ):
+        """Fetch pages in order, following next links, until an empty or short page."""
+        url: Optional[str] = f"{self.horizon_url}/liquidity_pools"
+        params: Optional[Dict[str, Any]] = {"limit": self.page_size, "order": "asc"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        try:
+            for _ in range(self.max_pages):
+                page = await self._get_page(url, params)
+                records = page.get("_embedded", {}).get("records", [])
+                if records:
+                    await queue.put(records)
+                next_url = page.get("_links", {}).get("next", {}).get("href")
+                if len(records) < self.page_size or not next_url:
+                    break
+                # The next link already carries limit, order and cursor
+                url, params = next_url, None
+            else:
+                logger.warning(f"Horizon crawl stopped after {self.max_pages} pages")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Wake the consumer, which re-raises by awaiting this task
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def _get_page(self, url: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            async with self.limiter:
+                response = await self.client.get(url, params=params)
+            status = response.status_code
+            if (status == 429 or status >= 500) and attempt < self.max_retries:
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = 0.5 * 2 ** attempt
+                attempt += 1
+                logger.warning(f"Horizon returned {status}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def _load_state(self):
+        if self.state_path is None:
+            return
+        try:
+            state = json.loads(self.state_path.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable Horizon crawl state {self.state_path}: {e}")
+            return
+        self.cursor = state.get("cursor")
+        self.full_crawl_at = float(state.get("full_crawl_at", 0.0))
+        self._pools = {record["id"]: record for record in state.get("pools", [])}
+        logger.info(
+            f"Loaded Horizon crawl state: {len(self._pools)} pools, cursor={self.cursor}"
+        )
+
+    def _save_state(self):
+        if self.state_path is None:
+            return
+        state = {
+            "cursor": self.cursor,
+            "full_crawl_at": self.full_crawl_at,
+            "saved_at": time.time(),
+            "pools": list(self._pools.values()),
+        }
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(state))
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not save Horizon crawl state: {e}")
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
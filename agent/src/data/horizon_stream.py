@@ -0,0 +1,317 @@
+"""Live Horizon liquidity pool state from Server-Sent Events streams."""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+from loguru import logger
+
+from ..utils.sse import iter_sse
+
+LIQUIDITY_POOLS_STREAM = "liquidity_pools"
+EFFECTS_STREAM = "effects"
+
+
+@dataclass
+class StreamStats:
+    """Counters for one followed stream."""
+
+    events: int = 0
+    applied: int = 0
+    reconnects: int = 0
+    errors: int = 0
+    cursor: Optional[str] = None
+    last_event_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        return asdict(self)
+
+
+class LivePoolTable:
+    """Liquidity pool records keyed by pool id, updated from stream deltas.
+
+    Every update stores a new record object, so consumers can detect
+    changed pools by identity. version increases with each change.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, Dict[str, Any]] = {}
+        # Pools removed before seeding, which the listing may still contain
+        self._removed_before_seed = set()
+        self.version = 0
+        self.ready = False
+        self.updated_at: Optional[float] = None
+        self.lag_seconds: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    def __contains__(self, pool_id: str) -> bool:
+        return pool_id in self._pools
+
+    def get(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        """Current record for a pool, if known."""
+        return self._pools.get(pool_id)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """All current records."""
+        return list(self._pools.values())
+
+    def upsert(self, record: Dict[str, Any], observed_at: Optional[str] = None):
+        """
+        Insert or update a pool, keeping fields the delta does not carry.
+
+        Args:
+            record: Pool record (or the pool object embedded in an effect)
+            observed_at: ISO-8601 ledger close time of the change, for the lag metric
+        """
+        pool_id = record["id"]
+        existing = self._pools.get(pool_id)
+        self._pools[pool_id] = {**existing, **record} if existing else dict(record)
+        self._changed(observed_at)
+
+    def remove(self, pool_id: str, observed_at: Optional[str] = None):
+        """
+        Remove a pool.
+
+        Args:
+            pool_id: Pool id
+            observed_at: ISO-8601 ledger close time of the change
+        """
+        if not self.ready:
+            self._removed_before_seed.add(pool_id)
+        if self._pools.pop(pool_id, None) is not None:
+            self._changed(observed_at)
+
+    def seed(self, records: Sequence[Dict[str, Any]]) -> int:
+        """
+        Add pools from a full listing without overwriting streamed state.
+
+        Streams are started before the listing is fetched, so any pool
+        already in the table was updated more recently than the listing,
+        and pools removed meanwhile are not added back.
+
+        Args:
+            records: Pool records
+
+        Returns:
+            Number of pools added
+        """
+        added = 0
+        for record in records:
+            pool_id = record.get("id")
+            if (pool_id is not None and pool_id not in self._pools
+                    and pool_id not in self._removed_before_seed):
+                self._pools[pool_id] = dict(record)
+                added += 1
+        self._removed_before_seed.clear()
+        self.ready = True
+        self.version += 1
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        """Table size, readiness and lag."""
+        return {
+            "pools": len(self._pools),
+            "ready": self.ready,
+            "version": self.version,
+            "lag_seconds": round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            "seconds_since_update": (
+                round(time.time() - self.updated_at, 3) if self.updated_at is not None else None
+            ),
+        }
+
+    def _changed(self, observed_at: Optional[str]):
+        self.version += 1
+        self.updated_at = time.time()
+        closed_at = parse_horizon_time(observed_at)
+        if closed_at is not None:
+            self.lag_seconds = max(0.0, self.updated_at - closed_at)
+
+
+class HorizonLiveStream:
+    """Follow Horizon SSE streams and apply pool deltas to a LivePoolTable.
+
+    Each stream is followed by its own task. After a drop (or Horizon's
+    periodic stream close) it reconnects from the last event id, so no
+    delta is skipped, backing off exponentially while connections fail.
+    The effects stream carries every ledger effect; only liquidity pool
+    effects, which embed the pool's new state, are applied.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        horizon_url: str = "https://horizon.stellar.org",
+        table: Optional[LivePoolTable] = None,
+        streams: Sequence[str] = (LIQUIDITY_POOLS_STREAM, EFFECTS_STREAM),
+        seed: Optional[Callable[[], Awaitable[List[Dict[str, Any]]]]] = None,
+        reconnect_seconds: Optional[float] = None,
+        max_reconnect_seconds: Optional[float] = None,
+        read_timeout: float = 120.0
+    ):
+        """
+        Initialize live stream.
+
+        Args:
+            client: HTTP client
+            horizon_url: Horizon API base URL
+            table: Table to update (a new one by default)
+            streams: Horizon collections to follow
+            seed: Loads the full pool listing; runs alongside the streams
+            reconnect_seconds: Initial reconnect delay
+                (defaults to HORIZON_STREAM_RECONNECT_SECONDS or 1)
+            max_reconnect_seconds: Reconnect backoff cap
+                (defaults to HORIZON_STREAM_MAX_RECONNECT_SECONDS or 30)
+            read_timeout: Seconds without data before reconnecting
+        """
+        if reconnect_seconds is None:
+            reconnect_seconds = float(os.getenv("HORIZON_STREAM_RECONNECT_SECONDS", "1"))
+        if max_reconnect_seconds is None:
+            max_reconnect_seconds = float(os.getenv("HORIZON_STREAM_MAX_RECONNECT_SECONDS", "30"))
+        self.client = client
+        self.horizon_url = horizon_url.rstrip("/")
+        # An empty table is falsy (it has __len__)
+        self.table = table if table is not None else LivePoolTable()
+        self.seed = seed
+        self.reconnect_seconds = reconnect_seconds
+        self.max_reconnect_seconds = max_reconnect_seconds
+        self.timeout = httpx.Timeout(10.0, read=read_timeout)
+        self.streams: Dict[str, StreamStats] = {name: StreamStats() for name in streams}
+        self._appliers = {
+            LIQUIDITY_POOLS_STREAM: self._apply_pool,
+            EFFECTS_STREAM: self._apply_effect,
+        }
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether any stream task is active."""
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        """Start following the streams (and seeding the table) in the background."""
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._follow(name)) for name in self.streams
+        ]
+        self._tasks.append(asyncio.create_task(self._seed()))
+        logger.info(f"Following Horizon streams: {', '.join(self.streams)}")
+
+    async def stop(self):
+        """Stop all stream tasks."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Table metrics and per-stream counters."""
+        return {
+            "table": self.table.stats(),
+            "streams": {name: stats.to_dict() for name, stats in self.streams.items()},
+        }
+
+    async def _seed(self):
+        if self.seed is None:
+            self.table.ready = True
+            return
+        delay = self.reconnect_seconds
+        while True:
+            try:
+                added = self.table.seed(await self.seed())
+                logger.info(f"Seeded live pool table with {added} pools ({len(self.table)} total)")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Seeding live pool table failed: {e}; retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_seconds)
+
+    async def _follow(self, name: str):
+        stats = self.streams[name]
+        apply = self._appliers[name]
+        url = f"{self.horizon_url}/{name}"
+        delay = self.reconnect_seconds
+
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if stats.cursor is not None:
+                headers["Last-Event-ID"] = stats.cursor
+            params = {"cursor": stats.cursor or "now"}
+            try:
+                async with self.client.stream(
+                    "GET", url, params=params, headers=headers, timeout=self.timeout
+                ) as response:
+                    response.raise_for_status()
+                    async for event in iter_sse(response.aiter_lines()):
+                        if event.event != "message":
+                            continue
+                        try:
+                            payload = json.loads(event.data)
+                        except ValueError:
+                            continue
+                        # Horizon also sends "hello"/"byebye" string messages
+                        if not isinstance(payload, dict):
+                            continue
+                        stats.events += 1
+                        if apply(payload):
+                            stats.applied += 1
+                        if event.id:
+                            stats.cursor = event.id
+                        stats.last_event_at = time.time()
+                        delay = self.reconnect_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.errors += 1
+                stats.last_error = str(e) or type(e).__name__
+                logger.warning(f"Horizon {name} stream dropped: {stats.last_error}")
+
+            stats.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(max(delay, self.reconnect_seconds) * 2, self.max_reconnect_seconds)
+
+    def _apply_pool(self, record: Dict[str, Any]) -> bool:
+        if not record.get("id"):
+            return False
+        self.table.upsert(record, record.get("last_modified_time"))
+        return True
+
+    def _apply_effect(self, effect: Dict[str, Any]) -> bool:
+        effect_type = effect.get("type") or ""
+        if not effect_type.startswith("liquidity_pool"):
+            return False
+        if effect_type == "liquidity_pool_removed":
+            pool_id = effect.get("liquidity_pool_id")
+            if pool_id:
+                self.table.remove(pool_id, effect.get("created_at"))
+            return bool(pool_id)
+        pool = effect.get("liquidity_pool")
+        if not isinstance(pool, dict) or not pool.get("id"):
+            return False
+        self.table.upsert(pool, effect.get("created_at"))
+        return True
+
+
+def parse_horizon_time(value: Optional[str]) -> Optional[float]:
+    """Unix timestamp of a Horizon ISO-8601 time (None if missing or malformed)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
@@ -0,0 +1,342 @@
+"""Bulk construction of YieldOpportunity models from raw upstream records."""
+
+import gc
+import os
+import typing
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+from pydantic import BaseModel
+
+from ..models.yield_opportunity import YieldOpportunity, RiskTier
+
+# Fields the model lowercases in its field_validators
+LOWERCASE_FIELDS = frozenset({"predicted_class", "il_risk", "exposure"})
+
+
+def _field_kind(annotation: Any) -> str:
+    """Collapse a field annotation to the kind checked on the fast path."""
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        annotation = args[0]
+    if typing.get_origin(annotation) in (list, List):
+        return "str_list"
+    return {float: "float", str: "str", bool: "bool", RiskTier: "tier"}[annotation]
+
+
+# Raw key (alias or field name) -> field name, and field name -> kind
+FIELD_BY_KEY: Dict[str, str] = {}
+FIELD_KINDS: Dict[str, str] = {}
+for _name, _info in YieldOpportunity.model_fields.items():
+    FIELD_KINDS[_name] = _field_kind(_info.annotation)
+    FIELD_BY_KEY[_name] = _name
+    if _info.alias:
+        FIELD_BY_KEY[_info.alias] = _name
+REQUIRED_FIELDS = frozenset(
+    name for name, info in YieldOpportunity.model_fields.items() if info.is_required()
+)
+
+
+# Raw key -> (field name, kind, lowercase?) for the single normalization pass
+KEY_SPECS: Dict[str, Tuple[str, str, bool]] = {
+    key: (name, FIELD_KINDS[name], name in LOWERCASE_FIELDS)
+    for key, name in FIELD_BY_KEY.items()
+}
+
+# Every optional field defaults to None, so the defaults can be shared
+# (checked by _check_trusted_layout)
+DEFAULTS: Dict[str, Any] = {
+    name: info.default
+    for name, info in YieldOpportunity.model_fields.items()
+    if not info.is_required()
+}
+
+
+class SchemaDrift(ValueError):
+    """A raw record does not have the shape the fast path expects."""
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a raw record onto model field names in one pass.
+
+    Resolves aliases, lowercases the fields the model lowercases, widens
+    ints to floats and ignores unknown keys, mirroring what full
+    validation would produce for well-formed input.
+
+    Args:
+        record: Raw DeFiLlama- or Horizon-derived dict
+
+    Returns:
+        Dict keyed by field name, suitable for construct_trusted
+
+    Raises:
+        SchemaDrift: If a value has an unexpected type or a required
+            field is missing
+    """
+    values: Dict[str, Any] = {}
+    for key, value in record.items():
+        spec = KEY_SPECS.get(key)
+        if spec is None:
+            continue
+        name, kind, lowercase = spec
+        if value is not None:
+            value_type = type(value)
+            if kind == "float":
+                if value_type is int:
+                    value = float(value)
+                elif value_type is not float:
+                    raise SchemaDrift(f"{key}: expected number, got {value_type.__name__}")
+            elif kind == "str":
+                if value_type is not str:
+                    raise SchemaDrift(f"{key}: expected string, got {value_type.__name__}")
+                if lowercase:
+                    value = value.lower()
+            elif kind == "bool":
+                if value_type is not bool:
+                    raise SchemaDrift(f"{key}: expected bool, got {value_type.__name__}")
+            elif kind == "str_list":
+                if value_type is not list or not all(type(item) is str for item in value):
+                    raise SchemaDrift(f"{key}: expected list of strings")
+            elif kind == "tier":
+                if value_type is not RiskTier:
+                    raise SchemaDrift(f"{key}: expected RiskTier, got {value_type.__name__}")
+        values[name] = value
+
+    for name in REQUIRED_FIELDS:
+        if values.get(name) is None:
+            raise SchemaDrift(f"{name}: missing")
+    return values
+
+
+_new_model = object.__new__
+_set_attr = object.__setattr__
+
+
+def construct_trusted(values: Dict[str, Any]) -> YieldOpportunity:
+    """
+    Create a YieldOpportunity from normalized values without validation.
+
+    Equivalent to YieldOpportunity.model_construct(**values) for output
+    of normalize_record, without its per-field default handling, which
+    makes model_construct several times slower than even full
+    validation. This writes pydantic's instance attributes directly, so
+    _check_trusted_layout verifies them against model_validate when the
+    module is imported.
+
+    Args:
+        values: Output of normalize_record
+
+    Returns:
+        YieldOpportunity
+    """
+    model = _new_model(YieldOpportunity)
+    fields = DEFAULTS.copy()
+    fields.update(values)
+    _set_attr(model, "__dict__", fields)
+    _set_attr(model, "__pydantic_fields_set__", set(values))
+    _set_attr(model, "__pydantic_extra__", None)
+    _set_attr(model, "__pydantic_private__", None)
+    return model
+
+
+# Instance attributes construct_trusted writes, which must be all of BaseModel's
+TRUSTED_SLOTS = (
+    "__dict__", "__pydantic_fields_set__", "__pydantic_extra__", "__pydantic_private__"
+)
+_PROBE_VALUES = {
+    "float": 1.5, "str": "Probe", "bool": True, "str_list": ["probe"], "tier": RiskTier.A,
+}
+
+
+def _check_trusted_layout():
+    """
+    Check construct_trusted still builds what model_validate builds.
+
+    Raises:
+        RuntimeError: If pydantic's instance layout or the model's
+            defaults no longer match what construct_trusted assumes
+    """
+    if set(BaseModel.__slots__) != set(TRUSTED_SLOTS):
+        raise RuntimeError(
+            f"pydantic BaseModel slots changed to {BaseModel.__slots__}; "
+            "update construct_trusted"
+        )
+    not_none = sorted(name for name, value in DEFAULTS.items() if value is not None)
+    if not_none:
+        raise RuntimeError(f"construct_trusted assumes None defaults, not for {not_none}")
+
+    for probe in (
+        {name: _PROBE_VALUES[kind] for name, kind in FIELD_KINDS.items()},
+        {name: _PROBE_VALUES[FIELD_KINDS[name]] for name in REQUIRED_FIELDS},
+    ):
+        trusted = construct_trusted(normalize_record(probe))
+        validated = YieldOpportunity.model_validate(probe)
+        for slot in TRUSTED_SLOTS:
+            if getattr(trusted, slot) != getattr(validated, slot):
+                raise RuntimeError(
+                    f"construct_trusted differs from model_validate in {slot}; "
+                    "update construct_trusted"
+                )
+
+
+_check_trusted_layout()
+
+
+@dataclass
+class IngestReport:
+    """Counters from one bulk ingest."""
+
+    total: int = 0
+    fast: int = 0
+    validated: int = 0
+    sampled: int = 0
+    dropped: int = 0
+    drift_detected: bool = False
+    drift_reasons: List[str] = field(default_factory=list)
+
+    @property
+    def slow_path(self) -> int:
+        """Records that went through full pydantic validation."""
+        return self.validated + self.sampled
+
+    def merge(self, other: "IngestReport"):
+        """Add another report's counters into this one."""
+        self.total += other.total
+        self.fast += other.fast
+        self.validated += other.validated
+        self.sampled += other.sampled
+        self.dropped += other.dropped
+        self.drift_detected = self.drift_detected or other.drift_detected
+        self.drift_reasons.extend(other.drift_reasons[:max(0, 10 - len(self.drift_reasons))])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        return {
+            "total": self.total,
+            "fast": self.fast,
+            "validated": self.validated,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "slow_path": self.slow_path,
+            "drift_detected": self.drift_detected,
+            "drift_reasons": list(self.drift_reasons),
+        }
+
+
+@contextmanager
+def _gc_paused():
+    """Pause cyclic GC while allocating many objects that are all kept."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def build_opportunities(
+    records: Sequence[Dict[str, Any]],
+    sample_every: Optional[int] = None,
+    source: str = "ingest"
+) -> Tuple[List[YieldOpportunity], IngestReport]:
+    """
+    Build models in bulk, validating fully only where needed.
+
+    Records are normalized and constructed without per-field validation
+    (see construct_trusted). A record whose shape does not match the
+    expected schema is validated individually instead. Every
+    sample_every-th record is also validated and compared against its
+    fast-built model; any mismatch is treated as schema drift and the
+    whole batch is rebuilt with full validation. Cyclic garbage
+    collection is paused for the duration, since every allocated model
+    is retained and generation-0 collections would otherwise rescan them
+    repeatedly.
+
+    Args:
+        records: Raw records (aliases or field names as keys)
+        sample_every: Validate one in this many records
+            (defaults to INGEST_VALIDATE_SAMPLE_EVERY or 100; 0 disables)
+        source: Name used in log messages
+
+    Returns:
+        Tuple of (opportunities in input order, IngestReport); records
+        that fail validation are dropped
+    """
+    if sample_every is None:
+        sample_every = int(os.getenv("INGEST_VALIDATE_SAMPLE_EVERY", "100"))
+
+    with _gc_paused():
+        opportunities, report = _build(records, sample_every, source)
+
+    logger.info(
+        f"{source}: built {len(opportunities)} opportunities "
+        f"({report.fast} fast, {report.slow_path} validated, {report.dropped} dropped)"
+    )
+    return opportunities, report
+
+
+def _build(
+    records: Sequence[Dict[str, Any]],
+    sample_every: int,
+    source: str
+) -> Tuple[List[YieldOpportunity], IngestReport]:
+    report = IngestReport(total=len(records))
+    opportunities: List[YieldOpportunity] = []
+
+    for index, record in enumerate(records):
+        try:
+            values = normalize_record(record)
+        except SchemaDrift as e:
+            if len(report.drift_reasons) < 10:
+                report.drift_reasons.append(str(e))
+            report.validated += 1
+            opportunity = _validate(record, report, source)
+            if opportunity is not None:
+                opportunities.append(opportunity)
+            continue
+
+        opportunity = construct_trusted(values)
+
+        if sample_every and index % sample_every == 0:
+            report.sampled += 1
+            validated = _validate(record, report, source)
+            if validated is None or validated.model_dump() != opportunity.model_dump():
+                report.drift_detected = True
+                report.drift_reasons.append(f"sample {index} differs from validated model")
+                break
+
+        report.fast += 1
+        opportunities.append(opportunity)
+
+    if report.drift_detected:
+        logger.warning(
+            f"{source}: schema drift detected, validating all {len(records)} records"
+        )
+        drift_reasons = report.drift_reasons
+        report = IngestReport(
+            total=len(records), drift_detected=True, drift_reasons=drift_reasons
+        )
+        opportunities = []
+        for record in records:
+            report.validated += 1
+            opportunity = _validate(record, report, source)
+            if opportunity is not None:
+                opportunities.append(opportunity)
+
+    return opportunities, report
+
+
+def _validate(
+    record: Dict[str, Any],
+    report: IngestReport,
+    source: str
+) -> Optional[YieldOpportunity]:
+    try:
+        return YieldOpportunity(**record)
+    except Exception as e:
+        report.dropped += 1
+        logger.warning(f"{source}: failed to parse pool: {e}")
+        return None
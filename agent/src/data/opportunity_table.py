@@ -0,0 +1,448 @@
+"""Columnar (struct-of-arrays) store for yield opportunities."""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..models.yield_opportunity import YieldOpportunity, RiskTier
+
+# Tier codes follow risk order; pools without a tier sort after D
+TIER_ORDER: Tuple[RiskTier, ...] = (RiskTier.A, RiskTier.B, RiskTier.C, RiskTier.D)
+TIER_CODES: Dict[RiskTier, int] = {tier: code for code, tier in enumerate(TIER_ORDER)}
+TIER_MISSING = len(TIER_ORDER)
+
+# Float column -> raw DeFiLlama key
+FLOAT_COLUMNS: Dict[str, str] = {
+    "tvl_usd": "tvlUsd",
+    "apy": "apy",
+    "apy_base": "apyBase",
+    "apy_reward": "apyReward",
+    "apy_mean_30d": "apyMean30d",
+    "apy_pct_7d": "apyPct7D",
+    "risk_score": "risk_score",
+}
+
+# Categorical column -> raw DeFiLlama key (values are stored lowercase)
+CATEGORICAL_COLUMNS: Dict[str, str] = {
+    "chain": "chain",
+    "project": "project",
+    "exposure": "exposure",
+    "il_risk": "ilRisk",
+}
+
+Row = Union[YieldOpportunity, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class Categorical:
+    """Dictionary-encoded string column (code -1 means missing)."""
+
+    codes: np.ndarray
+    categories: Tuple[str, ...]
+
+    @classmethod
+    def encode(cls, values: Iterable[Optional[str]]) -> "Categorical":
+        """Encode lowercase string values into integer codes."""
+        # Factorize raw values first (one dict lookup per row), then fold
+        # case and merge duplicates over the much smaller set of distinct values
+        raw: Dict[Any, int] = {None: -1}
+        raw_codes = np.fromiter(
+            (raw.setdefault(value, len(raw) - 1) for value in values), dtype=np.int32
+        )
+        lookup: Dict[str, int] = {}
+        remap = np.empty(len(raw), dtype=np.int32)
+        remap[-1] = -1
+        for value, code in raw.items():
+            if value is not None:
+                remap[code] = lookup.setdefault(str(value).lower(), len(lookup))
+        return cls(remap[raw_codes], tuple(lookup))
+
+    @classmethod
+    def concat(cls, columns: Sequence["Categorical"]) -> "Categorical":
+        """Concatenate columns, re-encoding codes against the union of categories."""
+        lookup: Dict[str, int] = {}
+        parts = []
+        for column in columns:
+            remap = np.empty(len(column.categories) + 1, dtype=np.int32)
+            remap[-1] = -1
+            for code, value in enumerate(column.categories):
+                remap[code] = lookup.setdefault(value, len(lookup))
+            parts.append(remap[column.codes])
+        codes = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+        return cls(codes, tuple(lookup))
+
+    def take(self, indices: np.ndarray) -> "Categorical":
+        """Select rows by index."""
+        return Categorical(self.codes[indices], self.categories)
+
+    def isin(self, values: Iterable[str]) -> np.ndarray:
+        """Boolean mask of rows whose value is one of values (case-insensitive)."""
+        wanted = {v.lower() for v in values}
+        wanted_codes = [code for code, value in enumerate(self.categories) if value in wanted]
+        return np.isin(self.codes, wanted_codes)
+
+    def values(self) -> List[Optional[str]]:
+        """Decode back to strings."""
+        return [self.categories[c] if c >= 0 else None for c in self.codes.tolist()]
+
+
+def _as_float(value: Any) -> float:
+    return float(value) if value is not None else np.nan
+
+
+class OpportunityTable:
+    """Struct-of-arrays view over a set of opportunities.
+
+    Numeric fields are float64 arrays (NaN for missing), string fields are
+    dictionary-encoded, risk tiers are int8 codes and stablecoin is a bool
+    mask. Filtering and ranking run as vectorized array operations; full
+    YieldOpportunity objects are only produced by materialize() for the
+    rows that are actually returned.
+
+    Tables are immutable. take() returns a new table sharing the
+    underlying row storage.
+    """
+
+    def __init__(
+        self,
+        rows: Sequence[Row],
+        row_ids: np.ndarray,
+        floats: Dict[str, np.ndarray],
+        categoricals: Dict[str, Categorical],
+        tier: np.ndarray,
+        stablecoin: np.ndarray
+    ):
+        """Initialize from prepared columns (use the from_* constructors)."""
+        self._rows = rows
+        self.row_ids = row_ids
+        self.floats = floats
+        self.categoricals = categoricals
+        self.tier = tier
+        self.stablecoin = stablecoin
+        self._rank_keys: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def empty(cls) -> "OpportunityTable":
+        """Create a table with no rows."""
+        return cls.from_opportunities([])
+
+    @classmethod
+    def from_opportunities(
+        cls,
+        opportunities: Sequence[YieldOpportunity],
+        source: Optional[str] = None
+    ) -> "OpportunityTable":
+        """
+        Build a table from YieldOpportunity models.
+
+        Args:
+            opportunities: Opportunities to encode
+            source: Optional source name recorded in the "source" column
+
+        Returns:
+            OpportunityTable whose rows materialize to the given objects
+        """
+        rows = list(opportunities)
+        floats = {
+            column: np.fromiter(
+                (_as_float(getattr(opp, column)) for opp in rows),
+                dtype=np.float64,
+                count=len(rows)
+            )
+            for column in FLOAT_COLUMNS
+        }
+        categoricals = {
+            column: Categorical.encode(getattr(opp, column) for opp in rows)
+            for column in CATEGORICAL_COLUMNS
+        }
+        categoricals["source"] = Categorical.encode(source for _ in rows)
+        tier = np.fromiter(
+            (TIER_CODES.get(opp.risk_tier, TIER_MISSING) for opp in rows),
+            dtype=np.int8,
+            count=len(rows)
+        )
+        stablecoin = np.fromiter(
+            (bool(opp.stablecoin) for opp in rows), dtype=bool, count=len(rows)
+        )
+        return cls(rows, np.arange(len(rows)), floats, categoricals, tier, stablecoin)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Sequence[Dict[str, Any]],
+        source: Optional[str] = None,
+        risk_scores: Optional[np.ndarray] = None,
+        risk_tiers: Optional[np.ndarray] = None
+    ) -> "OpportunityTable":
+        """
+        Build a table from raw upstream records without creating models.
+
+        Args:
+            records: Raw DeFiLlama-style dicts (camelCase keys)
+            source: Optional source name recorded in the "source" column
+            risk_scores: Optional precomputed risk scores (float array)
+            risk_tiers: Optional precomputed tier codes (see TIER_CODES)
+
+        Returns:
+            OpportunityTable whose rows are validated into models lazily
+        """
+        rows = list(records)
+        n = len(rows)
+        floats = {
+            column: np.fromiter(
+                (_as_float(record.get(key)) for record in rows), dtype=np.float64, count=n
+            )
+            for column, key in FLOAT_COLUMNS.items()
+        }
+        if risk_scores is not None:
+            floats["risk_score"] = np.asarray(risk_scores, dtype=np.float64)
+        categoricals = {
+            column: Categorical.encode(record.get(key) for record in rows)
+            for column, key in CATEGORICAL_COLUMNS.items()
+        }
+        categoricals["source"] = Categorical.encode(source for _ in rows)
+        if risk_tiers is not None:
+            tier = np.asarray(risk_tiers, dtype=np.int8)
+        else:
+            tier = np.fromiter(
+                (TIER_CODES.get(_tier_or_none(r.get("risk_tier")), TIER_MISSING) for r in rows),
+                dtype=np.int8,
+                count=n
+            )
+        stablecoin = np.fromiter(
+            (bool(record.get("stablecoin")) for record in rows), dtype=bool, count=n
+        )
+        return cls(rows, np.arange(n), floats, categoricals, tier, stablecoin)
+
+    @classmethod
+    def concat(cls, tables: Sequence["OpportunityTable"]) -> "OpportunityTable":
+        """Concatenate tables into one (row order preserved)."""
+        tables = [t for t in tables if len(t) > 0] or list(tables[:1])
+        if not tables:
+            return cls.empty()
+        if len(tables) == 1:
+            return tables[0]
+
+        rows: List[Row] = []
+        row_ids = []
+        for table in tables:
+            row_ids.append(table.row_ids + len(rows))
+            rows.extend(table._rows)
+
+        return cls(
+            rows,
+            np.concatenate(row_ids),
+            {
+                column: np.concatenate([t.floats[column] for t in tables])
+                for column in tables[0].floats
+            },
+            {
+                column: Categorical.concat([t.categoricals[column] for t in tables])
+                for column in tables[0].categoricals
+            },
+            np.concatenate([t.tier for t in tables]),
+            np.concatenate([t.stablecoin for t in tables]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Return a float column by name."""
+        return self.floats[column]
+
+    def take(self, indices: np.ndarray) -> "OpportunityTable":
+        """
+        Select rows by position or boolean mask.
+
+        Args:
+            indices: Integer positions or a boolean mask
+
+        Returns:
+            New table sharing row storage with this one
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        table = OpportunityTable(
+            self._rows,
+            self.row_ids[indices],
+            {column: values[indices] for column, values in self.floats.items()},
+            {column: cat.take(indices) for column, cat in self.categoricals.items()},
+            self.tier[indices],
+            self.stablecoin[indices],
+        )
+        # Carry over precomputed ranking keys instead of recomputing them
+        table._rank_keys = {
+            strategy: keys[indices] for strategy, keys in self._rank_keys.items()
+        }
+        return table
+
+    def filter_mask(
+        self,
+        chains: Optional[List[str]] = None,
+        sources: Optional[List[str]] = None,
+        min_tvl_usd: Optional[float] = None,
+        min_apy: Optional[float] = None,
+        max_risk_tier: Optional[RiskTier] = None
+    ) -> np.ndarray:
+        """
+        Compute a vectorized filter mask.
+
+        Missing TVL/APY/tier never pass their respective filters.
+
+        Returns:
+            Boolean array, True for rows that pass every filter
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        if chains:
+            mask &= self.categoricals["chain"].isin(chains)
+        if sources is not None:
+            mask &= self.categoricals["source"].isin(sources)
+        if min_tvl_usd is not None:
+            mask &= self.floats["tvl_usd"] >= min_tvl_usd  # NaN compares False
+        if min_apy is not None:
+            mask &= self.floats["apy"] >= min_apy
+        if max_risk_tier is not None:
+            mask &= self.tier <= TIER_CODES[max_risk_tier]
+
+        return mask
+
+    def rank_order(self, strategy: str = "risk_adjusted") -> np.ndarray:
+        """
+        Row positions sorted by a ranking strategy.
+
+        Orderings (including ties, which keep input order) match
+        DataAggregator.rank_opportunities' sorted() calls.
+
+        Args:
+            strategy: "risk_adjusted", "max_yield", "min_risk" or "sharpe"
+
+        Returns:
+            Integer array of positions, best first
+        """
+        if strategy == "min_risk":
+            # lexsort is stable; last key is primary
+            return np.lexsort((-self.rank_keys("max_yield"), self.tier))
+
+        return np.argsort(-self.rank_keys(strategy), kind="stable")
+
+    def top_k(self, k: int, strategy: str = "risk_adjusted") -> np.ndarray:
+        """
+        Positions of the k best rows, best first, without a full sort.
+
+        Equivalent to rank_order(strategy)[:k]. The k-th best key is found
+        with a linear-time partition; only rows at least that good (all
+        rows tied with it included, so ties still resolve by input order)
+        are then sorted.
+
+        Args:
+            k: Number of rows to select
+            strategy: "risk_adjusted", "max_yield", "min_risk" or "sharpe"
+
+        Returns:
+            Integer array of at most k positions, best first
+        """
+        n = len(self)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k >= n:
+            return self.rank_order(strategy)
+
+        if strategy == "min_risk":
+            apy = self.rank_keys("max_yield")
+            # Lowest tiers fill the result first; only the tier that
+            # straddles position k needs partitioning by APY
+            counts = np.bincount(self.tier, minlength=TIER_MISSING + 1)
+            cutoff = int(np.searchsorted(np.cumsum(counts), k))
+            in_cutoff = self.tier == cutoff
+            needed = k - int(counts[:cutoff].sum())
+            cutoff_apy = apy[in_cutoff]
+            threshold = np.partition(cutoff_apy, len(cutoff_apy) - needed)[len(cutoff_apy) - needed]
+            candidates = np.flatnonzero((self.tier < cutoff) | (in_cutoff & (apy >= threshold)))
+            order = np.lexsort((-apy[candidates], self.tier[candidates]))
+            return candidates[order[:k]]
+
+        keys = self.rank_keys(strategy)
+        threshold = np.partition(keys, n - k)[n - k]
+        candidates = np.flatnonzero(keys >= threshold)
+        order = np.argsort(-keys[candidates], kind="stable")
+        return candidates[order[:k]]
+
+    def rank_keys(self, strategy: str = "risk_adjusted") -> np.ndarray:
+        """
+        Descending sort key per row for score-based strategies.
+
+        Keys are computed once per table and reused by later calls and by
+        tables derived with take().
+
+        Args:
+            strategy: "risk_adjusted", "max_yield" or "sharpe"
+
+        Returns:
+            Float array; larger is better
+        """
+        keys = self._rank_keys.get(strategy)
+        if keys is None:
+            keys = self._rank_keys[strategy] = self._compute_rank_keys(strategy)
+        return keys
+
+    def precompute_rank_keys(self):
+        """Compute the key arrays for every ranking strategy up front."""
+        for strategy in ("max_yield", "sharpe", "risk_adjusted"):
+            self.rank_keys(strategy)
+
+    def _compute_rank_keys(self, strategy: str) -> np.ndarray:
+        apy = np.nan_to_num(self.floats["apy"], nan=0.0)
+
+        if strategy == "max_yield":
+            return apy
+
+        if strategy == "sharpe":
+            pct_7d = self.floats["apy_pct_7d"]
+            volatility = np.where(np.isnan(pct_7d) | (pct_7d == 0), 1.0, np.abs(pct_7d))
+            return apy / np.maximum(volatility, 0.1)
+
+        risk_score = np.nan_to_num(self.floats["risk_score"], nan=0.0)
+        return (apy * 0.7) + (risk_score * 3 * 0.3)
+
+    def materialize(self, indices: Optional[np.ndarray] = None) -> List[YieldOpportunity]:
+        """
+        Build YieldOpportunity objects for selected rows.
+
+        Rows created from raw records are validated into models on first
+        use (with risk fields taken from the table) and memoized.
+
+        Args:
+            indices: Optional positions to materialize (default: all rows)
+
+        Returns:
+            List of opportunities in the given order
+        """
+        positions = np.arange(len(self)) if indices is None else np.asarray(indices)
+        return [self._materialize_row(int(pos)) for pos in positions]
+
+    def _materialize_row(self, pos: int) -> YieldOpportunity:
+        row_id = int(self.row_ids[pos])
+        row = self._rows[row_id]
+        if isinstance(row, YieldOpportunity):
+            return row
+
+        opportunity = YieldOpportunity(**row)
+        score = self.floats["risk_score"][pos]
+        tier = int(self.tier[pos])
+        opportunity.risk_score = None if np.isnan(score) else float(score)
+        opportunity.risk_tier = TIER_ORDER[tier] if tier < TIER_MISSING else None
+        self._rows[row_id] = opportunity
+        return opportunity
+
+
+def _tier_or_none(value: Any) -> Optional[RiskTier]:
+    if value is None or isinstance(value, RiskTier):
+        return value
+    try:
+        return RiskTier(value)
+    except ValueError:
+        return None
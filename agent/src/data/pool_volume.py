@@ -0,0 +1,414 @@
+"""Rolling trade volume and fee APY for Stellar liquidity pools."""
+
+import asyncio
+import math
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from loguru import logger
+
+from ..utils.rate_limit import RateLimiter
+from .horizon_stream import parse_horizon_time
+from .price_resolver import NATIVE_ASSET
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 24 * HOUR_SECONDS
+HISTORY_DAYS = 30
+PAGE_SIZE = 200
+
+
+@dataclass
+class PoolYield:
+    """Fee yield of one pool; volumes are in units of its first reserve asset."""
+
+    apy: float
+    apy_mean_30d: Optional[float]
+    apy_pct_7d: Optional[float]
+    volume_24h: float
+    volume_7d: float
+
+
+@dataclass
+class VolumeUpdateReport:
+    """Counters from one PoolVolumeTracker.update."""
+
+    trades: int = 0
+    pages: int = 0
+    backfilled_pools: int = 0
+    pending_backfill: int = 0
+    caught_up: bool = True
+    cursor: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        return {**asdict(self), "elapsed_ms": round(self.elapsed_ms, 1)}
+
+
+class _PoolVolume:
+    """Hourly volume buckets of one pool."""
+
+    __slots__ = ("unit_asset", "buckets", "tracked_since")
+
+    def __init__(self, unit_asset: str, tracked_since: float):
+        self.unit_asset = unit_asset
+        self.buckets: Dict[int, float] = {}
+        self.tracked_since = tracked_since
+
+    def add(self, timestamp: float, amount: float):
+        hour = int(timestamp // HOUR_SECONDS)
+        self.buckets[hour] = self.buckets.get(hour, 0.0) + amount
+
+    def window(self, end: float, seconds: float) -> float:
+        """Volume in the hours ending with the one containing end."""
+        last = int(end // HOUR_SECONDS)
+        first = last - int(seconds // HOUR_SECONDS)
+        return sum(v for hour, v in self.buckets.items() if first < hour <= last)
+
+    def since(self, start: float) -> float:
+        """Volume from the hour containing start onwards."""
+        first = int(start // HOUR_SECONDS)
+        return sum(v for hour, v in self.buckets.items() if hour >= first)
+
+    def prune(self, oldest: float):
+        first = int(oldest // HOUR_SECONDS)
+        for hour in [hour for hour in self.buckets if hour < first]:
+            del self.buckets[hour]
+
+
+class PoolVolumeTracker:
+    """Rolling 24h/7d/30d trade volume per Stellar liquidity pool.
+
+    Volume is accumulated in hourly buckets, in units of each pool's
+    first reserve asset. A constant-product pool holds equal value in
+    both reserves, so fee APY (volume x fee / TVL) needs no prices:
+    fee x volume / (2 x first reserve).
+
+    All liquidity pool trades are followed from one global cursor, so an
+    update only requests trades newer than the last paging token seen.
+    Pools handed to track() are backfilled on a later update from the
+    pool's own trades endpoint, newest first, up to the global cursor,
+    so no trade is counted twice or missed.
+
+    Updates run in a background task (see start) and each one spends at
+    most rate_share of the limiter's request rate over the update
+    interval; new pools wait for a later update once that is used up.
+    Readers only call pool_yield, which never touches the network.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        horizon_url: str = "https://horizon.stellar.org",
+        limiter: Optional[RateLimiter] = None,
+        max_pages: Optional[int] = None,
+        interval_seconds: Optional[float] = None,
+        rate_share: Optional[float] = None
+    ):
+        """
+        Initialize tracker.
+
+        Args:
+            client: HTTP client
+            horizon_url: Horizon API base URL
+            limiter: Concurrency/rate budget (defaults to RateLimiter.from_env("HORIZON"))
+            max_pages: Trade pages per incremental update and per pool backfill
+                (defaults to STELLAR_TRADES_MAX_PAGES or 10)
+            interval_seconds: Seconds between background updates
+                (defaults to STELLAR_VOLUME_UPDATE_SECONDS or 60)
+            rate_share: Share of the limiter's request rate one update may
+                spend (defaults to STELLAR_VOLUME_RATE_SHARE or 0.5)
+        """
+        if max_pages is None:
+            max_pages = int(os.getenv("STELLAR_TRADES_MAX_PAGES", "10"))
+        if interval_seconds is None:
+            interval_seconds = float(os.getenv("STELLAR_VOLUME_UPDATE_SECONDS", "60"))
+        if rate_share is None:
+            rate_share = float(os.getenv("STELLAR_VOLUME_RATE_SHARE", "0.5"))
+        self.client = client
+        self.horizon_url = horizon_url.rstrip("/")
+        self.limiter = limiter or RateLimiter.from_env("HORIZON")
+        self.max_pages = max_pages
+        self.interval_seconds = interval_seconds
+        self.rate_share = rate_share
+        self.cursor: Optional[str] = None
+        self.last_report: Optional[VolumeUpdateReport] = None
+        self._pools: Dict[str, _PoolVolume] = {}
+        # Pools handed to track() that are not backfilled yet
+        self._wanted: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, pool_id: str) -> bool:
+        return pool_id in self._pools
+
+    @property
+    def request_budget(self) -> Optional[int]:
+        """Horizon requests one update may make (None if the limiter has no rate)."""
+        if self.limiter.requests_per_second is None:
+            return None
+        return max(1, int(self.limiter.requests_per_second * self.interval_seconds * self.rate_share))
+
+    def track(self, pools: Sequence[Dict[str, Any]]):
+        """
+        Ask for pools to be tracked; a later update backfills their history.
+
+        Args:
+            pools: Horizon pool records (already tracked pools are ignored)
+        """
+        for pool in pools:
+            pool_id = pool.get("id")
+            if pool_id and pool_id not in self._pools and pool.get("reserves"):
+                self._wanted[pool_id] = pool
+
+    def start(self):
+        """Start updating every interval_seconds in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background updates."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.update()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stellar pool volume update failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def update(self, pools: Sequence[Dict[str, Any]] = ()) -> VolumeUpdateReport:
+        """
+        Fetch trades since the last update and backfill pools waiting to be tracked.
+
+        Following the global feed comes first; backfills then share what
+        is left of request_budget, oldest request first, and pools that
+        do not fit wait for the next update.
+
+        Args:
+            pools: Horizon pool records to track (see track)
+
+        Returns:
+            VolumeUpdateReport
+        """
+        self.track(pools)
+        async with self._lock:
+            start = time.perf_counter()
+            report = VolumeUpdateReport()
+            if not self._wanted and not self._pools:
+                return report
+            try:
+                if self.cursor is None:
+                    self.cursor = await self._latest_token()
+                    report.pages += 1
+                else:
+                    await self._follow(report)
+                await self._backfill_wanted(report)
+            except httpx.HTTPError as e:
+                # Keep the volumes collected so far; the next update resumes from the cursor
+                logger.warning(f"Updating Stellar pool volumes failed: {e}")
+                report.caught_up = False
+
+            report.pending_backfill = len(self._wanted)
+            oldest = time.time() - HISTORY_DAYS * DAY_SECONDS
+            for volume in self._pools.values():
+                volume.prune(oldest)
+            report.cursor = self.cursor
+            report.elapsed_ms = (time.perf_counter() - start) * 1000
+            self.last_report = report
+            return report
+
+    def pool_yield(self, pool: Dict[str, Any], now: Optional[float] = None) -> Optional[PoolYield]:
+        """
+        Fee yield of a tracked pool from its current reserves.
+
+        apy uses the last 24h of volume. apy_mean_30d averages the daily
+        volume over up to 30 tracked days (None before one full day) and
+        apy_pct_7d is the change in percentage points from the 24h APY
+        seven days ago (None until eight days are tracked).
+
+        Args:
+            pool: Horizon pool record
+            now: Reference time (defaults to now)
+
+        Returns:
+            PoolYield, or None if the pool is not tracked or its first reserve is empty
+        """
+        volume = self._pools.get(pool.get("id"))
+        if volume is None:
+            return None
+        reserve = _reserve_amount(pool, volume.unit_asset)
+        if not reserve > 0:
+            return None
+        now = time.time() if now is None else now
+        fee = float(pool.get("fee_bp") or 0) / 10000
+
+        def apy_of(amount: float, days: float) -> float:
+            return fee * amount / days / (2 * reserve) * 365 * 100
+
+        volume_24h = volume.window(now, DAY_SECONDS)
+        apy = apy_of(volume_24h, 1)
+        tracked_days = min(HISTORY_DAYS, (now - volume.tracked_since) / DAY_SECONDS)
+        apy_mean_30d = None
+        if tracked_days >= 1:
+            apy_mean_30d = apy_of(volume.since(now - tracked_days * DAY_SECONDS), tracked_days)
+        apy_pct_7d = None
+        if tracked_days >= 8:
+            apy_pct_7d = apy - apy_of(volume.window(now - 7 * DAY_SECONDS, DAY_SECONDS), 1)
+        return PoolYield(
+            apy=apy,
+            apy_mean_30d=apy_mean_30d,
+            apy_pct_7d=apy_pct_7d,
+            volume_24h=volume_24h,
+            volume_7d=volume.window(now, 7 * DAY_SECONDS),
+        )
+
+    async def _latest_token(self) -> str:
+        """Paging token of the newest liquidity pool trade ("0" if there is none)."""
+        records = await self._get_trades(
+            f"{self.horizon_url}/trades",
+            {"trade_type": "liquidity_pool", "order": "desc", "limit": 1}
+        )
+        return (records[0].get("paging_token") if records else None) or "0"
+
+    async def _follow(self, report: VolumeUpdateReport):
+        """Add trades newer than the cursor to the pools they belong to."""
+        params = {"trade_type": "liquidity_pool", "order": "asc", "limit": PAGE_SIZE}
+        for _ in range(self.max_pages):
+            records = await self._get_trades(
+                f"{self.horizon_url}/trades", {**params, "cursor": self.cursor}
+            )
+            report.pages += 1
+            for trade in records:
+                pool_id = trade.get("base_liquidity_pool_id") or trade.get("counter_liquidity_pool_id")
+                volume = self._pools.get(pool_id)
+                if volume is not None and _add_trade(volume, trade):
+                    report.trades += 1
+                self.cursor = trade.get("paging_token") or self.cursor
+            if len(records) < PAGE_SIZE:
+                return
+        report.caught_up = False
+        logger.info(f"Stellar trade feed still behind after {self.max_pages} pages")
+
+    async def _backfill_wanted(self, report: VolumeUpdateReport):
+        """Backfill waiting pools, limiter.max_concurrency at a time, within the request budget."""
+        budget = self.request_budget
+        remaining = None if budget is None else budget - report.pages
+        waiting = iter(list(self._wanted.values()))
+
+        async def worker():
+            nonlocal remaining
+            for pool in waiting:
+                if remaining is not None and remaining <= 0:
+                    return
+                # Reserve the worst case up front and give back what was not used
+                pages = self.max_pages if remaining is None else min(self.max_pages, remaining)
+                if remaining is not None:
+                    remaining -= pages
+                try:
+                    volume, used = await self._backfill(pool, pages)
+                except httpx.HTTPError as e:
+                    logger.warning(f"Backfilling trades for pool {pool['id']} failed: {e}")
+                    continue
+                if remaining is not None:
+                    remaining += pages - used
+                report.pages += used
+                self._pools[pool["id"]] = volume
+                self._wanted.pop(pool["id"], None)
+                report.backfilled_pools += 1
+
+        await asyncio.gather(*(worker() for _ in range(self.limiter.max_concurrency)))
+
+    async def _backfill(self, pool: Dict[str, Any], max_pages: int) -> Tuple[_PoolVolume, int]:
+        """Volume history of one pool up to the global cursor, and the pages requested."""
+        now = time.time()
+        oldest = now - HISTORY_DAYS * DAY_SECONDS
+        ceiling = _token_key(self.cursor)
+        volume = _PoolVolume(pool["reserves"][0].get("asset"), tracked_since=now)
+        url = f"{self.horizon_url}/liquidity_pools/{pool['id']}/trades"
+        params: Dict[str, Any] = {"order": "desc", "limit": PAGE_SIZE}
+
+        for page in range(1, max_pages + 1):
+            records = await self._get_trades(url, params)
+            for trade in records:
+                if _token_key(trade.get("paging_token")) > ceiling:
+                    # Newer than the cursor: the global feed counts it
+                    continue
+                closed_at = parse_horizon_time(trade.get("ledger_close_time"))
+                if closed_at is None:
+                    continue
+                if closed_at < oldest:
+                    volume.tracked_since = oldest
+                    return volume, page
+                _add_trade(volume, trade, closed_at)
+                volume.tracked_since = min(volume.tracked_since, closed_at)
+            if len(records) < PAGE_SIZE:
+                # The pool's whole trade history is covered
+                return volume, page
+            token = records[-1].get("paging_token")
+            if token is None:
+                return volume, page
+            params = {**params, "cursor": token}
+        return volume, max_pages
+
+    async def _get_trades(self, url: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        async with self.limiter:
+            response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return response.json().get("_embedded", {}).get("records", [])
+
+
+def _add_trade(volume: _PoolVolume, trade: Dict[str, Any], closed_at: Optional[float] = None) -> bool:
+    """Add the amount of the pool's unit asset traded; False if the trade does not include it."""
+    if closed_at is None:
+        closed_at = parse_horizon_time(trade.get("ledger_close_time"))
+    if closed_at is None:
+        return False
+    for side in ("base", "counter"):
+        if _trade_asset(trade, side) == volume.unit_asset:
+            amount = _to_float(trade.get(f"{side}_amount"))
+            if math.isnan(amount):
+                return False
+            volume.add(closed_at, amount)
+            return True
+    return False
+
+
+def _trade_asset(trade: Dict[str, Any], side: str) -> str:
+    if trade.get(f"{side}_asset_type") == "native":
+        return NATIVE_ASSET
+    return f"{trade.get(f'{side}_asset_code')}:{trade.get(f'{side}_asset_issuer')}"
+
+
+def _reserve_amount(pool: Dict[str, Any], asset: str) -> float:
+    for reserve in pool.get("reserves") or []:
+        if reserve.get("asset") == asset:
+            return _to_float(reserve.get("amount"))
+    return math.nan
+
+
+def _token_key(token: Optional[str]) -> Tuple[int, ...]:
+    """Paging tokens ("<operation id>-<index>") ordered numerically."""
+    try:
+        return tuple(int(part) for part in (token or "0").split("-"))
+    except ValueError:
+        return (0,)
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
@@ -0,0 +1,252 @@
+"""USD prices for Stellar assets and reserve-based pool TVL."""
+
+import asyncio
+import math
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import httpx
+import numpy as np
+from loguru import logger
+
+from ..utils.cache import LRUCache
+from ..utils.rate_limit import RateLimiter
+from ..utils.singleflight import SingleFlight
+
+NATIVE_ASSET = "native"
+# Circle's USDC on Stellar mainnet
+DEFAULT_USDC_ASSET = "USDC:GA5ZSEJYB37JRC5AVCIA5MOP4RHTM335X2KGX3IHOJAPP5RE34K4KZVN"
+
+
+def asset_params(asset: str, prefix: str) -> Dict[str, str]:
+    """
+    Horizon query parameters identifying an asset.
+
+    Args:
+        asset: "native" or "CODE:ISSUER" as used in pool reserves
+        prefix: "selling" or "buying"
+
+    Returns:
+        Dict of {prefix}_asset_type/_code/_issuer parameters
+    """
+    if asset == NATIVE_ASSET:
+        return {f"{prefix}_asset_type": "native"}
+    code, _, issuer = asset.partition(":")
+    return {
+        f"{prefix}_asset_type": "credit_alphanum4" if len(code) <= 4 else "credit_alphanum12",
+        f"{prefix}_asset_code": code,
+        f"{prefix}_asset_issuer": issuer,
+    }
+
+
+def compute_reserve_tvl(
+    reserves: Sequence[Sequence[Dict[str, Any]]],
+    prices: Dict[str, float]
+) -> np.ndarray:
+    """
+    USD TVL of each pool from its reserves, in one vectorized pass.
+
+    Stellar liquidity pools are constant-product, so every reserve holds
+    the same value; when only some reserves are priced, TVL is scaled up
+    from the priced ones.
+
+    Args:
+        reserves: Per pool, its Horizon reserves ({"asset", "amount"})
+        prices: USD price per asset (NaN or missing if unknown)
+
+    Returns:
+        float64 array of TVL in USD, NaN where no reserve is priced
+    """
+    counts = np.fromiter((len(r) for r in reserves), dtype=np.int64, count=len(reserves))
+    flat = [reserve for pool_reserves in reserves for reserve in pool_reserves]
+    pool_index = np.repeat(np.arange(len(reserves)), counts)
+    amounts = np.array([_to_float(r.get("amount")) for r in flat], dtype=np.float64)
+    unit_prices = np.array(
+        [prices.get(r.get("asset"), math.nan) for r in flat], dtype=np.float64
+    )
+
+    # An empty reserve is worth nothing at any price
+    values = np.where(amounts == 0, 0.0, amounts * unit_prices)
+    priced = ~np.isnan(values)
+    n = len(reserves)
+    priced_value = np.bincount(pool_index, weights=np.where(priced, values, 0.0), minlength=n)
+    priced_count = np.bincount(pool_index, weights=priced.astype(np.float64), minlength=n)
+
+    tvl = np.full(n, np.nan)
+    has_price = priced_count > 0
+    tvl[has_price] = priced_value[has_price] * counts[has_price] / priced_count[has_price]
+    return tvl
+
+
+class AssetPriceResolver:
+    """Price Stellar assets in USD from Horizon order books.
+
+    Each asset is priced at the mid of its order book against USDC, or,
+    when that book is empty, against XLM times the XLM price. Prices are
+    cached with a TTL (unpriceable assets too), concurrent lookups of the
+    same asset share one request, and all requests go through the
+    Horizon rate limiter, which bounds how many run at once.
+
+    The TTL is never shorter than two snapshot refresh intervals, so a
+    price looked up by one snapshot build is still cached for the next.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        horizon_url: str = "https://horizon.stellar.org",
+        limiter: Optional[RateLimiter] = None,
+        quote_asset: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        cache: Optional[LRUCache] = None
+    ):
+        """
+        Initialize price resolver.
+
+        Args:
+            client: HTTP client
+            horizon_url: Horizon API base URL
+            limiter: Concurrency/rate budget (defaults to RateLimiter.from_env("HORIZON"))
+            quote_asset: USD-pegged asset (defaults to STELLAR_USDC_ASSET or Circle USDC)
+            ttl_seconds: Price cache TTL (defaults to PRICE_CACHE_TTL_SECONDS or
+                600, raised to twice SNAPSHOT_REFRESH_SECONDS if shorter)
+            cache: Optional price cache
+        """
+        if ttl_seconds is None:
+            ttl_seconds = max(
+                float(os.getenv("PRICE_CACHE_TTL_SECONDS", "600")),
+                2 * float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "300"))
+            )
+        self.client = client
+        self.horizon_url = horizon_url.rstrip("/")
+        self.limiter = limiter or RateLimiter.from_env("HORIZON")
+        self.quote_asset = quote_asset or os.getenv("STELLAR_USDC_ASSET", DEFAULT_USDC_ASSET)
+        # An empty cache is falsy (it has __len__)
+        self.cache = cache if cache is not None else LRUCache(
+            default_ttl=ttl_seconds, max_entries=8192
+        )
+        self._inflight = SingleFlight()
+
+    async def resolve(self, assets: Iterable[str]) -> Dict[str, float]:
+        """
+        Price distinct assets concurrently.
+
+        Args:
+            assets: Assets ("native" or "CODE:ISSUER"); duplicates are priced once
+
+        Returns:
+            Dict of asset -> USD price (NaN if it cannot be priced)
+        """
+        distinct = list(dict.fromkeys(assets))
+        prices = await asyncio.gather(*(self.price(asset) for asset in distinct))
+        return dict(zip(distinct, prices))
+
+    async def resolve_reserves(
+        self,
+        reserves: Sequence[Sequence[Dict[str, Any]]]
+    ) -> Dict[str, float]:
+        """
+        Price just enough assets to value every pool with compute_reserve_tvl.
+
+        Constant-product pools hold equal value per reserve, so one priced
+        reserve gives a pool's TVL. USDC and XLM are priced first; pools
+        holding either need nothing else. Each remaining pool gets the
+        asset it shares with the most other remaining pools, and its other
+        assets are priced only if that one cannot be. Empty pools are
+        worth nothing at any price and need no prices at all.
+
+        Args:
+            reserves: Per pool, its Horizon reserves ({"asset", "amount"})
+
+        Returns:
+            Dict of asset -> USD price (NaN if it cannot be priced)
+        """
+        pending = [
+            pool_reserves for pool_reserves in reserves
+            if any(_to_float(r.get("amount")) != 0 for r in pool_reserves)
+        ]
+        prices = await self.resolve(
+            asset for asset in (self.quote_asset, NATIVE_ASSET)
+            if any(r.get("asset") == asset for pool_reserves in pending for r in pool_reserves)
+        )
+        while pending:
+            pending = [
+                pool_reserves for pool_reserves in pending
+                if not any(_priced(prices, r.get("asset")) for r in pool_reserves)
+            ]
+            candidates = [
+                [r.get("asset") for r in pool_reserves
+                 if r.get("asset") and r.get("asset") not in prices]
+                for pool_reserves in pending
+            ]
+            pending = [p for p, assets in zip(pending, candidates) if assets]
+            candidates = [assets for assets in candidates if assets]
+            if not candidates:
+                break
+            shared = Counter(asset for assets in candidates for asset in assets)
+            prices.update(await self.resolve(
+                max(assets, key=lambda asset: shared[asset]) for assets in candidates
+            ))
+        return prices
+
+    async def price(self, asset: str) -> float:
+        """
+        USD price of one asset, from the cache when fresh.
+
+        Args:
+            asset: "native" or "CODE:ISSUER"
+
+        Returns:
+            Price in USD, NaN if it cannot be priced
+        """
+        cached = self.cache.get(asset)
+        if cached is not None:
+            return cached
+        return await self._inflight.do(asset, lambda: self._price_uncached(asset))
+
+    async def _price_uncached(self, asset: str) -> float:
+        try:
+            price = await self._discover(asset)
+        except httpx.HTTPError as e:
+            # Not cached, so the next refresh retries
+            logger.warning(f"Could not price {asset}: {e}")
+            return math.nan
+        self.cache.set(asset, price)
+        return price
+
+    async def _discover(self, asset: str) -> float:
+        if asset == self.quote_asset:
+            return 1.0
+        price = await self._book_mid(asset, self.quote_asset)
+        if math.isnan(price) and asset != NATIVE_ASSET:
+            in_native = await self._book_mid(asset, NATIVE_ASSET)
+            if not math.isnan(in_native):
+                price = in_native * await self.price(NATIVE_ASSET)
+        return price
+
+    async def _book_mid(self, selling: str, buying: str) -> float:
+        """Mid price of selling in units of buying (NaN for an empty book)."""
+        params = {**asset_params(selling, "selling"), **asset_params(buying, "buying"), "limit": 1}
+        async with self.limiter:
+            response = await self.client.get(f"{self.horizon_url}/order_book", params=params)
+        response.raise_for_status()
+        book = response.json()
+        best = [
+            _to_float(side[0].get("price"))
+            for side in (book.get("bids") or [], book.get("asks") or [])
+            if side
+        ]
+        best = [price for price in best if price > 0]
+        return sum(best) / len(best) if best else math.nan
+
+
+def _priced(prices: Dict[str, float], asset: Optional[str]) -> bool:
+    return not math.isnan(prices.get(asset, math.nan))
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
@@ -1,12 +1,33 @@
 """Risk scoring logic ported from TypeScript metrics.ts"""
 
-from typing import List, Optional
+import functools
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
 from ..models.yield_opportunity import (
     YieldOpportunity,
     RiskTier,
     RiskMetric,
     RiskDistribution,
 )
+from .opportunity_table import Categorical, TIER_ORDER
+
+StringColumn = Union[Categorical, Sequence[Optional[str]]]
+ScoringKey = Tuple[
+    str, Optional[float], str, str, bool, Optional[float], Optional[float], Optional[float]
+]
+
+# Distinct scoring inputs remembered by calculate_risk_score
+SCORE_CACHE_SIZE = 65536
+
+# Stability weight per tier used for the distribution grade
+STABILITY_WEIGHTS: Dict[RiskTier, int] = {
+    RiskTier.A: 4,
+    RiskTier.B: 2,
+    RiskTier.C: -1,
+    RiskTier.D: -2,
+}
 
 
 class RiskScorer:
@@ -18,99 +39,226 @@ class RiskScorer:
         Calculate risk score based on multiple factors.
         Ported from TypeScript calculateRiskScore function.
         
+        Scores are memoized on the pool's scoring-relevant fields, so
+        re-scoring an unchanged pool is a dictionary lookup.
+        
         Returns:
             float: Risk score (higher = safer, lower = riskier)
         """
-        score = 0.0
+        return _score_for_key(RiskScorer.scoring_key(pool))
+    
+    @staticmethod
+    def scoring_key(pool: YieldOpportunity) -> ScoringKey:
+        """
+        Normalized tuple of the fields that determine a pool's risk score.
+        
+        Returns:
+            Tuple of (predicted_class, predicted_probability, il_risk,
+            exposure, stablecoin, apy, apy_pct_7d, apy_mean_30d)
+        """
+        return (
+            (pool.predicted_class or "").lower(),
+            pool.predicted_probability,
+            (pool.il_risk or "").lower(),
+            (pool.exposure or "").lower(),
+            bool(pool.stablecoin),
+            pool.apy,
+            pool.apy_pct_7d,
+            pool.apy_mean_30d,
+        )
+    
+    @staticmethod
+    def risk_tier_of(pool: YieldOpportunity) -> RiskTier:
+        """
+        Return the pool's stored risk tier, scoring it only if missing.
+        
+        Returns:
+            RiskTier: A (safest) to D (riskiest)
+        """
+        if pool.risk_tier is not None:
+            return pool.risk_tier
+        return RiskScorer.tier_for_score(RiskScorer.calculate_risk_score(pool))
+    
+    @staticmethod
+    def classify_risk_tier(pool: YieldOpportunity) -> RiskTier:
+        """
+        Classify pool into risk tier based on score.
+        Ported from TypeScript classifyRiskTier function.
+        
+        Returns:
+            RiskTier: A (safest) to D (riskiest)
+        """
+        return RiskScorer.tier_for_score(RiskScorer.calculate_risk_score(pool))
+    
+    @staticmethod
+    def tier_for_score(score: float) -> RiskTier:
+        """
+        Map a risk score onto its tier.
+        
+        Returns:
+            RiskTier: A (safest) to D (riskiest)
+        """
+        if score >= 3:
+            return RiskTier.A
+        elif score >= 1:
+            return RiskTier.B
+        elif score >= -1.5:
+            return RiskTier.C
+        else:
+            return RiskTier.D
+    
+    @staticmethod
+    def score_batch(
+        apy: np.ndarray,
+        apy_pct_7d: np.ndarray,
+        apy_mean_30d: np.ndarray,
+        predicted_class: StringColumn,
+        predicted_probability: np.ndarray,
+        il_risk: StringColumn,
+        exposure: StringColumn,
+        stablecoin: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score many pools at once with the same rules as calculate_risk_score.
+        
+        Numeric columns use NaN for missing values; string columns may be
+        plain sequences (None for missing) or pre-encoded Categorical
+        columns and are compared case-insensitively.
+        
+        Args:
+            apy: Current APY
+            apy_pct_7d: 7-day APY change
+            apy_mean_30d: 30-day mean APY
+            predicted_class: DeFiLlama prediction class
+            predicted_probability: Prediction probability (0-100)
+            il_risk: Impermanent loss flag ("yes"/"no")
+            exposure: Exposure type ("single"/"multi")
+            stablecoin: Stablecoin flags (None/NaN treated as False)
+            
+        Returns:
+            Tuple of (float64 scores, int8 tier codes in TIER_ORDER)
+        """
+        apy = np.asarray(apy, dtype=np.float64)
+        apy_pct_7d = np.asarray(apy_pct_7d, dtype=np.float64)
+        apy_mean_30d = np.asarray(apy_mean_30d, dtype=np.float64)
+        probability = np.asarray(predicted_probability, dtype=np.float64)
+        stable = _truthy(stablecoin)
+        prediction = _as_categorical(predicted_class)
+        il = _as_categorical(il_risk).isin(["yes"])
+        multi = _as_categorical(exposure).isin(["multi"])
         
-        # Prediction analysis
-        prediction = (pool.predicted_class or "").lower()
-        probability = pool.predicted_probability
-        il_risk = (pool.il_risk or "").lower() == "yes"
-        exposure = (pool.exposure or "").lower()
-        stablecoin = pool.stablecoin or False
+        score = np.zeros(len(apy), dtype=np.float64)
         
         # Prediction class scoring
-        if prediction == "stable/up":
-            score += 2
-        elif prediction == "down":
-            score -= 2
-        elif prediction:
-            score += 0.5
-        
-        # Prediction probability scoring
-        if probability is not None:
-            if probability >= 85:
-                score += 2
-            elif probability >= 70:
-                score += 1
-            elif probability <= 35:
-                score -= 1
-            elif probability <= 20:
-                score -= 2
+        stable_up = prediction.isin(["stable/up"])
+        down = prediction.isin(["down"])
+        other = prediction.isin(c for c in prediction.categories if c not in ("", "stable/up", "down"))
+        score += np.select([stable_up, down, other], [2.0, -2.0, 0.5], 0.0)
+        
+        # Prediction probability scoring (NaN compares False everywhere;
+        # <= 20 is shadowed by <= 35 exactly as in the scalar rules)
+        score += np.select(
+            [probability >= 85, probability >= 70, probability <= 35],
+            [2.0, 1.0, -1.0],
+            0.0
+        )
         
         # Impermanent loss risk
-        if il_risk:
-            score -= 2
-        else:
-            score += 0.5
+        score += np.where(il, -2.0, 0.5)
         
         # Exposure type
-        if exposure == "multi":
-            score -= 0.5
+        score -= np.where(multi, 0.5, 0.0)
         
         # APY analysis (higher APY = higher risk)
-        apy = pool.apy or 0
-        if apy >= 20:
-            score -= 1.5
-        elif apy >= 12:
-            score -= 1
-        elif apy >= 8:
-            score -= 0.5
+        apy0 = np.nan_to_num(apy, nan=0.0)
+        score -= np.select([apy0 >= 20, apy0 >= 12, apy0 >= 8], [1.5, 1.0, 0.5], 0.0)
         
-        # Volatility analysis
-        volatility_candidates = []
+        # Volatility analysis: fmax ignores a missing candidate
+        volatility = np.fmax(np.abs(apy_pct_7d), np.abs(apy - apy_mean_30d))
+        score -= np.select(
+            [volatility >= 5, volatility >= 2, volatility >= 1],
+            [2.0, 1.0, 0.5],
+            0.0
+        )
         
-        if pool.apy_pct_7d is not None:
-            volatility_candidates.append(abs(pool.apy_pct_7d))
+        # Stablecoin bonus
+        score += np.where(stable & ~il, 1.0, 0.0)
         
-        if pool.apy is not None and pool.apy_mean_30d is not None:
-            volatility_candidates.append(abs(pool.apy - pool.apy_mean_30d))
+        return score, RiskScorer.tier_codes(score)
+    
+    @staticmethod
+    def tier_codes(scores: np.ndarray) -> np.ndarray:
+        """Vectorized tier_for_score returning int8 codes in TIER_ORDER."""
+        scores = np.asarray(scores, dtype=np.float64)
+        return (
+            3 - (scores >= -1.5).astype(np.int8)
+            - (scores >= 1).astype(np.int8)
+            - (scores >= 3).astype(np.int8)
+        ).astype(np.int8)
+    
+    @staticmethod
+    def score_opportunities(
+        pools: Sequence[YieldOpportunity]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch-score YieldOpportunity models.
         
-        if volatility_candidates:
-            volatility = max(volatility_candidates)
-            if volatility >= 5:
-                score -= 2
-            elif volatility >= 2:
-                score -= 1
-            elif volatility >= 1:
-                score -= 0.5
+        Returns:
+            Tuple of (scores, tier codes) aligned with pools
+        """
+        n = len(pools)
         
-        # Stablecoin bonus
-        if stablecoin and not il_risk:
-            score += 1
+        def floats(attr: str) -> np.ndarray:
+            return np.fromiter(
+                (_nan_if_none(getattr(p, attr)) for p in pools), dtype=np.float64, count=n
+            )
         
-        return score
+        return RiskScorer.score_batch(
+            apy=floats("apy"),
+            apy_pct_7d=floats("apy_pct_7d"),
+            apy_mean_30d=floats("apy_mean_30d"),
+            predicted_class=[p.predicted_class for p in pools],
+            predicted_probability=floats("predicted_probability"),
+            il_risk=[p.il_risk for p in pools],
+            exposure=[p.exposure for p in pools],
+            stablecoin=np.fromiter((bool(p.stablecoin) for p in pools), dtype=bool, count=n)
+        )
     
     @staticmethod
-    def classify_risk_tier(pool: YieldOpportunity) -> RiskTier:
+    def score_records(
+        records: Sequence[Dict[str, Any]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Classify pool into risk tier based on score.
-        Ported from TypeScript classifyRiskTier function.
+        Batch-score raw DeFiLlama-style records (camelCase keys).
         
         Returns:
-            RiskTier: A (safest) to D (riskiest)
+            Tuple of (scores, tier codes) aligned with records
         """
-        score = RiskScorer.calculate_risk_score(pool)
+        n = len(records)
         
-        if score >= 3:
-            return RiskTier.A
-        elif score >= 1:
-            return RiskTier.B
-        elif score >= -1.5:
-            return RiskTier.C
-        else:
-            return RiskTier.D
+        def floats(key: str) -> np.ndarray:
+            return np.fromiter(
+                (_nan_if_none(r.get(key)) for r in records), dtype=np.float64, count=n
+            )
+        
+        return RiskScorer.score_batch(
+            apy=floats("apy"),
+            apy_pct_7d=floats("apyPct7D"),
+            apy_mean_30d=floats("apyMean30d"),
+            predicted_class=[r.get("predictedClass") for r in records],
+            predicted_probability=floats("predictedProbability"),
+            il_risk=[r.get("ilRisk") for r in records],
+            exposure=[r.get("exposure") for r in records],
+            stablecoin=np.fromiter((bool(r.get("stablecoin")) for r in records), dtype=bool, count=n)
+        )
+    
+    @staticmethod
+    def apply_scores(pools: Sequence[YieldOpportunity]) -> None:
+        """Batch-score pools and set risk_score/risk_tier on each in place."""
+        scores, tiers = RiskScorer.score_opportunities(pools)
+        for pool, score, tier in zip(pools, scores.tolist(), tiers.tolist()):
+            pool.risk_score = score
+            pool.risk_tier = TIER_ORDER[tier]
     
     @staticmethod
     def compute_risk_distribution(
@@ -120,70 +268,192 @@ class RiskScorer:
         Compute risk distribution across a list of pools.
         Ported from TypeScript computeRiskDistribution function.
         
+        Stored risk tiers are reused; only pools without one are scored.
+        
         Returns:
             RiskDistribution: Distribution summary with grade
         """
-        if not pools or len(pools) == 0:
-            empty_distribution = [
-                RiskMetric(tier=RiskTier.A, percentage=0, count=0),
-                RiskMetric(tier=RiskTier.B, percentage=0, count=0),
-                RiskMetric(tier=RiskTier.C, percentage=0, count=0),
-                RiskMetric(tier=RiskTier.D, percentage=0, count=0),
-            ]
-            return RiskDistribution(
-                distribution=empty_distribution,
-                grade="N/A",
-                total=0
-            )
-        
-        # Count pools by tier
-        counts = {RiskTier.A: 0, RiskTier.B: 0, RiskTier.C: 0, RiskTier.D: 0}
-        
-        for pool in pools:
-            tier = RiskScorer.classify_risk_tier(pool)
-            counts[tier] += 1
-        
-        total = len(pools)
-        
-        # Create distribution
-        distribution = [
-            RiskMetric(
-                tier=tier,
-                count=counts[tier],
-                percentage=round((counts[tier] / total) * 100)
-            )
-            for tier in [RiskTier.A, RiskTier.B, RiskTier.C, RiskTier.D]
-        ]
+        accumulator = RiskDistributionAccumulator()
+        for pool in pools or []:
+            accumulator.add(pool)
+        return accumulator.to_distribution()
+
+
+class RiskDistributionAccumulator:
+    """Running tier counts with O(1) add/remove.
+    
+    Maintains the per-tier counts and the weighted stability sum, so the
+    distribution and grade for a changing pool set are available without
+    recounting the whole list.
+    """
+    
+    def __init__(self, pools: Optional[Iterable[YieldOpportunity]] = None):
+        """
+        Initialize accumulator.
         
-        # Calculate stability score
-        stability_score = (
-            counts[RiskTier.A] * 4 +
-            counts[RiskTier.B] * 2 -
-            counts[RiskTier.C] -
-            counts[RiskTier.D] * 2
-        ) / total
+        Args:
+            pools: Optional pools to add up front
+        """
+        self.counts: Dict[RiskTier, int] = {tier: 0 for tier in TIER_ORDER}
+        self.total = 0
+        self._stability_sum = 0
+        for pool in pools or []:
+            self.add(pool)
+    
+    def add(self, pool: YieldOpportunity):
+        """Add a pool (scored only if it has no stored tier)."""
+        self.add_tier(RiskScorer.risk_tier_of(pool))
+    
+    def remove(self, pool: YieldOpportunity):
+        """Remove a previously added pool."""
+        self.remove_tier(RiskScorer.risk_tier_of(pool))
+    
+    def add_tier(self, tier: RiskTier, count: int = 1):
+        """Add count pools of the given tier."""
+        self.counts[tier] += count
+        self.total += count
+        self._stability_sum += STABILITY_WEIGHTS[tier] * count
+    
+    def remove_tier(self, tier: RiskTier, count: int = 1):
+        """Remove count pools of the given tier."""
+        if self.counts[tier] < count:
+            raise ValueError(f"Cannot remove {count} tier {tier.value} pools; have {self.counts[tier]}")
+        self.add_tier(tier, -count)
+    
+    @property
+    def stability_score(self) -> float:
+        """Average stability weight across pools (0 when empty)."""
+        return self._stability_sum / self.total if self.total else 0.0
+    
+    @property
+    def grade(self) -> str:
+        """Stability grade, or "N/A" when empty."""
+        if not self.total:
+            return "N/A"
         
-        # Assign grade
+        stability_score = self.stability_score
         if stability_score >= 3.2:
-            grade = "A"
+            return "A"
         elif stability_score >= 1.5:
-            grade = "B+"
+            return "B+"
         elif stability_score >= 1:
-            grade = "B"
+            return "B"
         elif stability_score >= 0.2:
-            grade = "B-"
+            return "B-"
         elif stability_score >= -0.5:
-            grade = "C"
+            return "C"
         else:
-            grade = "C-"
-        
+            return "C-"
+    
+    def to_distribution(self) -> RiskDistribution:
+        """Build the RiskDistribution summary for the current counts."""
+        distribution = [
+            RiskMetric(
+                tier=tier,
+                count=self.counts[tier],
+                percentage=round((self.counts[tier] / self.total) * 100) if self.total else 0
+            )
+            for tier in TIER_ORDER
+        ]
         return RiskDistribution(
             distribution=distribution,
-            grade=grade,
-            total=total
+            grade=self.grade,
+            total=self.total
         )
 
 
+@functools.lru_cache(maxsize=SCORE_CACHE_SIZE)
+def _score_for_key(key: ScoringKey) -> float:
+    """Scalar scoring rules over a normalized ScoringKey."""
+    (
+        prediction, probability, il_risk, exposure,
+        stablecoin, apy, apy_pct_7d, apy_mean_30d
+    ) = key
+    score = 0.0
+    il_risk = il_risk == "yes"
+
+    # Prediction class scoring
+    if prediction == "stable/up":
+        score += 2
+    elif prediction == "down":
+        score -= 2
+    elif prediction:
+        score += 0.5
+
+    # Prediction probability scoring
+    if probability is not None:
+        if probability >= 85:
+            score += 2
+        elif probability >= 70:
+            score += 1
+        elif probability <= 35:
+            score -= 1
+        elif probability <= 20:
+            score -= 2
+
+    # Impermanent loss risk
+    if il_risk:
+        score -= 2
+    else:
+        score += 0.5
+
+    # Exposure type
+    if exposure == "multi":
+        score -= 0.5
+
+    # APY analysis (higher APY = higher risk)
+    apy_or_zero = apy or 0
+    if apy_or_zero >= 20:
+        score -= 1.5
+    elif apy_or_zero >= 12:
+        score -= 1
+    elif apy_or_zero >= 8:
+        score -= 0.5
+
+    # Volatility analysis
+    volatility_candidates = []
+
+    if apy_pct_7d is not None:
+        volatility_candidates.append(abs(apy_pct_7d))
+
+    if apy is not None and apy_mean_30d is not None:
+        volatility_candidates.append(abs(apy - apy_mean_30d))
+
+    if volatility_candidates:
+        volatility = max(volatility_candidates)
+        if volatility >= 5:
+            score -= 2
+        elif volatility >= 2:
+            score -= 1
+        elif volatility >= 1:
+            score -= 0.5
+
+    # Stablecoin bonus
+    if stablecoin and not il_risk:
+        score += 1
+
+    return score
+
+
+def _nan_if_none(value: Any) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def _truthy(values: Any) -> np.ndarray:
+    array = np.asarray(values)
+    if array.dtype == bool:
+        return array
+    if array.dtype.kind == "f":
+        return np.nan_to_num(array, nan=0.0) != 0
+    return np.fromiter((bool(v) for v in array.tolist()), dtype=bool, count=len(array))
+
+
+def _as_categorical(values: StringColumn) -> Categorical:
+    if isinstance(values, Categorical):
+        return values
+    return Categorical.encode(values)
+
+
 # Convenience functions
 def classify_risk_tier(pool: YieldOpportunity) -> RiskTier:
     """Classify a single pool's risk tier."""
@@ -0,0 +1,253 @@
+"""Versioned in-memory opportunity snapshots with background refresh."""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from loguru import logger
+
+from ..models.yield_opportunity import YieldOpportunity
+from .opportunity_table import OpportunityTable
+
+
+@dataclass(frozen=True)
+class OpportunitySnapshot:
+    """Immutable set of opportunities fetched in one refresh.
+
+    Opportunities are grouped by the source that produced them, indexed by
+    lowercase chain name and by pool id, and encoded once into a columnar
+    OpportunityTable for vectorized filtering and ranking. Snapshots are
+    never mutated after creation; a refresh builds a new one and swaps it in.
+    """
+
+    version: int
+    created_at: float
+    by_source: Mapping[str, Tuple[YieldOpportunity, ...]]
+    source_errors: Mapping[str, str] = field(default_factory=dict)
+    chain_index: Mapping[str, Tuple[YieldOpportunity, ...]] = field(init=False)
+    id_index: Mapping[str, YieldOpportunity] = field(init=False, repr=False, compare=False)
+    table: OpportunityTable = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        by_source = MappingProxyType({
+            name: tuple(opportunities) for name, opportunities in self.by_source.items()
+        })
+        chain_index: Dict[str, List[YieldOpportunity]] = {}
+        id_index: Dict[str, YieldOpportunity] = {}
+        for opportunities in by_source.values():
+            for opp in opportunities:
+                chain_index.setdefault(opp.chain.lower(), []).append(opp)
+                if opp.pool:
+                    # First source wins if two report the same id
+                    id_index.setdefault(opp.pool, opp)
+
+        object.__setattr__(self, "by_source", by_source)
+        object.__setattr__(self, "source_errors", MappingProxyType(dict(self.source_errors)))
+        object.__setattr__(self, "chain_index", MappingProxyType({
+            chain: tuple(opportunities) for chain, opportunities in chain_index.items()
+        }))
+        object.__setattr__(self, "id_index", MappingProxyType(id_index))
+        table = OpportunityTable.concat([
+            OpportunityTable.from_opportunities(opportunities, source=name)
+            for name, opportunities in by_source.items()
+        ])
+        # Ranking keys are computed once per snapshot; filtered views reuse them
+        table.precompute_rank_keys()
+        object.__setattr__(self, "table", table)
+
+    @classmethod
+    def build(
+        cls,
+        version: int,
+        by_source: Mapping[str, List[YieldOpportunity]],
+        source_errors: Optional[Mapping[str, str]] = None
+    ) -> "OpportunitySnapshot":
+        """Create a snapshot stamped with the current time."""
+        return cls(
+            version=version,
+            created_at=time.time(),
+            by_source=by_source,
+            source_errors=source_errors or {}
+        )
+
+    @property
+    def sources(self) -> List[str]:
+        """Names of the sources that contributed data."""
+        return list(self.by_source.keys())
+
+    def __len__(self) -> int:
+        return sum(len(opportunities) for opportunities in self.by_source.values())
+
+    def age_seconds(self, now: Optional[float] = None) -> float:
+        """Seconds elapsed since this snapshot was built."""
+        return max(0.0, (now if now is not None else time.time()) - self.created_at)
+
+    def get(self, pool_id: str) -> Optional[YieldOpportunity]:
+        """The opportunity with this pool id, if the snapshot has it."""
+        return self.id_index.get(pool_id)
+
+    def get_many(self, pool_ids: Iterable[str]) -> Dict[str, Optional[YieldOpportunity]]:
+        """
+        Look up many pool ids at once.
+
+        Args:
+            pool_ids: Pool ids (duplicates are returned once)
+
+        Returns:
+            Dict of pool id -> opportunity (None if not in the snapshot), in input order
+        """
+        return {pool_id: self.id_index.get(pool_id) for pool_id in pool_ids}
+
+    def select(
+        self,
+        chains: Optional[List[str]] = None,
+        sources: Optional[List[str]] = None
+    ) -> List[YieldOpportunity]:
+        """
+        Select opportunities by chain and source without copying the snapshot.
+
+        Args:
+            chains: Optional chain names (case-insensitive)
+            sources: Optional source names to include (default: all)
+
+        Returns:
+            Opportunities in source order, then upstream order
+        """
+        if chains and sources is None:
+            selected: List[YieldOpportunity] = []
+            for chain in dict.fromkeys(c.lower() for c in chains):
+                selected.extend(self.chain_index.get(chain, ()))
+            return selected
+
+        selected_sources = self.by_source.keys() if sources is None else [
+            name for name in self.by_source if name in sources
+        ]
+        wanted_chains = {c.lower() for c in chains} if chains else None
+
+        selected = []
+        for name in selected_sources:
+            opportunities = self.by_source[name]
+            if wanted_chains is None:
+                selected.extend(opportunities)
+            else:
+                selected.extend(
+                    opp for opp in opportunities if opp.chain.lower() in wanted_chains
+                )
+        return selected
+
+
+class SnapshotRefresher:
+    """Keep a current OpportunitySnapshot fresh in the background.
+
+    Readers call get() and receive the current snapshot immediately. When the
+    snapshot is older than the refresh interval a rebuild is scheduled in the
+    background (stale-while-revalidate); only the very first read waits.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[int], Awaitable[OpportunitySnapshot]],
+        interval_seconds: float = 300
+    ):
+        """
+        Initialize refresher.
+
+        Args:
+            build: Coroutine function building a snapshot for a given version
+            interval_seconds: Target snapshot age before it is rebuilt
+        """
+        self._build = build
+        self.interval_seconds = interval_seconds
+        self._current: Optional[OpportunitySnapshot] = None
+        self._version = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> Optional[OpportunitySnapshot]:
+        """The most recently published snapshot, if any."""
+        return self._current
+
+    async def get(self) -> OpportunitySnapshot:
+        """
+        Return the current snapshot, refreshing in the background when stale.
+
+        Returns:
+            The current OpportunitySnapshot (waits only for the first build)
+        """
+        snapshot = self._current
+        if snapshot is None:
+            return await self.refresh()
+
+        if snapshot.age_seconds() >= self.interval_seconds:
+            self._schedule_refresh()
+
+        return snapshot
+
+    async def refresh(self) -> OpportunitySnapshot:
+        """
+        Build a new snapshot and publish it, sharing any refresh in progress.
+
+        Returns:
+            The newly published snapshot (or the previous one if the build
+            produced no data)
+        """
+        return await asyncio.shield(self._schedule_refresh())
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Snapshot refresh failed: {task.exception()}")
+
+    async def _do_refresh(self) -> OpportunitySnapshot:
+        started = time.time()
+        snapshot = await self._build(self._version + 1)
+
+        if len(snapshot) == 0 and self._current is not None:
+            logger.warning("Snapshot refresh returned no data; keeping previous snapshot")
+            return self._current
+
+        # Single attribute assignment: readers see either the old or new snapshot
+        self._version = snapshot.version
+        self._current = snapshot
+
+        logger.info(
+            f"Published opportunity snapshot v{snapshot.version}: "
+            f"{len(snapshot)} opportunities from {snapshot.sources} "
+            f"in {(time.time() - started) * 1000:.0f}ms"
+        )
+        return snapshot
+
+    def start(self):
+        """Start the periodic background refresh loop."""
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # Logged by _log_refresh_failure; keep serving the last snapshot
+            await asyncio.sleep(self.interval_seconds)
+
+    async def stop(self):
+        """Stop the background loop and any refresh in progress."""
+        for task in (self._loop_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._loop_task = None
+        self._refresh_task = None
@@ -0,0 +1,89 @@
+"""Registry of opportunity data sources fetched concurrently."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from loguru import logger
+
+from ..models.yield_opportunity import YieldOpportunity
+from .filters import FilterSpec
+
+
+@dataclass(frozen=True)
+class DataSource:
+    """A named opportunity source with its own timeout.
+
+    Sources that can evaluate a FilterSpec during ingest also provide
+    filtered_fetch, which is used instead of fetch when filters are
+    pushed down. Sources that can fetch individual pools provide lookup,
+    used for pool IDs missing from the current snapshot.
+    """
+
+    name: str
+    fetch: Callable[[], Awaitable[List[YieldOpportunity]]]
+    timeout_seconds: float = 20.0
+    filtered_fetch: Optional[Callable[[FilterSpec], Awaitable[List[YieldOpportunity]]]] = None
+    lookup: Optional[
+        Callable[[List[str]], Awaitable[Dict[str, Optional[YieldOpportunity]]]]
+    ] = None
+
+
+@dataclass(frozen=True)
+class SourceResult:
+    """Outcome of fetching a single source."""
+
+    name: str
+    opportunities: Optional[List[YieldOpportunity]]
+    error: Optional[str]
+    elapsed_ms: float
+
+    @property
+    def ok(self) -> bool:
+        """Whether the source returned data."""
+        return self.error is None
+
+
+async def _fetch_source(source: DataSource) -> SourceResult:
+    started = time.perf_counter()
+    try:
+        opportunities = await asyncio.wait_for(source.fetch(), timeout=source.timeout_seconds)
+        error = None
+    except asyncio.TimeoutError:
+        opportunities = None
+        error = f"timed out after {source.timeout_seconds:g}s"
+    except Exception as e:
+        opportunities = None
+        error = str(e) or type(e).__name__
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if error:
+        logger.error(f"Source {source.name} failed in {elapsed_ms:.0f}ms: {error}")
+    else:
+        logger.info(
+            f"Source {source.name} returned {len(opportunities)} opportunities "
+            f"in {elapsed_ms:.0f}ms"
+        )
+    return SourceResult(
+        name=source.name,
+        opportunities=opportunities,
+        error=error,
+        elapsed_ms=elapsed_ms
+    )
+
+
+async def fetch_sources(sources: List[DataSource]) -> List[SourceResult]:
+    """
+    Fetch all sources concurrently with partial-result semantics.
+
+    Each source is bounded by its own timeout, so total latency is that of
+    the slowest source rather than the sum. A failing source never cancels
+    the others.
+
+    Args:
+        sources: Sources to fetch
+
+    Returns:
+        One SourceResult per source, in input order
+    """
+    return list(await asyncio.gather(*(_fetch_source(source) for source in sources)))
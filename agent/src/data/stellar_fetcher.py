@@ -1,19 +1,58 @@
 """Stellar-specific data fetcher using Horizon API."""
 
+import asyncio
+import math
+import os
+import re
+import time
 import httpx
-from typing import List, Optional, Dict, Any
+import numpy as np
+from typing import List, Optional, Dict, Any, Tuple
 from loguru import logger
 
 from ..models.yield_opportunity import YieldOpportunity
+from ..utils.http import create_http_client
+from ..utils.http_cache import PayloadCache
+from ..utils.rate_limit import RateLimiter
+from .horizon_crawler import CrawlReport, HorizonPoolCrawler
+from .horizon_stream import HorizonLiveStream
+from .ingest import IngestReport, build_opportunities
+from .filters import FilterSpec
+from .opportunity_table import TIER_CODES, TIER_MISSING, TIER_ORDER
+from .pool_volume import PoolVolumeTracker
+from .price_resolver import AssetPriceResolver, compute_reserve_tvl
+from .risk_scorer import RiskScorer
+
+# Liquidity pool ids are hex-encoded SHA-256 hashes
+POOL_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Pool metrics (by record key) and the model fields they update
+METRIC_FIELDS = {
+    "tvlUsd": "tvl_usd",
+    "apy": "apy",
+    "apyBase": "apy_base",
+    "apyMean30d": "apy_mean_30d",
+    "apyPct7D": "apy_pct_7d",
+}
 
 
 class StellarFetcher:
     """Fetch Stellar-specific yield data from Horizon API."""
     
+    SOURCE = "stellar_dex"
+    
     def __init__(
         self,
         horizon_url: str = "https://horizon.stellar.org",
-        timeout: int = 30
+        timeout: int = 30,
+        client: Optional[httpx.AsyncClient] = None,
+        limits: Optional[httpx.Limits] = None,
+        payload_cache: Optional[PayloadCache] = None,
+        limiter: Optional[RateLimiter] = None,
+        crawler: Optional[HorizonPoolCrawler] = None,
+        prices: Optional[AssetPriceResolver] = None,
+        volumes: Optional[PoolVolumeTracker] = None,
+        apy_min_tvl_usd: Optional[float] = None
     ):
         """
         Initialize Stellar fetcher.
@@ -21,10 +60,47 @@ class StellarFetcher:
         Args:
             horizon_url: Horizon API base URL
             timeout: Request timeout in seconds
+            client: Optional shared HTTP client (not closed by this fetcher)
+            limits: Optional connection pool limits for an owned client
+            payload_cache: Optional on-disk cache used for conditional GETs
+            limiter: Budget shared by all Horizon requests
+                (defaults to RateLimiter.from_env("HORIZON"))
+            crawler: Optional pool crawler (defaults to one configured from env)
+            prices: Optional asset price resolver used for pool TVL
+            volumes: Optional trade volume tracker used for pool APY
+            apy_min_tvl_usd: Pools below this TVL are not tracked and get no APY
+                (defaults to STELLAR_APY_MIN_TVL_USD or 10000)
         """
+        if apy_min_tvl_usd is None:
+            apy_min_tvl_usd = float(os.getenv("STELLAR_APY_MIN_TVL_USD", "10000"))
         self.horizon_url = horizon_url.rstrip("/")
         self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        self._owns_client = client is None
+        self.client = client or create_http_client(timeout=timeout, limits=limits)
+        self.last_ingest_report: Optional[IngestReport] = None
+        self.payload_cache = payload_cache
+        # (payload version, limit, opportunities, report, parse ms, pools by id) of the last parse
+        self._parsed: Optional[Tuple[
+            str, int, List[YieldOpportunity], IngestReport, float, Dict[str, Dict[str, Any]]
+        ]] = None
+        self.limiter = limiter or RateLimiter.from_env("HORIZON")
+        self.prices = prices or AssetPriceResolver(
+            self.client, self.horizon_url, limiter=self.limiter
+        )
+        self.volumes = volumes or PoolVolumeTracker(
+            self.client, self.horizon_url, limiter=self.limiter
+        )
+        self.apy_min_tvl_usd = apy_min_tvl_usd
+        # An empty crawler is falsy (it has __len__)
+        self.crawler = crawler if crawler is not None else HorizonPoolCrawler(
+            self.client, self.horizon_url, limiter=self.limiter
+        )
+        self.last_crawl_report: Optional[CrawlReport] = None
+        # Pool id -> parsed opportunity (None if the pool cannot be parsed)
+        self._crawled: Dict[str, Optional[YieldOpportunity]] = {}
+        self.live: Optional[HorizonLiveStream] = None
+        # Pool id -> (table record it was parsed from, opportunity or None)
+        self._live_parsed: Dict[str, Tuple[Dict[str, Any], Optional[YieldOpportunity]]] = {}
     
     async def fetch_liquidity_pools(self, limit: int = 200) -> List[Dict[str, Any]]:
         """
@@ -36,21 +112,33 @@ class StellarFetcher:
         Returns:
             List of raw pool data
         """
+        payload, _ = await self._request_pools(limit)
+        return self._pool_records(payload)
+    
+    async def _request_pools(self, limit: int) -> Tuple[Any, Optional[str]]:
+        """
+        GET /liquidity_pools, conditionally when a payload cache is configured.
+        
+        Returns:
+            Tuple of (object with a json() method, payload version or None)
+        """
         try:
             url = f"{self.horizon_url}/liquidity_pools"
             params = {"limit": limit, "order": "desc"}
             
             logger.info(f"Fetching Stellar liquidity pools (limit={limit})")
             
-            response = await self.client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            pools = data.get("_embedded", {}).get("records", [])
+            if self.payload_cache is not None:
+                async with self.limiter:
+                    payload = await self.payload_cache.get(
+                        self.client, url, source=self.SOURCE, params=params
+                    )
+                return payload, payload.version
             
-            logger.info(f"Fetched {len(pools)} Stellar liquidity pools")
-            
-            return pools
+            async with self.limiter:
+                response = await self.client.get(url, params=params)
+            response.raise_for_status()
+            return response, None
             
         except httpx.HTTPError as e:
             logger.error(f"HTTP error fetching Stellar pools: {e}")
@@ -59,24 +147,83 @@ class StellarFetcher:
             logger.error(f"Error fetching Stellar pools: {e}")
             raise
     
+    async def get_pools_by_id(
+        self,
+        pool_ids: List[str]
+    ) -> Dict[str, Optional[YieldOpportunity]]:
+        """
+        Fetch and parse specific liquidity pools.
+        
+        Pools in the live table are read from it; the rest are requested
+        individually and concurrently, within the Horizon limiter. IDs
+        that are not Stellar pool IDs are not requested.
+        
+        Args:
+            pool_ids: Pool IDs
+            
+        Returns:
+            Dict of pool ID -> YieldOpportunity (None if not found), in input order
+        """
+        wanted = [pool_id for pool_id in dict.fromkeys(pool_ids) if POOL_ID_PATTERN.match(pool_id)]
+        table = self.live.table if self.live is not None else None
+        cached = {pool_id: table.get(pool_id) for pool_id in wanted} if table is not None else {}
+        to_fetch = [pool_id for pool_id in wanted if cached.get(pool_id) is None]
+        fetched = await asyncio.gather(
+            *(self._request_pool(pool_id) for pool_id in to_fetch), return_exceptions=True
+        )
+        
+        records = [record for record in cached.values() if record is not None]
+        for pool_id, result in zip(to_fetch, fetched):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not fetch Stellar pool {pool_id}: {result}")
+            elif result is not None:
+                records.append(result)
+        
+        parsed: Dict[str, YieldOpportunity] = {}
+        if records:
+            # A lookup is not an ingest; keep the last snapshot's report
+            report = self.last_ingest_report
+            parsed = {opp.pool: opp for opp in await self.parse_stellar_pools(records)}
+            self.last_ingest_report = report
+        return {pool_id: parsed.get(pool_id) for pool_id in pool_ids}
+    
+    async def _request_pool(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        """GET /liquidity_pools/{id} (None if Horizon does not know the pool)."""
+        async with self.limiter:
+            response = await self.client.get(f"{self.horizon_url}/liquidity_pools/{pool_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    def _pool_records(payload: Any) -> List[Dict[str, Any]]:
+        data = payload.json()
+        pools = data.get("_embedded", {}).get("records", [])
+        logger.info(f"Fetched {len(pools)} Stellar liquidity pools")
+        return pools
+    
     async def parse_stellar_pools(
         self,
-        pools: List[Dict[str, Any]]
+        pools: List[Dict[str, Any]],
+        with_metrics: bool = True
     ) -> List[YieldOpportunity]:
         """
         Parse Stellar liquidity pools into YieldOpportunity format.
         
-        Note: Stellar pools don't directly provide APY data.
-        This is a simplified implementation that would need enhancement
-        with actual yield calculations based on fees and volume.
+        Horizon does not report yields; APY is derived from trade volume
+        (see _pool_metrics) and risk is scored once it is known.
         
         Args:
             pools: Raw pool data from Horizon API
+            with_metrics: Fill in TVL, fee APY and risk; without it they are
+                left unset for _refresh_metrics
             
         Returns:
             List of YieldOpportunity objects
         """
-        opportunities = []
+        records = []
+        parsed_pools = []
         
         for pool in pools:
             try:
@@ -99,57 +246,325 @@ class StellarFetcher:
                 
                 symbol = "/".join(symbols) if symbols else "Unknown"
                 
-                # Calculate TVL (simplified - would need asset prices)
-                total_shares = float(pool.get("total_shares", "0"))
-                
-                # Fee in basis points
-                fee_bp = pool.get("fee_bp", 30)
-                
-                # Approximate APY based on fee tier (very simplified)
-                # In reality, this would need volume data and calculations
-                estimated_apy = fee_bp / 100.0  # Rough estimate
-                
-                opportunity = YieldOpportunity(
+                records.append(dict(
                     chain="Stellar",
                     project="Stellar DEX",
                     symbol=symbol,
                     pool=pool.get("id"),
-                    tvlUsd=None,  # Would need price oracle
-                    apy=estimated_apy,
-                    apyBase=estimated_apy,
                     apyReward=None,
                     exposure="single" if len(symbols) == 1 else "multi",
                     ilRisk="yes" if len(symbols) > 1 else "no",
                     stablecoin=any(s in ["USDC", "USDT"] for s in symbols),
                     underlyingTokens=symbols,
-                )
-                
-                opportunities.append(opportunity)
+                ))
+                parsed_pools.append(pool)
                 
             except Exception as e:
                 logger.warning(f"Failed to parse Stellar pool: {e}")
                 continue
         
+        if with_metrics and records:
+            for record, metrics in zip(records, await self._pool_metrics(parsed_pools)):
+                record.update(metrics)
+            scores, tiers = RiskScorer.score_records(records)
+            for record, score, tier in zip(records, scores.tolist(), tiers.tolist()):
+                record["risk_score"] = score
+                record["risk_tier"] = TIER_ORDER[tier]
+        
+        opportunities, self.last_ingest_report = build_opportunities(
+            records, source="stellar_dex"
+        )
+        
         logger.info(f"Parsed {len(opportunities)} Stellar opportunities")
         
         return opportunities
     
-    async def fetch_stellar_yields(self, limit: int = 200) -> List[YieldOpportunity]:
+    async def fetch_stellar_yields(
+        self,
+        limit: Optional[int] = None,
+        spec: Optional[FilterSpec] = None
+    ) -> List[YieldOpportunity]:
         """
         Fetch and parse Stellar yield opportunities.
         
+        With a spec, pools that fail it (e.g. the ingest floor's minimum
+        TVL) are dropped once they are valued.
+        
+        Without a limit every pool is returned: from the live pool table
+        when live mode is running and seeded (no network round trip; the
+        streams keep reserves current), otherwise through
+        crawl_stellar_yields, whose periodic full sweep refreshes the
+        stored pools (see HorizonPoolCrawler). With a limit, the newest
+        limit pools are fetched in a single request; with a payload_cache,
+        an unchanged payload (304 or a network failure answered from disk)
+        then reuses the previous parse.
+        
         Args:
-            limit: Maximum number of pools to fetch
+            limit: Maximum number of pools to fetch (None for every pool)
+            spec: Optional filters to apply
             
         Returns:
             List of YieldOpportunity objects
         """
-        pools = await self.fetch_liquidity_pools(limit)
-        return await self.parse_stellar_pools(pools)
+        return self._apply_spec(await self._fetch_stellar_yields(limit), spec)
+    
+    @staticmethod
+    def _apply_spec(
+        opportunities: List[YieldOpportunity],
+        spec: Optional[FilterSpec]
+    ) -> List[YieldOpportunity]:
+        if spec is None or spec.is_empty:
+            return opportunities
+        kept = [
+            opportunity for opportunity in opportunities
+            if spec.accepts_raw({
+                "chain": opportunity.chain, "project": opportunity.project,
+                "tvlUsd": opportunity.tvl_usd, "apy": opportunity.apy,
+            })
+        ]
+        tiers = np.fromiter(
+            (TIER_CODES.get(opportunity.risk_tier, TIER_MISSING) for opportunity in kept),
+            dtype=np.int64, count=len(kept)
+        )
+        return [kept[i] for i in np.flatnonzero(spec.tier_mask(tiers)).tolist()]
+    
+    async def _fetch_stellar_yields(self, limit: Optional[int]) -> List[YieldOpportunity]:
+        if limit is None:
+            if self.live is not None and self.live.table.ready:
+                return await self.live_stellar_yields()
+            return await self.crawl_stellar_yields()
+        
+        payload, version = await self._request_pools(limit)
+        
+        if version is not None and self._parsed is not None and self._parsed[:2] == (version, limit):
+            _, _, opportunities, self.last_ingest_report, parse_ms, pools_by_id = self._parsed
+            self.payload_cache.record_parsed_reuse(self.SOURCE, parse_ms)
+            logger.info(f"Stellar payload unchanged, reusing {len(opportunities)} parsed pools")
+            # Reserves are unchanged but prices and volume may have moved
+            return await self._refresh_metrics(opportunities, pools_by_id)
+        
+        parse_start = time.perf_counter()
+        pools = self._pool_records(payload)
+        opportunities = await self.parse_stellar_pools(pools)
+        if version is not None:
+            self._parsed = (
+                version, limit, list(opportunities), self.last_ingest_report,
+                (time.perf_counter() - parse_start) * 1000,
+                {pool.get("id"): pool for pool in pools}
+            )
+        return opportunities
+    
+    async def crawl_stellar_yields(self, full: Optional[bool] = None) -> List[YieldOpportunity]:
+        """
+        Crawl all liquidity pools and parse them into opportunities.
+        
+        Each page is parsed while the crawler fetches the next one. Only
+        pools returned by this crawl are parsed again; pools restored from
+        the crawler's persisted state are parsed once per process. TVL and
+        APY are then recomputed for every pool in one pass.
+        
+        By default the crawler sweeps every pool once its last full sweep
+        is older than full_recrawl_seconds (which follows the snapshot
+        refresh interval), and otherwise only continues after its cursor;
+        see HorizonPoolCrawler for what that covers. A sweep makes one
+        request per page of pools, which the background snapshot refresh
+        absorbs; only the very first snapshot of a process without saved
+        crawl state waits for one.
+        
+        Args:
+            full: Passed to HorizonPoolCrawler.crawl
+            
+        Returns:
+            List of YieldOpportunity objects in paging-token order
+        """
+        report = IngestReport()
+        
+        async def parse_page(records: List[Dict[str, Any]]):
+            parsed = {
+                opportunity.pool: opportunity
+                for opportunity in await self.parse_stellar_pools(records, with_metrics=False)
+            }
+            report.merge(self.last_ingest_report)
+            for record in records:
+                self._crawled[record.get("id")] = parsed.get(record.get("id"))
+        
+        self.last_crawl_report = await self.crawler.crawl(on_page=parse_page, full=full)
+        
+        pools = self.crawler.pools
+        unparsed = [pool for pool in pools if pool.get("id") not in self._crawled]
+        if unparsed:
+            await parse_page(unparsed)
+        
+        # Drop pools the crawler pruned and follow its order
+        crawled = {pool["id"]: self._crawled[pool["id"]] for pool in pools}
+        opportunities = await self._refresh_metrics(
+            [opportunity for opportunity in crawled.values() if opportunity is not None],
+            {pool["id"]: pool for pool in pools}
+        )
+        crawled.update((opportunity.pool, opportunity) for opportunity in opportunities)
+        self._crawled = crawled
+        self.last_ingest_report = report
+        return opportunities
+    
+    def start_live(self, **kwargs) -> HorizonLiveStream:
+        """
+        Start live mode: follow Horizon's liquidity pool and effect streams.
+        
+        The pool table is seeded from a full crawl while the streams run,
+        so pools that changed while the process was down are current too;
+        until it is seeded fetch_stellar_yields keeps fetching one page.
+        
+        Args:
+            **kwargs: Passed to HorizonLiveStream
+            
+        Returns:
+            The running HorizonLiveStream
+        """
+        if self.live is None:
+            self.live = HorizonLiveStream(
+                self.client, self.horizon_url, seed=self._crawled_records, **kwargs
+            )
+        self.live.start()
+        return self.live
+    
+    async def stop_live(self):
+        """Stop following Horizon streams (the table is kept)."""
+        if self.live is not None:
+            await self.live.stop()
+    
+    async def live_stellar_yields(self) -> List[YieldOpportunity]:
+        """
+        Opportunities from the live pool table.
+        
+        Pool state needs no network calls; only pools whose record
+        changed since the previous call are parsed again. TVL uses cached
+        asset prices, which are refreshed after PRICE_CACHE_TTL_SECONDS,
+        and APY reads the volume tracker's current state.
+        
+        Returns:
+            List of YieldOpportunity objects
+        """
+        records = self.live.table.records()
+        parsed: Dict[str, Tuple[Dict[str, Any], Optional[YieldOpportunity]]] = {}
+        changed = []
+        for record in records:
+            cached = self._live_parsed.get(record["id"])
+            if cached is not None and cached[0] is record:
+                parsed[record["id"]] = cached
+            else:
+                changed.append(record)
+        
+        if changed:
+            opportunities = {
+                opportunity.pool: opportunity
+                for opportunity in await self.parse_stellar_pools(changed, with_metrics=False)
+            }
+            for record in changed:
+                parsed[record["id"]] = (record, opportunities.get(record["id"]))
+        
+        opportunities = await self._refresh_metrics(
+            [parsed[record["id"]][1] for record in records if parsed[record["id"]][1] is not None],
+            {record["id"]: record for record in records}
+        )
+        for opportunity in opportunities:
+            parsed[opportunity.pool] = (parsed[opportunity.pool][0], opportunity)
+        self._live_parsed = parsed
+        return opportunities
+    
+    async def _crawled_records(self) -> List[Dict[str, Any]]:
+        # Persisted records only say what a pool held at its last crawl
+        await self.crawler.crawl(full=True)
+        return self.crawler.pools
+    
+    async def _reserve_tvl(self, pools: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Price the fewest reserve assets needed and compute TVL for all pools.
+        
+        Args:
+            pools: Raw Horizon pool records
+            
+        Returns:
+            TVL in USD per pool (NaN where no reserve could be priced)
+        """
+        reserves = [pool.get("reserves") or [] for pool in pools]
+        prices = await self.prices.resolve_reserves(reserves)
+        return compute_reserve_tvl(reserves, prices)
+    
+    async def _pool_metrics(self, pools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        TVL and fee APY of each pool, keyed like METRIC_FIELDS.
+        
+        Pools with at least apy_min_tvl_usd of TVL are handed to the
+        volume tracker, whose background updates backfill and follow their
+        trades; only its current state is read here. APY is None for pools
+        it does not (yet) track.
+        
+        Args:
+            pools: Raw Horizon pool records
+            
+        Returns:
+            Metrics per pool
+        """
+        tvl = [None if math.isnan(v) else v for v in (await self._reserve_tvl(pools)).tolist()]
+        self.volumes.track([
+            pool for pool, value in zip(pools, tvl)
+            if value is not None and value >= self.apy_min_tvl_usd
+        ])
+        now = time.time()
+        metrics = []
+        for pool, value in zip(pools, tvl):
+            fee_yield = self.volumes.pool_yield(pool, now)
+            apy = fee_yield.apy if fee_yield is not None else None
+            metrics.append({
+                "tvlUsd": value,
+                "apy": apy,
+                "apyBase": apy,
+                "apyMean30d": fee_yield.apy_mean_30d if fee_yield is not None else None,
+                "apyPct7D": fee_yield.apy_pct_7d if fee_yield is not None else None,
+            })
+        return metrics
+    
+    async def _refresh_metrics(
+        self,
+        opportunities: List[YieldOpportunity],
+        pools_by_id: Dict[str, Dict[str, Any]]
+    ) -> List[YieldOpportunity]:
+        """Recompute TVL, APY and risk, copying only opportunities that changed."""
+        metrics = await self._pool_metrics([pools_by_id[o.pool] for o in opportunities])
+        refreshed = []
+        copied = []
+        for opportunity, pool_metrics in zip(opportunities, metrics):
+            update = {
+                METRIC_FIELDS[key]: value for key, value in pool_metrics.items()
+                if getattr(opportunity, METRIC_FIELDS[key]) != value
+            }
+            if update:
+                # Parsed models may be shared with earlier snapshots; never mutate them
+                opportunity = opportunity.model_copy(update=update)
+            refreshed.append(opportunity)
+            copied.append(bool(update))
+        
+        scores, tiers = RiskScorer.score_opportunities(refreshed)
+        for i, (score, tier) in enumerate(zip(scores.tolist(), tiers.tolist())):
+            opportunity = refreshed[i]
+            tier = TIER_ORDER[tier]
+            if opportunity.risk_score == score and opportunity.risk_tier == tier:
+                continue
+            if copied[i]:
+                opportunity.risk_score = score
+                opportunity.risk_tier = tier
+            else:
+                refreshed[i] = opportunity.model_copy(
+                    update={"risk_score": score, "risk_tier": tier}
+                )
+        return refreshed
     
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Stop live mode and volume tracking, and close the HTTP client if this fetcher owns it."""
+        await self.stop_live()
+        await self.volumes.stop()
+        if self._owns_client:
+            await self.client.aclose()
     
     async def __aenter__(self):
         """Async context manager entry."""
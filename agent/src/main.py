@@ -161,8 +161,10 @@ Examples:
     recommend_parser.add_argument(
         "--max-opportunities",
         type=int,
-        default=20,
-        help="Maximum opportunities to consider (default: 20)"
+        help=(
+            "Maximum opportunities to consider "
+            "(default: as many as fit the prompt budget in ai mode, 20 otherwise)"
+        )
     )
     recommend_parser.add_argument(
         "--output", "-o",
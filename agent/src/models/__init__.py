@@ -10,6 +10,7 @@ from .recommendation import (
     Recommendation,
     PortfolioAllocation,
     RecommendationResponse,
+    BatchRecommendationResponse,
 )
 
 __all__ = [
@@ -20,4 +21,5 @@ __all__ = [
     "Recommendation",
     "PortfolioAllocation",
     "RecommendationResponse",
+    "BatchRecommendationResponse",
 ]
@@ -22,6 +22,10 @@ class PortfolioAllocation(BaseModel):
     reasoning: str = Field(
         description="AI-generated explanation for this allocation"
     )
+    match_confidence: Optional[float] = Field(
+        None, ge=0, le=1,
+        description="Confidence that the AI's pool reference was matched to this opportunity"
+    )
 
 
 class Recommendation(BaseModel):
@@ -78,6 +82,10 @@ class Recommendation(BaseModel):
     data_freshness_seconds: int = Field(
         description="How old is the underlying data"
     )
+    data_sources: List[str] = Field(
+        default_factory=list,
+        description="Data sources that contributed to the underlying snapshot"
+    )
     
     class Config:
         json_schema_extra = {
@@ -113,3 +121,14 @@ class RecommendationResponse(BaseModel):
                 "execution_time_ms": 2345.67
             }
         }
+
+
+class BatchRecommendationResponse(BaseModel):
+    """API response wrapper for a batch of recommendations."""
+    
+    results: List[RecommendationResponse] = Field(
+        description="One response per requested profile, in request order"
+    )
+    succeeded: int
+    failed: int
+    execution_time_ms: float
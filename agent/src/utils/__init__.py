@@ -1,9 +1,19 @@
 """Utility modules."""
 
 from .logger import setup_logger
-from .cache import SimpleCache
+from .cache import CacheStats, LRUCache, SimpleCache, make_key
+from .singleflight import SingleFlight
+from .http_cache import ConditionalStats, PayloadCache
+from .rate_limit import RateLimiter
 
 __all__ = [
     "setup_logger",
     "SimpleCache",
+    "LRUCache",
+    "CacheStats",
+    "make_key",
+    "SingleFlight",
+    "PayloadCache",
+    "ConditionalStats",
+    "RateLimiter",
 ]
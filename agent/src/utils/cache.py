@@ -1,53 +1,192 @@
-"""Simple caching utilities."""
+"""Bounded in-memory caching utilities."""
 
+import sys
 import time
-from typing import Any, Optional, Dict, Callable
+import heapq
+import hashlib
+import json
+import functools
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Any, Optional, Dict, Callable, List, Tuple
 from loguru import logger
 
+from .singleflight import SingleFlight
 
-class SimpleCache:
-    """Simple in-memory TTL cache."""
-    
-    def __init__(self, default_ttl: int = 600):
+
+@dataclass
+class CacheStats:
+    """Runtime counters for a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expiry: float
+    size: int
+
+
+def _canonical(obj: Any) -> Any:
+    """
+    Convert obj to plain JSON data that is equal exactly when obj is.
+
+    Integral floats become ints (1.0 and 1 are the same key), sequences
+    become lists, sets are sorted and dict keys are encoded as strings.
+
+    Raises:
+        TypeError: If obj has no canonical form (e.g. an arbitrary object,
+            whose repr() would only identify it within one process)
+    """
+    if obj is None or isinstance(obj, (bool, int, str)):
+        return obj
+    if isinstance(obj, float):
+        return int(obj) if obj.is_integer() else obj
+    if isinstance(obj, Enum):
+        return _canonical(obj.value)
+    if hasattr(obj, "model_dump"):
+        return _canonical(obj.model_dump(mode="json"))
+    if isinstance(obj, bytes):
+        return obj.hex()
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(item) for item in obj]
+    if isinstance(obj, (set, frozenset)):
+        return sorted((_canonical(item) for item in obj), key=_dumps)
+    if isinstance(obj, dict):
+        items = {}
+        for key, value in obj.items():
+            key = _canonical(key)
+            items[key if isinstance(key, str) else _dumps(key)] = _canonical(value)
+        return items
+    raise TypeError(
+        f"Cannot build a cache key from {type(obj).__name__}; "
+        f"pass a key function that returns its identifying fields"
+    )
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+def make_key(namespace: str, *args: Any, **kwargs: Any) -> str:
+    """
+    Build a stable, fixed-length cache key.
+
+    Arguments are canonicalized (sorted kwargs, integral floats as ints,
+    enums as values, pydantic models dumped) and hashed, so equal inputs
+    always produce the same key regardless of kwargs order or process.
+    Only None, bool, int, float, str, bytes, enums, pydantic models and
+    lists, tuples, sets and dicts of these are accepted.
+
+    Args:
+        namespace: Key prefix, usually the qualified function name
+        *args: Positional arguments
+        **kwargs: Keyword arguments
+
+    Returns:
+        Key of the form "namespace:<hex digest>"
+
+    Raises:
+        TypeError: If an argument has no canonical form
+    """
+    payload = _dumps(_canonical([list(args), kwargs]))
+    digest = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class LRUCache:
+    """Bounded in-memory cache with LRU eviction and per-entry TTL.
+
+    Lookups, inserts and LRU evictions are O(1); expired entries are
+    purged in deadline order from a min-heap. The cache is bounded by an
+    entry count and, optionally, by an approximate byte budget.
+    """
+
+    def __init__(
+        self,
+        default_ttl: int = 600,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = sys.getsizeof
+    ):
         """
         Initialize cache.
-        
+
         Args:
             default_ttl: Default time-to-live in seconds
+            max_entries: Maximum number of entries (None for unbounded)
+            max_bytes: Optional budget for the summed entry sizes
+            sizeof: Function estimating an entry's size in bytes
         """
         self.default_ttl = default_ttl
-        self._cache: Dict[str, tuple[Any, float]] = {}
-        
-        logger.debug(f"SimpleCache initialized with TTL={default_ttl}s")
-    
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._deadlines: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._stats = CacheStats()
+        self._inflight = SingleFlight()
+
+        logger.debug(
+            f"LRUCache initialized with TTL={default_ttl}s, "
+            f"max_entries={max_entries}, max_bytes={max_bytes}"
+        )
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._cache.get(key)
+        return entry is not None and time.time() <= entry.expiry
+
     def get(self, key: str) -> Optional[Any]:
         """
         Get value from cache.
-        
+
         Args:
             key: Cache key
-            
+
         Returns:
             Cached value or None if not found/expired
         """
-        if key not in self._cache:
+        entry = self._cache.get(key)
+
+        if entry is None:
+            self._stats.misses += 1
             return None
-        
-        value, expiry = self._cache[key]
-        
-        if time.time() > expiry:
-            # Expired
-            del self._cache[key]
-            logger.debug(f"Cache miss (expired): {key}")
+
+        if time.time() > entry.expiry:
+            self._remove(key)
+            self._stats.expirations += 1
+            self._stats.misses += 1
             return None
-        
-        logger.debug(f"Cache hit: {key}")
-        return value
-    
+
+        self._cache.move_to_end(key)
+        self._stats.hits += 1
+        return entry.value
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
         Set value in cache.
-        
+
         Args:
             key: Cache key
             value: Value to cache
@@ -55,75 +194,137 @@ class SimpleCache:
         """
         ttl = ttl if ttl is not None else self.default_ttl
         expiry = time.time() + ttl
-        
-        self._cache[key] = (value, expiry)
-        logger.debug(f"Cache set: {key} (TTL={ttl}s)")
-    
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+
+        if key in self._cache:
+            self._remove(key)
+
+        self._cache[key] = _Entry(value=value, expiry=expiry, size=size)
+        self._bytes += size
+        heapq.heappush(self._deadlines, (expiry, key))
+
+        self.cleanup_expired()
+        self._evict_over_budget()
+
     def delete(self, key: str):
         """Delete key from cache."""
         if key in self._cache:
-            del self._cache[key]
-            logger.debug(f"Cache delete: {key}")
-    
+            self._remove(key)
+
     def clear(self):
         """Clear all cache entries."""
         count = len(self._cache)
         self._cache.clear()
+        self._deadlines.clear()
+        self._bytes = 0
         logger.info(f"Cache cleared: {count} entries removed")
-    
+
     def cleanup_expired(self):
-        """Remove all expired entries."""
+        """Remove expired entries in deadline order."""
         now = time.time()
-        expired = [
-            key for key, (_, expiry) in self._cache.items()
-            if now > expiry
-        ]
-        
-        for key in expired:
-            del self._cache[key]
-        
-        if expired:
-            logger.debug(f"Cleaned up {len(expired)} expired cache entries")
-    
-    def cached(self, ttl: Optional[int] = None):
+        removed = 0
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expiry, key = heapq.heappop(self._deadlines)
+            entry = self._cache.get(key)
+            # Skip heap records superseded by a later set() of the same key
+            if entry is not None and entry.expiry == expiry:
+                self._remove(key)
+                removed += 1
+
+        self._stats.expirations += removed
+
+        # Drop stale heap records once they dominate the heap
+        if len(self._deadlines) > 2 * len(self._cache) + 64:
+            self._deadlines = [(entry.expiry, key) for key, entry in self._cache.items()]
+            heapq.heapify(self._deadlines)
+
+    def stats(self) -> CacheStats:
+        """Return a copy of the runtime counters."""
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            expirations=self._stats.expirations,
+            entries=len(self._cache),
+            bytes=self._bytes
+        )
+
+    def _remove(self, key: str):
+        entry = self._cache.pop(key)
+        self._bytes -= entry.size
+
+    def _evict_over_budget(self):
+        while self._cache and (
+            (self.max_entries is not None and len(self._cache) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key, entry = self._cache.popitem(last=False)
+            self._bytes -= entry.size
+            self._stats.evictions += 1
+
+    def cached(
+        self,
+        ttl: Optional[int] = None,
+        key: Optional[Callable[..., Any]] = None
+    ):
         """
         Decorator for caching function results.
-        
+
+        Keys are stable hashes of the qualified function name and
+        arguments (see make_key). Concurrent misses for the same key share
+        a single call to the wrapped function instead of stampeding it.
+
         Args:
             ttl: Optional custom TTL
-            
+            key: Optional function called with the wrapped function's
+                arguments, returning what identifies the call; needed when
+                an argument (such as a method's self) has no canonical form
+
         Example:
             @cache.cached(ttl=300)
             async def expensive_function(arg1, arg2):
                 ...
+
+            @cache.cached(key=lambda self, pool_id: (self.source, pool_id))
+            async def fetch(self, pool_id):
+                ...
         """
         def decorator(func: Callable):
+            namespace = f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
             async def wrapper(*args, **kwargs):
-                # Create cache key from function name and arguments
-                cache_key = f"{func.__name__}:{args}:{kwargs}"
-                
+                if key is None:
+                    cache_key = make_key(namespace, *args, **kwargs)
+                else:
+                    cache_key = make_key(namespace, key(*args, **kwargs))
+
                 # Check cache
                 cached_value = self.get(cache_key)
                 if cached_value is not None:
                     return cached_value
-                
-                # Call function
-                result = await func(*args, **kwargs)
-                
-                # Cache result
-                self.set(cache_key, result, ttl=ttl)
-                
-                return result
-            
+
+                async def load():
+                    result = await func(*args, **kwargs)
+                    self.set(cache_key, result, ttl=ttl)
+                    return result
+
+                return await self._inflight.do(cache_key, load)
+
             return wrapper
-        
+
         return decorator
 
 
+# Backwards-compatible name for the previous unbounded cache
+SimpleCache = LRUCache
+
+
 # Global cache instance
-_global_cache = SimpleCache()
+_global_cache = LRUCache()
 
 
-def get_cache() -> SimpleCache:
+def get_cache() -> LRUCache:
     """Get global cache instance."""
     return _global_cache
@@ -0,0 +1,43 @@
+"""Shared HTTP client configuration."""
+
+import os
+from typing import Optional
+
+import httpx
+
+
+def http_limits_from_env() -> httpx.Limits:
+    """
+    Build connection pool limits from environment variables.
+
+    Reads HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS and
+    HTTP_KEEPALIVE_EXPIRY (seconds).
+
+    Returns:
+        httpx.Limits for pooled keep-alive connections
+    """
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+def create_http_client(
+    timeout: float = 30,
+    limits: Optional[httpx.Limits] = None
+) -> httpx.AsyncClient:
+    """
+    Create a pooled async HTTP client.
+
+    Args:
+        timeout: Request timeout in seconds
+        limits: Optional pool limits (defaults to http_limits_from_env())
+
+    Returns:
+        httpx.AsyncClient reusing keep-alive connections across requests
+    """
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits or http_limits_from_env(),
+    )
@@ -0,0 +1,417 @@
+"""Conditional GET with an on-disk cache of raw upstream payloads."""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from loguru import logger
+
+FETCHED = "fetched"
+NOT_MODIFIED = "not_modified"
+FALLBACK = "fallback"
+
+
+@dataclass
+class ConditionalStats:
+    """Per-source counters for conditional requests."""
+
+    requests: int = 0
+    full_downloads: int = 0
+    not_modified: int = 0
+    fallbacks: int = 0
+    parsed_reuses: int = 0
+    bytes_downloaded: int = 0
+    bytes_saved: int = 0
+    time_saved_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for serialization."""
+        return {**asdict(self), "time_saved_ms": round(self.time_saved_ms, 1)}
+
+
+@dataclass
+class CachedPayload:
+    """A raw payload on disk with the validators it was served with."""
+
+    path: Path
+    etag: Optional[str]
+    last_modified: Optional[str]
+    size: int
+    elapsed_ms: float
+    fetched_at: float
+
+    @property
+    def version(self) -> str:
+        """Identifies the payload content, for memoizing what was parsed from it."""
+        return self.etag or self.last_modified or f"{self.fetched_at}:{self.size}"
+
+    def read_bytes(self) -> bytes:
+        """Read the whole payload."""
+        return self.path.read_bytes()
+
+    async def aiter_bytes(self, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """Read the payload in chunks, like httpx.Response.aiter_bytes."""
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class UpstreamPayload:
+    """Result of a conditional GET: a fresh body or the cached one."""
+
+    def __init__(
+        self,
+        status: str,
+        entry: Optional[CachedPayload],
+        body: Optional[bytes] = None,
+        response: Optional["_TeeResponse"] = None
+    ):
+        self.status = status
+        self.entry = entry
+        self._body = body
+        self._response = response
+
+    @property
+    def from_cache(self) -> bool:
+        """Whether the body is served from disk."""
+        return self.status != FETCHED
+
+    @property
+    def version(self) -> Optional[str]:
+        """Content version, or None if the payload was not cached."""
+        return self.entry.version if self.entry is not None else None
+
+    def json(self) -> Any:
+        """Decode the body as JSON."""
+        if self._body is None:
+            self._body = self.entry.read_bytes()
+        return json.loads(self._body)
+
+    def aiter_bytes(self) -> AsyncIterator[bytes]:
+        """Iterate the body in chunks (streaming responses only)."""
+        if self._response is not None:
+            return self._response.aiter_bytes()
+        return self.entry.aiter_bytes()
+
+
+class PayloadCache:
+    """Raw upstream payloads on disk, revalidated with conditional GETs.
+
+    Each URL's last successful body is kept next to its ETag and
+    Last-Modified headers. Requests send If-None-Match/If-Modified-Since;
+    a 304 or a network failure is answered from disk. Files are replaced
+    atomically, so readers never see a partial payload.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize payload cache.
+
+        Args:
+            directory: Directory holding the cached payloads (created if missing)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stats: Dict[str, ConditionalStats] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["PayloadCache"]:
+        """
+        Create a cache in HTTP_CACHE_DIR.
+
+        Returns:
+            PayloadCache, or None when HTTP_CACHE_DIR is unset or empty
+        """
+        directory = os.getenv("HTTP_CACHE_DIR", "")
+        return cls(directory) if directory else None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-source counters keyed by source name."""
+        return {source: stats.to_dict() for source, stats in self._stats.items()}
+
+    def source_stats(self, source: str) -> ConditionalStats:
+        """Counters for one source."""
+        return self._stats.setdefault(source, ConditionalStats())
+
+    def record_parsed_reuse(self, source: str, parse_ms: float):
+        """
+        Record that a parsed result was reused instead of parsing again.
+
+        Args:
+            source: Source name
+            parse_ms: Time the original parse took
+        """
+        stats = self.source_stats(source)
+        stats.parsed_reuses += 1
+        stats.time_saved_ms += parse_ms
+
+    def load(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[CachedPayload]:
+        """
+        Look up the cached payload for a request.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+
+        Returns:
+            CachedPayload, or None if nothing (consistent) is cached
+        """
+        body_path, meta_path = self._paths(url, params)
+        try:
+            meta = json.loads(meta_path.read_text())
+            size = body_path.stat().st_size
+        except (OSError, ValueError):
+            return None
+        if size != meta.get("size"):
+            return None
+        return CachedPayload(
+            path=body_path,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            size=size,
+            elapsed_ms=float(meta.get("elapsed_ms", 0.0)),
+            fetched_at=float(meta.get("fetched_at", 0.0)),
+        )
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        source: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> UpstreamPayload:
+        """
+        Conditional GET answered from disk on 304 or network failure.
+
+        Network errors, timeouts, 429 and 5xx responses fall back to the
+        cached payload; other error statuses propagate.
+
+        Args:
+            client: HTTP client
+            url: Request URL
+            source: Source name the stats are recorded under
+            params: Query parameters
+
+        Returns:
+            UpstreamPayload with the fresh or cached body
+
+        Raises:
+            httpx.HTTPError: If the request fails and nothing is cached
+        """
+        cached = self.load(url, params)
+        stats = self.source_stats(source)
+        stats.requests += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, params=params, headers=self._validators(cached))
+            if response.status_code == 304 and cached is not None:
+                return self._not_modified(cached, stats, start)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            return self._fallback(cached, stats, source, e)
+
+        body = response.content
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats.full_downloads += 1
+        stats.bytes_downloaded += len(body)
+        entry = self._store(url, params, response.headers, elapsed_ms, body=body)
+        return UpstreamPayload(FETCHED, entry, body=body)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        source: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[UpstreamPayload]:
+        """
+        Streaming conditional GET.
+
+        A fresh body is written to disk as it is consumed and only
+        replaces the cached payload once it has been read to the end.
+        Failures before the body starts fall back to the cached payload;
+        failures mid-body propagate.
+
+        Args:
+            client: HTTP client
+            url: Request URL
+            source: Source name the stats are recorded under
+            params: Query parameters
+
+        Yields:
+            UpstreamPayload whose aiter_bytes() streams the body
+        """
+        cached = self.load(url, params)
+        stats = self.source_stats(source)
+        stats.requests += 1
+        start = time.perf_counter()
+        request = client.build_request(
+            "GET", url, params=params, headers=self._validators(cached)
+        )
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            yield self._fallback(cached, stats, source, e)
+            return
+
+        try:
+            if response.status_code == 304 and cached is not None:
+                payload = self._not_modified(cached, stats, start)
+            else:
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    payload = self._fallback(cached, stats, source, e)
+                else:
+                    payload = UpstreamPayload(
+                        FETCHED,
+                        None,
+                        response=_TeeResponse(self, url, params, response, stats, start),
+                    )
+            yield payload
+        finally:
+            await response.aclose()
+
+    def _validators(self, cached: Optional[CachedPayload]) -> Dict[str, str]:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def _not_modified(
+        self,
+        cached: CachedPayload,
+        stats: ConditionalStats,
+        start: float
+    ) -> UpstreamPayload:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats.not_modified += 1
+        stats.bytes_saved += cached.size
+        stats.time_saved_ms += max(0.0, cached.elapsed_ms - elapsed_ms)
+        return UpstreamPayload(NOT_MODIFIED, cached)
+
+    def _fallback(
+        self,
+        cached: Optional[CachedPayload],
+        stats: ConditionalStats,
+        source: str,
+        error: httpx.HTTPError
+    ) -> UpstreamPayload:
+        if cached is None or not _is_transient(error):
+            raise error
+        stats.fallbacks += 1
+        logger.warning(
+            f"{source}: upstream request failed ({error}), "
+            f"serving payload cached at {time.ctime(cached.fetched_at)}"
+        )
+        return UpstreamPayload(FALLBACK, cached)
+
+    def _paths(self, url: str, params: Optional[Dict[str, Any]]):
+        request_key = json.dumps([url, sorted((params or {}).items())], default=str)
+        digest = hashlib.sha256(request_key.encode()).hexdigest()[:32]
+        return self.directory / f"{digest}.body", self.directory / f"{digest}.json"
+
+    def _store(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: httpx.Headers,
+        elapsed_ms: float,
+        body: Optional[bytes] = None,
+        body_file: Optional[Path] = None
+    ) -> Optional[CachedPayload]:
+        """Atomically replace the cached payload (from bytes or a temp file)."""
+        body_path, meta_path = self._paths(url, params)
+        try:
+            if body is not None:
+                body_file = body_path.with_suffix(".body.tmp")
+                body_file.write_bytes(body)
+            size = body_file.stat().st_size
+            meta = {
+                "url": url,
+                "etag": headers.get("etag"),
+                "last_modified": headers.get("last-modified"),
+                "size": size,
+                "elapsed_ms": elapsed_ms,
+                "fetched_at": time.time(),
+            }
+            meta_tmp = meta_path.with_suffix(".json.tmp")
+            meta_tmp.write_text(json.dumps(meta))
+            os.replace(body_file, body_path)
+            os.replace(meta_tmp, meta_path)
+        except OSError as e:
+            logger.warning(f"Could not cache payload for {url}: {e}")
+            return None
+        return self.load(url, params)
+
+
+def _is_transient(error: httpx.HTTPError) -> bool:
+    """Network failures, timeouts, 429 and 5xx; other statuses are real errors."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return True
+
+
+class _TeeResponse:
+    """Streams a response body while writing it to the payload cache."""
+
+    def __init__(
+        self,
+        cache: PayloadCache,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        response: httpx.Response,
+        stats: ConditionalStats,
+        start: float
+    ):
+        self._cache = cache
+        self._url = url
+        self._params = params
+        self._response = response
+        self._stats = stats
+        # Network time only: the consumer's work between chunks is excluded
+        self._waited = time.perf_counter() - start
+
+    async def aiter_bytes(self) -> AsyncIterator[bytes]:
+        body_path, _ = self._cache._paths(self._url, self._params)
+        tmp_path = body_path.with_suffix(".body.tmp")
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, "wb") as f:
+                chunks = self._response.aiter_bytes()
+                while True:
+                    wait_start = time.perf_counter()
+                    try:
+                        chunk = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    self._waited += time.perf_counter() - wait_start
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            self._stats.bytes_downloaded += size
+            if complete:
+                self._stats.full_downloads += 1
+                self._cache._store(
+                    self._url, self._params, self._response.headers, self._waited * 1000,
+                    body_file=tmp_path
+                )
+            else:
+                tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,168 @@
+"""Incremental parsing of large JSON array payloads."""
+
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _NeedMore(Exception):
+    """The buffer ends before the next complete token."""
+
+
+class _Buffer:
+    """Text buffer fed from byte chunks, consumed from the front."""
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def feed(self, chunk: bytes):
+        # Drop consumed text so memory stays bounded by one item
+        self.text = self.text[self.pos:] + self._utf8.decode(chunk)
+        self.pos = 0
+
+    def finish(self):
+        self.text = self.text[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+
+    def skip_whitespace(self):
+        text, pos = self.text, self.pos
+        while pos < len(text) and text[pos] in _WHITESPACE:
+            pos += 1
+        self.pos = pos
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        if self.pos >= len(self.text):
+            raise _NeedMore
+        return self.text[self.pos]
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        try:
+            value, end = _decoder.raw_decode(self.text, self.pos)
+        except json.JSONDecodeError:
+            if self.eof:
+                raise
+            raise _NeedMore from None
+        # A number at the very end of the buffer may continue in the next chunk
+        if end >= len(self.text) and not self.eof and not isinstance(value, (dict, list, str)):
+            raise _NeedMore
+        self.pos = end
+        return value
+
+
+async def iter_json_array(
+    chunks: AsyncIterable[bytes],
+    key: str = "data"
+) -> AsyncIterator[Any]:
+    """
+    Yield items of a top-level object's array member as bytes arrive.
+
+    Only the item being decoded (plus one chunk) is buffered, so memory
+    is bounded by the largest item rather than the payload. Other
+    top-level members are decoded and discarded.
+
+    Args:
+        chunks: Async iterable of raw body bytes (e.g. response.aiter_bytes())
+        key: Name of the array member to stream
+
+    Yields:
+        Decoded array items in order
+
+    Raises:
+        ValueError: If the payload is not a JSON object, is truncated or
+            has trailing data
+    """
+    buffer = _Buffer()
+    iterator = chunks.__aiter__()
+    # Parser states: start, after_open, key, colon, value, array_first,
+    # array_item, array_sep, after_member, done
+    state = "start"
+    current_key = None
+
+    while state != "done":
+        try:
+            if state == "start":
+                buffer.expect("{")
+                state = "after_open"
+            elif state == "after_open":
+                if buffer.peek() == "}":
+                    buffer.pos += 1
+                    state = "done"
+                else:
+                    state = "key"
+            elif state == "key":
+                current_key = buffer.value()
+                state = "colon"
+            elif state == "colon":
+                buffer.expect(":")
+                state = "value"
+            elif state == "value":
+                if current_key == key and buffer.peek() == "[":
+                    buffer.pos += 1
+                    state = "array_first"
+                else:
+                    buffer.value()
+                    state = "after_member"
+            elif state == "array_first":
+                if buffer.peek() == "]":
+                    buffer.pos += 1
+                    state = "after_member"
+                else:
+                    state = "array_item"
+            elif state == "array_item":
+                item = buffer.value()
+                state = "array_sep"
+                yield item
+            elif state == "array_sep":
+                separator = buffer.peek()
+                buffer.pos += 1
+                if separator == ",":
+                    state = "array_item"
+                elif separator == "]":
+                    state = "after_member"
+                else:
+                    raise ValueError(f"Expected ',' or ']' at offset {buffer.pos - 1}")
+            elif state == "after_member":
+                separator = buffer.peek()
+                buffer.pos += 1
+                if separator == ",":
+                    state = "key"
+                elif separator == "}":
+                    state = "done"
+                else:
+                    raise ValueError(f"Expected ',' or '}}' at offset {buffer.pos - 1}")
+        except _NeedMore:
+            if buffer.eof:
+                raise ValueError("Truncated JSON payload") from None
+            try:
+                buffer.feed(await iterator.__anext__())
+            except StopAsyncIteration:
+                buffer.finish()
+
+    # Read the body to the end so consumers of the chunks (e.g. a cache
+    # writer) see it complete; only whitespace may follow the object
+    while True:
+        buffer.skip_whitespace()
+        if buffer.pos < len(buffer.text):
+            raise ValueError(f"Unexpected data after JSON object at offset {buffer.pos}")
+        if buffer.eof:
+            break
+        try:
+            buffer.feed(await iterator.__anext__())
+        except StopAsyncIteration:
+            buffer.finish()
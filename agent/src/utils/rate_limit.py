@@ -0,0 +1,61 @@
+"""Concurrency and request-rate budget for an upstream API."""
+
+import asyncio
+import os
+from typing import Optional
+
+
+class RateLimiter:
+    """Caps concurrent requests and spaces request starts evenly.
+
+    Use as an async context manager around each request. Start slots are
+    handed out in arrival order, so a burst of callers is spread over
+    time instead of hitting the upstream at once.
+    """
+
+    def __init__(self, max_concurrency: int = 4, requests_per_second: Optional[float] = None):
+        """
+        Initialize rate limiter.
+
+        Args:
+            max_concurrency: Maximum requests in flight
+            requests_per_second: Maximum request starts per second (None or 0 for unlimited)
+        """
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second or None
+        self._interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._next_slot = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "RateLimiter":
+        """
+        Build a limiter from {prefix}_MAX_CONCURRENCY and {prefix}_REQUESTS_PER_SECOND.
+
+        Args:
+            prefix: Environment variable prefix, e.g. "HORIZON"
+
+        Returns:
+            RateLimiter (defaults: 4 concurrent, 5 requests per second)
+        """
+        return cls(
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "4")),
+            requests_per_second=float(os.getenv(f"{prefix}_REQUESTS_PER_SECOND", "5")),
+        )
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self._interval:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+            if slot > now:
+                try:
+                    await asyncio.sleep(slot - now)
+                except BaseException:
+                    self._semaphore.release()
+                    raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._semaphore.release()
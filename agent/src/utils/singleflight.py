@@ -0,0 +1,79 @@
+"""Coalesce concurrent identical async calls into one in-flight computation."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The first caller for a key starts the work; callers arriving while it
+    is running await the same result (or exception). Once it finishes the
+    key is released, so later calls start fresh work.
+
+    The shared work is shielded from cancellation of any single waiter, so
+    one disconnecting client does not fail the others; once the last
+    waiter for a key is cancelled nobody needs the result, so the work
+    itself is cancelled.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once per key among concurrent callers.
+
+        Args:
+            key: Identity of the computation
+            fn: Zero-argument coroutine function performing the work
+
+        Returns:
+            The shared result of fn
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            logger.debug(f"Joining in-flight call: {key}")
+        else:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._release(key, done))
+
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+                if not future.done():
+                    logger.debug(f"Cancelling in-flight call with no waiters left: {key}")
+                    future.cancel()
+
+    def _release(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not future.cancelled():
+            future.exception()
+
+    def wrap(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]]
+    ) -> Callable[[], Awaitable[Any]]:
+        """Return a zero-argument coroutine function coalesced under key."""
+        async def coalesced():
+            return await self.do(key, fn)
+
+        return coalesced
@@ -0,0 +1,62 @@
+"""Server-Sent Events parsing."""
+
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Optional
+
+
+@dataclass
+class SSEEvent:
+    """One dispatched Server-Sent Event."""
+
+    event: str = "message"
+    data: str = ""
+    id: Optional[str] = None
+    retry_ms: Optional[int] = None
+
+
+async def iter_sse(lines: AsyncIterable[str]) -> AsyncIterator[SSEEvent]:
+    """
+    Parse an event stream into events, following the WHATWG rules.
+
+    Fields accumulate until a blank line dispatches the event; comment
+    lines (leading ':') and unknown fields are ignored, and an event with
+    no data is not dispatched. A trailing event without its blank line
+    is dropped, as the stream was cut mid-event.
+
+    Args:
+        lines: Decoded lines without terminators (e.g. response.aiter_lines())
+
+    Yields:
+        SSEEvent per dispatched event
+    """
+    event = SSEEvent()
+    data_lines = []
+    has_data = False
+
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            if has_data:
+                event.data = "\n".join(data_lines)
+                yield event
+            event = SSEEvent(id=event.id)
+            data_lines = []
+            has_data = False
+            continue
+        if line.startswith(":"):
+            continue
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            data_lines.append(value)
+            has_data = True
+        elif field == "event":
+            event.event = value or "message"
+        elif field == "id":
+            if "\0" not in value:
+                event.id = value
+        elif field == "retry":
+            if value.isdigit():
+                event.retry_ms = int(value)
@@ -0,0 +1,39 @@
+"""Shared test helpers."""
+
+from typing import Any, Optional
+
+from src.models.yield_opportunity import RiskTier, YieldOpportunity
+
+
+def make_opportunity(
+    pool: Optional[str],
+    project: str = "test",
+    apy: Optional[float] = None,
+    tier: Optional[RiskTier] = RiskTier.A,
+    chain: str = "Ethereum",
+    tvl: Optional[float] = 1e9,
+    symbol: Optional[str] = None,
+    **fields: Any
+) -> YieldOpportunity:
+    """
+    Create an opportunity for tests.
+
+    Args:
+        pool: Pool id (None for a pool without one)
+        project: Protocol name
+        apy: Total APY %
+        tier: Risk tier
+        chain: Chain name
+        tvl: TVL in USD
+        symbol: Token symbol (defaults to the upper-cased pool id)
+        **fields: Any other YieldOpportunity fields, by name or alias
+
+    Returns:
+        YieldOpportunity
+    """
+    if symbol is None:
+        symbol = pool.upper() if pool else "USDC"
+    return YieldOpportunity(
+        chain=chain, project=project, symbol=symbol, pool=pool, tvlUsd=tvl,
+        apy=apy, risk_tier=tier, **fields
+    )
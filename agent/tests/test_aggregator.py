@@ -0,0 +1,257 @@
+"""Tests for data aggregation."""
+
+import asyncio
+import time
+import httpx
+import pytest
+from src.data import defillama_fetcher
+from src.data.aggregator import DataAggregator
+from src.data.filters import FilterSpec
+from src.models.yield_opportunity import RiskTier
+
+
+DEFILLAMA_POOLS = {
+    "data": [
+        {
+            "chain": "Ethereum", "project": "aave-v3", "symbol": "USDC", "pool": "eth-usdc",
+            "tvlUsd": 1000000, "apy": 4.0, "stablecoin": True, "ilRisk": "no",
+            "exposure": "single",
+        },
+        {
+            "chain": "Arbitrum", "project": "gmx", "symbol": "ETH", "pool": "arb-eth",
+            "tvlUsd": 2000000, "apy": 9.0, "stablecoin": False, "ilRisk": "no",
+            "exposure": "single",
+        },
+        {
+            "chain": "Stellar", "project": "blend", "symbol": "USDC", "pool": "xlm-usdc",
+            "tvlUsd": 3000000, "apy": 6.0, "stablecoin": True, "ilRisk": "no",
+            "exposure": "single",
+        },
+        {
+            "chain": "Solana", "project": "marinade", "symbol": "MSOL", "pool": "sol-msol",
+            "tvlUsd": 5000000, "apy": 7.0, "stablecoin": False, "ilRisk": "no",
+            "exposure": "single",
+        },
+    ]
+}
+
+HORIZON_POOLS = {
+    "_embedded": {
+        "records": [
+            {
+                "id": "lp-1",
+                "fee_bp": 30,
+                "total_shares": "100.0",
+                "reserves": [
+                    {"asset": "native", "amount": "1000.0"},
+                    {"asset": "USDC:GA5Z", "amount": "120.0"},
+                ],
+            }
+        ]
+    }
+}
+
+
+@pytest.fixture
+def upstream_calls():
+    """Count upstream requests per host."""
+    return {"defillama": 0, "horizon": 0}
+
+
+@pytest.fixture
+async def aggregator(upstream_calls):
+    """Aggregator wired to an in-process stand-in for DeFiLlama and Horizon."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "yields.llama.fi":
+            upstream_calls["defillama"] += 1
+            return httpx.Response(200, json=DEFILLAMA_POOLS)
+        upstream_calls["horizon"] += 1
+        return httpx.Response(200, json=HORIZON_POOLS)
+
+    agg = DataAggregator()
+    agg.client._transport = httpx.MockTransport(handler)
+    yield agg
+    await agg.close()
+
+
+class TestDataAggregator:
+    """Test cases for DataAggregator."""
+
+    async def test_multiple_chains_download_pools_once(self, aggregator, upstream_calls):
+        """Test that requesting several chains fetches /pools a single time."""
+        opportunities = await aggregator.fetch_all_opportunities(
+            chains=["Stellar", "Ethereum", "Arbitrum"]
+        )
+
+        assert upstream_calls["defillama"] == 1
+        pools = {opp.pool for opp in opportunities}
+        assert {"eth-usdc", "arb-eth", "xlm-usdc", "lp-1"} <= pools
+        assert "sol-msol" not in pools
+
+    async def test_chain_filter_is_case_insensitive(self, aggregator):
+        """Test chain selection ignores case and duplicate chain names."""
+        opportunities = await aggregator.fetch_all_opportunities(
+            chains=["ethereum", "ETHEREUM"],
+            include_stellar_native=False
+        )
+
+        assert [opp.pool for opp in opportunities] == ["eth-usdc"]
+
+    async def test_min_tvl_filter(self, aggregator):
+        """Test that pools without enough TVL are dropped."""
+        opportunities = await aggregator.fetch_all_opportunities(min_tvl_usd=2500000)
+
+        assert {opp.pool for opp in opportunities} == {"xlm-usdc", "sol-msol"}
+
+    async def test_sources_fetched_concurrently_with_partial_results(self, aggregator):
+        """Test that a slow source times out without blocking the others."""
+        async def slow_source():
+            await asyncio.sleep(5)
+            return []
+
+        async def failing_source():
+            raise RuntimeError("upstream down")
+
+        aggregator.register_source("slow", slow_source, timeout_seconds=0.2)
+        aggregator.register_source("broken", failing_source)
+
+        started = time.perf_counter()
+        snapshot = await aggregator.build_snapshot(version=1)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 1.0
+        assert snapshot.sources == ["defillama", "stellar_dex"]
+        assert set(snapshot.source_errors) == {"slow", "broken"}
+        assert "timed out" in snapshot.source_errors["slow"]
+
+    async def test_filters_pushed_down_before_validation(self, aggregator, monkeypatch):
+        """Test that only pools passing the raw filters are validated into models."""
+        constructed = []
+        build = defillama_fetcher.build_opportunities
+
+        def counting_build(records, **kwargs):
+            constructed.extend(record["pool"] for record in records)
+            return build(records, **kwargs)
+
+        monkeypatch.setattr(defillama_fetcher, "build_opportunities", counting_build)
+
+        opportunities = await aggregator.fetch_all_opportunities(
+            min_tvl_usd=1500000,
+            min_apy=6.5,
+            max_risk_tier=RiskTier.C,
+            include_stellar_native=False
+        )
+
+        assert [opp.pool for opp in opportunities] == ["arb-eth", "sol-msol"]
+        assert constructed == ["arb-eth", "sol-msol"]
+
+    async def test_ingest_floor_applies_to_snapshots(self, aggregator):
+        """Test that the ingest floor is pushed into snapshot builds."""
+        aggregator.ingest_spec = FilterSpec.create(min_apy=6.5)
+
+        snapshot = await aggregator.build_snapshot(version=1)
+
+        assert [opp.pool for opp in snapshot.by_source["defillama"]] == ["arb-eth", "sol-msol"]
+        # lp-1 has no trade volume tracked yet, so no APY to pass the floor with
+        assert len(snapshot.by_source["stellar_dex"]) == 0
+
+    async def test_lookup_pools_fetches_only_misses(self, aggregator):
+        """Test snapshot hits need no I/O and misses go to the sources' lookups."""
+        stellar_id = "ab" * 32
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.url.path)
+            if request.url.host == "yields.llama.fi":
+                return httpx.Response(200, json=DEFILLAMA_POOLS)
+            if request.url.path == f"/liquidity_pools/{stellar_id}":
+                record = HORIZON_POOLS["_embedded"]["records"][0]
+                return httpx.Response(200, json={**record, "id": stellar_id})
+            if request.url.path.startswith("/liquidity_pools/"):
+                return httpx.Response(404)
+            return httpx.Response(200, json=HORIZON_POOLS)
+
+        aggregator.client._transport = httpx.MockTransport(handler)
+        aggregator.ingest_spec = FilterSpec.create(min_apy=6.5)
+        snapshot = await aggregator.build_snapshot(version=1)
+        requests.clear()
+
+        hits = await aggregator.lookup_pools(snapshot, ["arb-eth", "sol-msol"])
+        assert requests == []
+        assert [opp.pool for opp in hits.values()] == ["arb-eth", "sol-msol"]
+
+        found = await aggregator.lookup_pools(snapshot, ["arb-eth", "eth-usdc", stellar_id, "nope"])
+        assert found["arb-eth"] is snapshot.get("arb-eth")
+        assert found["eth-usdc"].apy == 4.0
+        assert found[stellar_id].chain == "Stellar"
+        assert found["nope"] is None
+        # The snapshot build already indexed every DeFiLlama pool
+        assert "/pools" not in requests
+        assert f"/liquidity_pools/{stellar_id}" in requests
+
+
+
+class TestDefiLlamaPoolIndex:
+    """Test cases for DefiLlamaFetcher.get_pools_by_id."""
+
+    async def test_cold_fetcher_downloads_once(self, aggregator, upstream_calls):
+        """Test a fetcher that has not fetched yet downloads /pools once for lookups."""
+        fetcher = aggregator.defillama
+        first, second = await asyncio.gather(
+            fetcher.get_pools_by_id(["eth-usdc", "nope"]),
+            fetcher.get_pools_by_id(["arb-eth"]),
+        )
+        assert first["eth-usdc"].apy == 4.0
+        assert first["nope"] is None
+        assert second["arb-eth"].risk_tier is not None
+        assert upstream_calls["defillama"] == 1
+
+        assert (await fetcher.get_pools_by_id(["eth-usdc"]))["eth-usdc"] is first["eth-usdc"]
+        assert upstream_calls["defillama"] == 1
+
+    async def test_snapshot_fetches_refresh_the_index(self, aggregator, upstream_calls):
+        """Test filtered fetches index every pool and lookups never download."""
+        fetcher = aggregator.defillama
+        spec = FilterSpec.create(min_apy=6.5)
+        await fetcher.fetch_pools(spec=spec)
+
+        found = await fetcher.get_pools_by_id(["eth-usdc", "arb-eth", "nope"])
+        assert found["eth-usdc"].apy == 4.0
+        assert found["arb-eth"].apy == 9.0
+        assert found["nope"] is None
+        assert upstream_calls["defillama"] == 1
+
+        # eth-usdc is delisted and arb-eth's APY moves upstream
+        pools = {"data": [
+            {**pool, "apy": 12.0} for pool in DEFILLAMA_POOLS["data"] if pool["pool"] != "eth-usdc"
+        ]}
+        downloads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            downloads.append(request.url.path)
+            return httpx.Response(200, json=pools)
+
+        aggregator.client._transport = httpx.MockTransport(handler)
+        # Until the next snapshot build, lookups keep answering from the index
+        assert (await fetcher.get_pools_by_id(["arb-eth"]))["arb-eth"].apy == 9.0
+        assert downloads == []
+
+        await fetcher.fetch_pools(spec=spec)
+        refreshed = await fetcher.get_pools_by_id(["arb-eth", "eth-usdc"])
+        assert refreshed["arb-eth"].apy == 12.0
+        assert refreshed["eth-usdc"] is None
+        assert downloads == ["/pools"]
+
+    async def test_streamed_fetch_feeds_the_index(self, aggregator, upstream_calls):
+        """Test the streaming path indexes the pools it skipped too."""
+        fetcher = aggregator.defillama
+        fetcher.stream = True
+        await fetcher.fetch_pools(chain="Solana")
+
+        found = await fetcher.get_pools_by_id(["xlm-usdc"])
+        assert found["xlm-usdc"].chain == "Stellar"
+        assert upstream_calls["defillama"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
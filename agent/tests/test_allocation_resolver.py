@@ -0,0 +1,70 @@
+"""Tests for matching model allocations to opportunities."""
+
+import pytest
+from src.agent.allocation_resolver import AllocationResolver
+from tests.conftest import make_opportunity
+
+
+@pytest.fixture
+def opportunities():
+    return [
+        make_opportunity("eth-usdc", "aave-v3", symbol="USDC", tvl=5e6),
+        make_opportunity("arb-usdc", "aave-v3", symbol="USDC", chain="Arbitrum", tvl=9e6),
+        make_opportunity("eth-weth", "aave-v3", symbol="WETH", tvl=8e6),
+        make_opportunity("uni-pair", "uniswap-v3", symbol="USDC-WETH", tvl=2e6),
+        make_opportunity("lp-1", "Stellar DEX", symbol="XLM/USDC", chain="Stellar", tvl=3e5),
+    ]
+
+
+class TestAllocationResolver:
+    """Test cases for AllocationResolver."""
+
+    def test_match_order_and_confidence(self, opportunities):
+        """Test id, (project, symbol), token-set and fuzzy matches in that order."""
+        resolver = AllocationResolver(opportunities)
+        by_pool = {opp.pool: opp for opp in opportunities}
+
+        exact = resolver.resolve({"pool_id": "lp-1", "project": "other", "symbol": "X"})
+        pair = resolver.resolve({"pool_id": "?", "project": "Aave-V3", "symbol": "usdc",
+                                 "chain": "Ethereum"})
+        reordered = resolver.resolve({"project": "Uniswap V3", "symbol": "WETH/USDC"})
+        fallback_id = resolver.resolve({"pool_id": "stellar-dex-xlm-usdc"})
+        fuzzy = resolver.resolve({"project": "uniswap", "symbol": "USDC-WETH"})
+
+        assert exact.opportunity is by_pool["lp-1"]
+        assert (exact.method, exact.confidence) == ("pool_id", 1.0)
+        assert pair.opportunity is by_pool["eth-usdc"]
+        assert (pair.method, pair.confidence) == ("project_symbol", 0.9)
+        assert (reordered.opportunity, reordered.method) == (by_pool["uni-pair"], "tokens")
+        assert fallback_id.opportunity is by_pool["lp-1"]
+        assert (fuzzy.opportunity, fuzzy.method) == (by_pool["uni-pair"], "fuzzy")
+        assert 0 < fuzzy.confidence < 0.7
+        assert resolver.resolve({"project": "compound", "symbol": "DAI"}) is None
+
+    def test_ties_prefer_chain_then_shortlist(self, opportunities):
+        """Test shared keys narrow by chain, then shortlist, then TVL at lower confidence."""
+        resolver = AllocationResolver(opportunities)
+        by_pool = {opp.pool: opp for opp in opportunities}
+        allocation = {"project": "aave-v3", "symbol": "USDC"}
+
+        shortlisted = resolver.resolve(allocation, shortlist=[by_pool["eth-usdc"]])
+        untied = resolver.resolve(allocation)
+
+        assert shortlisted.opportunity is by_pool["eth-usdc"]
+        assert shortlisted.confidence == 0.9
+        assert untied.opportunity is by_pool["arb-usdc"]
+        assert untied.confidence == pytest.approx(0.9 * 0.8)
+
+    def test_bare_project_only_when_unambiguous(self, opportunities):
+        """Test a project name alone never picks one of several pools."""
+        resolver = AllocationResolver(opportunities)
+        by_pool = {opp.pool: opp for opp in opportunities}
+
+        assert resolver.resolve({"project": "aave-v3"}, shortlist=opportunities) is None
+        only = resolver.resolve({"project": "uniswap-v3"}, shortlist=opportunities)
+        assert only.opportunity is by_pool["uni-pair"]
+        assert only.method == "project"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
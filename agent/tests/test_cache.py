@@ -0,0 +1,118 @@
+"""Tests for the bounded LRU + TTL cache."""
+
+import time
+import pytest
+from src.utils.cache import LRUCache, make_key
+
+
+class TestLRUCache:
+    """Test cases for LRUCache."""
+
+    def test_get_set_and_counters(self):
+        """Test basic lookups update hit/miss counters."""
+        cache = LRUCache(default_ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+
+        stats = cache.stats()
+        assert stats.hits == 1
+        assert stats.misses == 1
+        assert stats.entries == 1
+        assert stats.hit_rate == 0.5
+
+    def test_evicts_least_recently_used(self):
+        """Test the LRU entry is evicted when over max_entries."""
+        cache = LRUCache(default_ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats().evictions == 1
+
+    def test_max_bytes_budget(self):
+        """Test entries are evicted to stay within the byte budget."""
+        cache = LRUCache(default_ttl=60, max_entries=None, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "yyyy")
+        cache.set("c", "zzzz")
+
+        assert len(cache) == 2
+        assert "a" not in cache
+        assert cache.stats().bytes == 8
+
+    def test_expired_entries_purged_in_deadline_order(self):
+        """Test expired entries are removed without touching live ones."""
+        cache = LRUCache(default_ttl=60)
+        cache.set("short", 1, ttl=0)
+        cache.set("long", 2, ttl=60)
+        time.sleep(0.01)
+
+        cache.cleanup_expired()
+
+        assert len(cache) == 1
+        assert cache.get("long") == 2
+        assert cache.stats().expirations == 1
+
+    def test_reset_ttl_on_overwrite(self):
+        """Test overwriting a key replaces its deadline."""
+        cache = LRUCache(default_ttl=60)
+        cache.set("a", 1, ttl=0)
+        cache.set("a", 2, ttl=60)
+        time.sleep(0.01)
+
+        cache.cleanup_expired()
+
+        assert cache.get("a") == 2
+
+
+class TestMakeKey:
+    """Test cases for stable cache keys."""
+
+    def test_kwargs_order_does_not_matter(self):
+        """Test keys are independent of keyword argument order."""
+        assert make_key("f", 1, a=1, b=[1, 2]) == make_key("f", 1, b=[1, 2], a=1)
+
+    def test_different_inputs_differ(self):
+        """Test distinct arguments and namespaces give distinct keys."""
+        assert make_key("f", 1) != make_key("f", 2)
+        assert make_key("f", 1) != make_key("g", 1)
+
+    def test_equal_numbers_share_a_key(self):
+        """Test 1 and 1.0 (also inside containers) give the same key."""
+        assert make_key("f", 1, a=2) == make_key("f", 1.0, a=2.0)
+        assert make_key("f", [1, {"x": 2}], {3}) == make_key("f", (1.0, {"x": 2.0}), {3.0})
+        assert make_key("f", 1) != make_key("f", 1.5)
+
+    def test_objects_without_canonical_form_are_rejected(self):
+        """Test arbitrary objects raise instead of keying on their id-based repr."""
+        with pytest.raises(TypeError, match="object"):
+            make_key("f", object())
+
+    async def test_cached_method_uses_key_function(self):
+        """Test a key function makes methods cacheable across instances."""
+        cache = LRUCache(default_ttl=60)
+        calls = []
+
+        class Source:
+            def __init__(self, name):
+                self.name = name
+
+            @cache.cached(key=lambda self, pool_id: (self.name, pool_id))
+            async def fetch(self, pool_id):
+                calls.append((self.name, pool_id))
+                return f"{self.name}:{pool_id}"
+
+        assert await Source("a").fetch("p1") == "a:p1"
+        assert await Source("a").fetch("p1") == "a:p1"
+        assert await Source("b").fetch("p1") == "b:p1"
+        assert calls == [("a", "p1"), ("b", "p1")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
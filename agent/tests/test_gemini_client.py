@@ -0,0 +1,122 @@
+"""Tests for non-blocking Gemini calls."""
+
+import asyncio
+import json
+import pytest
+from src.agent.gemini_client import GeminiClient
+from src.agent.portfolio_optimizer import PortfolioOptimizer
+from src.models.yield_opportunity import RiskTier
+from tests.conftest import make_opportunity
+
+
+class FakeModel:
+    """generate_content_async stand-in that records concurrency and cancellation."""
+
+    def __init__(self, delay: float = 0.01, hang: bool = False):
+        self.delay = delay
+        self.hang = hang
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.hang:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delay)
+            return f"response to {prompt}"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+
+
+def make_client(model: FakeModel, **kwargs) -> GeminiClient:
+    client = GeminiClient(api_key="test-key", **kwargs)
+    client.model = model
+    return client
+
+
+class TestGenerate:
+    """Test cases for GeminiClient._generate."""
+
+    async def test_semaphore_bounds_concurrency(self):
+        """Test no more than max_concurrency calls run at once."""
+        model = FakeModel(delay=0.02)
+        client = make_client(model, max_concurrency=2)
+
+        responses = await asyncio.gather(*(client._generate(f"p{i}") for i in range(6)))
+
+        assert responses == [f"response to p{i}" for i in range(6)]
+        assert model.peak == 2
+
+    async def test_hang_becomes_timeout_error(self):
+        """Test a call that never returns raises TimeoutError and gives back its slot."""
+        model = FakeModel(hang=True)
+        client = make_client(model, max_concurrency=1, timeout_seconds=0.05)
+
+        with pytest.raises(TimeoutError, match="timed out"):
+            await client._generate("prompt")
+
+        assert model.cancelled == 1
+        model.hang = False
+        assert await asyncio.wait_for(client._generate("next"), timeout=1) == "response to next"
+
+    async def test_cancelling_frees_the_slot(self):
+        """Test cancelling a waiting caller abandons its call so the next one runs."""
+        model = FakeModel(hang=True)
+        client = make_client(model, max_concurrency=1, timeout_seconds=30)
+
+        task = asyncio.create_task(client._generate("abandoned"))
+        while model.active == 0:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert model.cancelled == 1
+        model.hang = False
+        assert await asyncio.wait_for(client._generate("next"), timeout=1) == "response to next"
+
+
+class TestNarrativePrompt:
+    """Test cases for GeminiClient.get_narrative."""
+
+    async def test_prompt_has_no_amounts(self):
+        """Test the prompt states weights only, so it is the same for any amount."""
+        prompts = []
+
+        class Model:
+            async def generate_content_async(self, prompt, generation_config=None):
+                prompts.append(prompt)
+                return type("Response", (), {"text": json.dumps({"summary": "ok"})})()
+
+        client = make_client(Model())
+        opportunities = [
+            make_opportunity("usdc", "aave-v3", 5.0),
+            make_opportunity("dai", "spark", 6.0),
+            make_opportunity("frax", "curve", 4.0, chain="Arbitrum"),
+        ]
+        portfolios = [
+            PortfolioOptimizer().optimize(opportunities, amount, RiskTier.A)
+            for amount in (3000, 3456.78)
+        ]
+
+        for portfolio in portfolios:
+            assert await client.get_narrative(portfolio, "low") == {"summary": "ok"}
+
+        assert prompts[0] == prompts[1]
+        for portfolio, prompt in zip(portfolios, prompts):
+            assert f"{portfolio.amount_usd:,.2f}" not in prompt
+            assert f"{portfolio.amount_usd:,.0f}" not in prompt
+            for position in portfolio.positions:
+                assert f"{position.allocation_usd:,.2f}" not in prompt
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
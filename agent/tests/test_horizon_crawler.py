@@ -0,0 +1,259 @@
+"""Tests for the paginated Horizon liquidity pool crawler."""
+
+import asyncio
+import httpx
+import pytest
+from src.data.horizon_crawler import HorizonPoolCrawler
+from src.data.price_resolver import AssetPriceResolver
+from src.data.stellar_fetcher import StellarFetcher
+from src.utils.rate_limit import RateLimiter
+
+HORIZON_URL = "https://horizon.test"
+
+
+def pool_record(i: int):
+    return {
+        "id": f"lp-{i:04d}",
+        "paging_token": str(1000 + i),
+        "fee_bp": 30,
+        "total_shares": "100.0",
+        "reserves": [
+            {"asset": "native", "amount": "1000.0"},
+            {"asset": "USDC:GA5Z", "amount": "120.0"},
+        ],
+    }
+
+
+class FakeHorizon:
+    """In-process stand-in for Horizon's cursor-paginated /liquidity_pools."""
+
+    def __init__(self, n: int):
+        self.records = [pool_record(i) for i in range(n)]
+        self.requests = []
+        self.fail_at_cursor = None
+        self.throttle_next = 0
+
+    def add(self, n: int):
+        start = len(self.records)
+        self.records.extend(pool_record(i) for i in range(start, start + n))
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        self.requests.append(dict(params))
+        if self.throttle_next:
+            self.throttle_next -= 1
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        cursor = params.get("cursor")
+        if cursor is not None and cursor == self.fail_at_cursor:
+            return httpx.Response(404)
+        limit = int(params.get("limit", 10))
+        after = int(cursor) if cursor else -1
+        page = [r for r in self.records if int(r["paging_token"]) > after][:limit]
+        next_cursor = page[-1]["paging_token"] if page else cursor or ""
+        return httpx.Response(200, json={
+            "_links": {"next": {
+                "href": f"{HORIZON_URL}/liquidity_pools?cursor={next_cursor}&limit={limit}&order=asc"
+            }},
+            "_embedded": {"records": page},
+        })
+
+
+@pytest.fixture
+async def client_for():
+    clients = []
+
+    def make(horizon: FakeHorizon) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(horizon))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+def make_crawler(client, state_path=None, **kwargs):
+    kwargs.setdefault("limiter", RateLimiter(max_concurrency=4))
+    return HorizonPoolCrawler(
+        client, HORIZON_URL, state_path=str(state_path or ""), page_size=10, **kwargs
+    )
+
+
+class TestHorizonPoolCrawler:
+    """Test cases for HorizonPoolCrawler."""
+
+    async def test_follows_next_links_across_pages(self, client_for):
+        """Test every page is fetched and merged in order."""
+        horizon = FakeHorizon(35)
+        crawler = make_crawler(client_for(horizon))
+        pages = []
+
+        async def on_page(records):
+            pages.append([r["id"] for r in records])
+
+        report = await crawler.crawl(on_page=on_page)
+
+        assert report.full
+        assert report.pages == 4
+        assert report.new_pools == report.total_pools == 35
+        assert [r["id"] for r in crawler.pools] == [r["id"] for r in horizon.records]
+        assert [len(p) for p in pages] == [10, 10, 10, 5]
+        # The short last page ends the crawl without an extra empty request
+        assert len(horizon.requests) == 4
+
+    async def test_persisted_cursor_fetches_only_new_pools(self, tmp_path, client_for):
+        """Test a later crawler instance resumes from the saved cursor."""
+        horizon = FakeHorizon(25)
+        state = tmp_path / "horizon" / "pools.json"
+        await make_crawler(client_for(horizon), state).crawl()
+        horizon.add(7)
+        horizon.requests.clear()
+
+        crawler = make_crawler(client_for(horizon), state)
+        report = await crawler.crawl()
+
+        assert not report.full
+        assert horizon.requests[0]["cursor"] == "1024"
+        assert report.new_pools == 7
+        assert report.updated_pools == 0
+        assert len(crawler) == 32
+
+    async def test_interrupted_crawl_resumes(self, tmp_path, client_for):
+        """Test partial progress is kept and the next crawl continues from it."""
+        horizon = FakeHorizon(30)
+        horizon.fail_at_cursor = "1019"
+        state = tmp_path / "pools.json"
+        crawler = make_crawler(client_for(horizon), state)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await crawler.crawl()
+        assert len(crawler) == 20
+        assert crawler.cursor == "1019"
+
+        horizon.fail_at_cursor = None
+        report = await make_crawler(client_for(horizon), state).crawl()
+
+        assert not report.full
+        assert report.new_pools == 10
+        assert report.total_pools == 30
+
+    async def test_full_crawl_prunes_removed_pools(self, client_for):
+        """Test a completed full crawl drops pools Horizon no longer returns."""
+        horizon = FakeHorizon(12)
+        crawler = make_crawler(client_for(horizon))
+        await crawler.crawl()
+        del horizon.records[3]
+
+        report = await crawler.crawl(full=True)
+
+        assert report.updated_pools == 11
+        assert len(crawler) == 11
+        assert "lp-0003" not in {r["id"] for r in crawler.pools}
+
+    async def test_throttled_pages_are_retried(self, client_for):
+        """Test 429 responses honour Retry-After and are retried."""
+        horizon = FakeHorizon(5)
+        horizon.throttle_next = 2
+        crawler = make_crawler(client_for(horizon))
+
+        report = await crawler.crawl()
+
+        assert report.total_pools == 5
+        assert len(horizon.requests) == 3
+
+    async def test_fetching_overlaps_page_processing(self, client_for):
+        """Test the next page is requested while the previous one is processed."""
+        horizon = FakeHorizon(30)
+        crawler = make_crawler(client_for(horizon), prefetch_pages=2)
+        requests_seen = []
+
+        async def slow_page(records):
+            await asyncio.sleep(0.01)
+            requests_seen.append(len(horizon.requests))
+
+        await crawler.crawl(on_page=slow_page)
+
+        # While page 1 was processed, pages 2 and 3 were already fetched
+        assert requests_seen[0] >= 3
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter."""
+
+    async def test_caps_concurrency_and_rate(self):
+        """Test in-flight requests and start times respect the budget."""
+        limiter = RateLimiter(max_concurrency=2, requests_per_second=50)
+        loop = asyncio.get_running_loop()
+        in_flight = peak = 0
+        starts = []
+
+        async def request():
+            nonlocal in_flight, peak
+            async with limiter:
+                starts.append(loop.time())
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.005)
+                in_flight -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+
+        assert peak <= 2
+        assert starts[-1] - starts[0] >= 5 * 0.02 * 0.9
+
+
+class TestStellarCrawl:
+    """Test cases for StellarFetcher crawling every pool."""
+
+    async def test_crawl_stellar_yields_covers_all_pages(self, client_for):
+        """Test pools beyond the first page are returned."""
+        horizon = FakeHorizon(25)
+        client = client_for(horizon)
+        fetcher = StellarFetcher(
+            HORIZON_URL, client=client, crawler=make_crawler(client)
+        )
+
+        opportunities = await fetcher.crawl_stellar_yields()
+        again = await fetcher.crawl_stellar_yields()
+
+        assert [o.pool for o in opportunities] == [r["id"] for r in horizon.records]
+        assert fetcher.last_ingest_report.total == 0
+        assert [o.pool for o in again] == [o.pool for o in opportunities]
+
+    async def test_snapshot_fetch_crawls_and_periodically_resweeps(self, client_for):
+        """Test fetch_stellar_yields crawls every page; only a full sweep sees all changes."""
+        horizon = FakeHorizon(25)
+        client = client_for(horizon)
+        crawler = make_crawler(client, full_recrawl_seconds=3600)
+        prices = AssetPriceResolver(client, HORIZON_URL, quote_asset="USDC:GA5Z")
+        prices.cache.set("native", 0.12)
+        fetcher = StellarFetcher(HORIZON_URL, client=client, crawler=crawler, prices=prices)
+
+        first = await fetcher.fetch_stellar_yields()
+        assert len(first) == 25
+
+        # Paging tokens are pool ids, so a new pool may sort before the cursor
+        horizon.add(1)
+        horizon.records.insert(0, {**pool_record(99), "id": "lp-early", "paging_token": "999"})
+        horizon.records[1]["reserves"][0]["amount"] = "5000.0"
+        horizon.requests.clear()
+        incremental = await fetcher.fetch_stellar_yields()
+
+        pool_requests = [r for r in horizon.requests if "selling_asset_type" not in r]
+        assert [r.get("cursor") for r in pool_requests] == ["1024"]
+        assert [o.pool for o in incremental][-1] == "lp-0025"
+        assert "lp-early" not in {o.pool for o in incremental}
+        assert incremental[0].tvl_usd == pytest.approx(1000 * 0.12 + 120)
+
+        crawler.full_recrawl_seconds = 0
+        swept = await fetcher.fetch_stellar_yields()
+
+        assert crawler.full_crawl_at > 0 and fetcher.last_crawl_report.full
+        assert len(swept) == 27
+        assert "lp-early" in {o.pool for o in swept}
+        refreshed = next(o for o in swept if o.pool == "lp-0000")
+        assert refreshed.tvl_usd == pytest.approx(5000 * 0.12 + 120)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
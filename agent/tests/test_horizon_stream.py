@@ -0,0 +1,192 @@
+"""Tests for live Horizon streaming into the pool table."""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+import httpx
+import pytest
+from src.data.horizon_stream import HorizonLiveStream, LivePoolTable
+from src.data.price_resolver import AssetPriceResolver
+from src.data.stellar_fetcher import StellarFetcher
+from src.utils.sse import iter_sse
+
+HORIZON_URL = "https://horizon.test"
+
+
+async def lines_of(text: str):
+    for line in text.split("\n"):
+        yield line
+
+
+def pool(pool_id: str, shares: str = "100.0"):
+    return {
+        "id": pool_id,
+        "fee_bp": 30,
+        "total_shares": shares,
+        "reserves": [
+            {"asset": "native", "amount": "1000.0"},
+            {"asset": "USDC:GA5Z", "amount": "120.0"},
+        ],
+    }
+
+
+def sse(*events) -> str:
+    """Encode (id, payload) pairs the way Horizon does, after its hello."""
+    body = 'retry: 1000\nevent: open\ndata: "hello"\n\n'
+    for event_id, payload in events:
+        body += f"id: {event_id}\ndata: {json.dumps(payload)}\n\n"
+    return body
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.005)
+
+
+class TestIterSSE:
+    """Test cases for iter_sse."""
+
+    async def test_parses_fields_and_dispatch_rules(self):
+        """Test multi-line data, comments, ids carried forward and partial events."""
+        text = (
+            ": keep-alive\n"
+            "event: open\ndata: hi\n\n"
+            "id: 7\ndata: {\"a\":\ndata:  1}\n\n"
+            "data: no-id-field\n\n"
+            "id: 9\n\n"
+            "data: cut off"
+        )
+
+        events = [e async for e in iter_sse(lines_of(text))]
+
+        assert [(e.event, e.data, e.id) for e in events] == [
+            ("open", "hi", None),
+            ("message", '{"a":\n 1}', "7"),
+            ("message", "no-id-field", "7"),
+        ]
+
+
+class StreamingHorizon:
+    """Serves scripted SSE bodies per stream, one per connection."""
+
+    def __init__(self, scripts):
+        self.scripts = scripts
+        self.connections = {name: [] for name in scripts}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        name = request.url.path.strip("/")
+        self.connections[name].append(request)
+        bodies = self.scripts[name]
+        body = bodies.pop(0) if bodies else ""
+        if isinstance(body, int):
+            return httpx.Response(body)
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+
+class TestLivePoolTable:
+    """Test cases for LivePoolTable."""
+
+    def test_seed_keeps_streamed_state(self):
+        """Test seeding neither overwrites streamed updates nor revives removed pools."""
+        table = LivePoolTable()
+        table.upsert(pool("lp-a", shares="150.0"))
+        table.remove("lp-b")
+
+        added = table.seed([pool("lp-a"), pool("lp-b"), pool("lp-c")])
+
+        assert added == 1
+        assert table.ready
+        assert table.get("lp-a")["total_shares"] == "150.0"
+        assert "lp-b" not in table
+
+
+class TestHorizonLiveStream:
+    """Test cases for HorizonLiveStream."""
+
+    async def test_applies_deltas_and_resumes_after_drops(self):
+        """Test pool/effect deltas update the table and reconnects resume from the cursor."""
+        created_at = datetime.fromtimestamp(time.time() - 5, timezone.utc).isoformat()
+        horizon = StreamingHorizon({
+            "liquidity_pools": [sse(("p1", {**pool("lp-new"), "last_modified_time": created_at}))],
+            "effects": [
+                sse(
+                    ("e1", {"type": "account_credited", "amount": "1"}),
+                    ("e2", {"type": "liquidity_pool_trade", "created_at": created_at,
+                            "liquidity_pool": pool("lp-a", shares="150.0")}),
+                ),
+                503,
+                sse(("e3", {"type": "liquidity_pool_removed", "liquidity_pool_id": "lp-b"})),
+            ],
+        })
+
+        async def seed():
+            return [pool("lp-a"), pool("lp-b"), pool("lp-c")]
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(horizon)) as client:
+            live = HorizonLiveStream(
+                client, HORIZON_URL, seed=seed,
+                reconnect_seconds=0.001, max_reconnect_seconds=0.01
+            )
+            live.start()
+            try:
+                await wait_for(lambda: live.streams["effects"].cursor == "e3")
+                await wait_for(lambda: "lp-new" in live.table)
+            finally:
+                await live.stop()
+
+        table = live.table
+        assert table.ready
+        assert sorted(r["id"] for r in table.records()) == ["lp-a", "lp-c", "lp-new"]
+        # Streamed state wins over the (older) seeded listing
+        assert table.get("lp-a")["total_shares"] == "150.0"
+        assert 4.0 < table.lag_seconds < 30.0
+
+        effects = horizon.connections["effects"]
+        assert effects[0].url.params["cursor"] == "now"
+        assert "last-event-id" not in effects[0].headers
+        assert effects[1].headers["last-event-id"] == "e2"
+        assert effects[2].url.params["cursor"] == "e2"
+        stats = live.stats()["streams"]["effects"]
+        assert stats["applied"] == 2
+        assert stats["events"] == 3
+        assert stats["errors"] >= 1
+
+
+class TestStellarLiveMode:
+    """Test cases for StellarFetcher live mode."""
+
+    async def test_yields_read_from_table_without_network(self):
+        """Test a ready table and warm prices serve opportunities without requests."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(500)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            prices = AssetPriceResolver(client, HORIZON_URL, quote_asset="USDC:GA5Z")
+            prices.cache.set("native", 0.12)
+            fetcher = StellarFetcher(HORIZON_URL, client=client, prices=prices)
+            table = LivePoolTable()
+            fetcher.live = HorizonLiveStream(client, HORIZON_URL, table=table)
+            assert fetcher.live.table is table
+            table.seed([pool("lp-1"), pool("lp-2")])
+
+            first = await fetcher.live_stellar_yields()
+            fetcher.live.table.upsert(pool("lp-2", shares="200.0"))
+            second = await fetcher.fetch_stellar_yields()
+
+        assert requests == []
+        assert [o.pool for o in first] == ["lp-1", "lp-2"]
+        assert first[0].tvl_usd == pytest.approx(1000 * 0.12 + 120)
+        assert second[0] is first[0]
+        assert second[1] is not first[1]
+        assert fetcher.last_ingest_report.total == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,186 @@
+"""Tests for conditional GETs backed by the on-disk payload cache."""
+
+import json
+import httpx
+import pytest
+from src.utils.http_cache import PayloadCache
+from src.data.defillama_fetcher import DefiLlamaFetcher
+from src.data.stellar_fetcher import StellarFetcher
+
+
+def defillama_payload(n: int = 20) -> bytes:
+    pools = [
+        {
+            "chain": "Ethereum", "project": "aave-v3", "symbol": "USDC", "pool": f"pool-{i}",
+            "tvlUsd": 1_000_000 + i, "apy": 3.0 + i, "stablecoin": True, "ilRisk": "no",
+            "exposure": "single", "predictions": {"predictedClass": "Stable/Up"},
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"status": "success", "data": pools}).encode()
+
+
+class Upstream:
+    """MockTransport handler honouring If-None-Match, with switchable failures."""
+
+    def __init__(self, body: bytes, etag: str = '"v1"', last_modified: str = None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fail_with = None
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.fail_with == "connect":
+            raise httpx.ConnectError("connection refused", request=request)
+        if self.fail_with is not None:
+            return httpx.Response(self.fail_with)
+        headers = {}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        if self.etag and request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers=headers)
+        if (not self.etag and self.last_modified
+                and request.headers.get("if-modified-since") == self.last_modified):
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, content=self.body, headers=headers)
+
+
+@pytest.fixture
+async def client_for():
+    clients = []
+
+    def make(upstream: Upstream) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+class TestDefiLlamaConditionalGet:
+    """Test cases for DefiLlamaFetcher with a payload cache."""
+
+    async def test_not_modified_reuses_cached_parse(self, tmp_path, client_for):
+        """Test a 304 is answered from disk and the earlier parse is reused."""
+        upstream = Upstream(defillama_payload())
+        cache = PayloadCache(str(tmp_path))
+        fetcher = DefiLlamaFetcher(client=client_for(upstream), payload_cache=cache)
+
+        first = await fetcher.fetch_pools(chain="ethereum")
+        second = await fetcher.fetch_pools(chain="ethereum")
+
+        assert [o.model_dump() for o in second] == [o.model_dump() for o in first]
+        assert len(first) == 20
+        assert "if-none-match" not in upstream.requests[0].headers
+        assert upstream.requests[1].headers["if-none-match"] == '"v1"'
+        stats = cache.stats()["defillama"]
+        assert stats["requests"] == 2
+        assert stats["full_downloads"] == 1
+        assert stats["not_modified"] == 1
+        assert stats["parsed_reuses"] == 1
+        assert stats["bytes_saved"] == len(upstream.body)
+
+    async def test_not_modified_parses_new_filters(self, tmp_path, client_for):
+        """Test a 304 for filters not parsed before re-parses the cached body."""
+        upstream = Upstream(defillama_payload())
+        cache = PayloadCache(str(tmp_path))
+        fetcher = DefiLlamaFetcher(client=client_for(upstream), payload_cache=cache)
+
+        await fetcher.fetch_pools()
+        filtered = await fetcher.fetch_pools(project="other")
+
+        assert filtered == []
+        assert cache.stats()["defillama"]["not_modified"] == 1
+        assert cache.stats()["defillama"]["parsed_reuses"] == 0
+
+    async def test_network_failure_falls_back_to_disk(self, tmp_path, client_for):
+        """Test connection errors and 5xx are answered from a cache persisted on disk."""
+        upstream = Upstream(defillama_payload())
+        first = await DefiLlamaFetcher(
+            client=client_for(upstream), payload_cache=PayloadCache(str(tmp_path))
+        ).fetch_pools()
+
+        # A fresh process: new cache object and fetcher, same directory
+        cache = PayloadCache(str(tmp_path))
+        fetcher = DefiLlamaFetcher(client=client_for(upstream), payload_cache=cache)
+        upstream.fail_with = "connect"
+        after_connect_error = await fetcher.fetch_pools()
+        upstream.fail_with = 503
+        after_server_error = await fetcher.fetch_pools()
+
+        expected = [o.model_dump() for o in first]
+        assert [o.model_dump() for o in after_connect_error] == expected
+        assert [o.model_dump() for o in after_server_error] == expected
+        assert cache.stats()["defillama"]["fallbacks"] == 2
+
+    async def test_errors_propagate_without_fallback(self, tmp_path, client_for):
+        """Test failures raise when nothing is cached or the status is not transient."""
+        upstream = Upstream(defillama_payload())
+        fetcher = DefiLlamaFetcher(
+            client=client_for(upstream), payload_cache=PayloadCache(str(tmp_path))
+        )
+
+        upstream.fail_with = "connect"
+        with pytest.raises(httpx.ConnectError):
+            await fetcher.fetch_pools()
+
+        upstream.fail_with = None
+        await fetcher.fetch_pools()
+        upstream.fail_with = 404
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetcher.fetch_pools()
+
+    async def test_stream_tees_body_to_disk(self, tmp_path, client_for):
+        """Test streamed bodies are cached and replayed on 304."""
+        upstream = Upstream(defillama_payload(50))
+        cache = PayloadCache(str(tmp_path))
+        fetcher = DefiLlamaFetcher(
+            client=client_for(upstream), payload_cache=cache, stream=True
+        )
+
+        first = await fetcher.fetch_pools()
+        entry = cache.load(f"{DefiLlamaFetcher.BASE_URL}/pools")
+        second = await fetcher.fetch_pools()
+
+        assert entry is not None and entry.read_bytes() == upstream.body
+        assert entry.etag == '"v1"'
+        assert len(first) == 50
+        assert [o.model_dump() for o in second] == [o.model_dump() for o in first]
+        assert cache.stats()["defillama"]["not_modified"] == 1
+
+
+class TestStellarConditionalGet:
+    """Test cases for StellarFetcher with a payload cache."""
+
+    async def test_last_modified_revalidation(self, tmp_path, client_for):
+        """Test Horizon payloads revalidate with If-Modified-Since."""
+        records = [
+            {"id": f"lp-{i}", "fee_bp": 30, "total_shares": "100",
+             "reserves": [{"asset": "native"}, {"asset": "USDC:GA5Z"}]}
+            for i in range(5)
+        ]
+        body = json.dumps({"_embedded": {"records": records}}).encode()
+        upstream = Upstream(body, etag=None, last_modified="Sat, 17 Oct 2026 10:00:00 GMT")
+        cache = PayloadCache(str(tmp_path))
+        fetcher = StellarFetcher(client=client_for(upstream), payload_cache=cache)
+
+        first = await fetcher.fetch_stellar_yields(limit=5)
+        second = await fetcher.fetch_stellar_yields(limit=5)
+
+        assert len(first) == 5
+        assert [o.pool for o in second] == [o.pool for o in first]
+        pool_requests = [r for r in upstream.requests if r.url.path == "/liquidity_pools"]
+        assert pool_requests[1].headers["if-modified-since"] == upstream.last_modified
+        stats = cache.stats()["stellar_dex"]
+        assert stats["not_modified"] == 1
+        assert stats["parsed_reuses"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
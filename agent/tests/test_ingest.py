@@ -0,0 +1,112 @@
+"""Tests for trusted bulk model construction."""
+
+import gc
+import pytest
+from src.models.yield_opportunity import YieldOpportunity, RiskTier
+from src.data import ingest
+from src.data.ingest import build_opportunities, construct_trusted, normalize_record
+
+
+def raw_pool(i: int, **overrides):
+    """A DeFiLlama-style record using camelCase aliases."""
+    record = {
+        "chain": "Ethereum", "project": "aave-v3", "symbol": "USDC", "pool": f"pool-{i}",
+        "tvlUsd": 1000000 + i, "apy": 4.5, "apyBase": 4, "apyPct7D": None,
+        "ilRisk": "NO", "exposure": "Single", "stablecoin": True,
+        "predictedClass": "Stable/Up", "predictedProbability": 80,
+        "underlyingTokens": ["0xabc"], "mu": 4.2, "count": 365,
+        "risk_tier": RiskTier.A, "risk_score": 3.5,
+    }
+    record.update(overrides)
+    return record
+
+
+class TestBulkIngest:
+    """Test cases for build_opportunities."""
+
+    def test_fast_path_matches_full_validation(self):
+        """Test fast-built models equal validated ones (aliases, lowercasing, ints)."""
+        records = [raw_pool(i) for i in range(50)]
+
+        opportunities, report = build_opportunities(records, sample_every=0)
+
+        assert [o.model_dump() for o in opportunities] == [
+            YieldOpportunity(**r).model_dump() for r in records
+        ]
+        assert report.fast == 50
+        assert report.slow_path == 0
+        assert gc.isenabled()
+
+    def test_sampling_validates_subset(self):
+        """Test one in sample_every records is fully validated."""
+        records = [raw_pool(i) for i in range(250)]
+
+        _, report = build_opportunities(records, sample_every=100)
+
+        assert report.sampled == 3
+        assert report.fast == 250
+        assert not report.drift_detected
+
+    def test_unexpected_types_take_slow_path(self):
+        """Test records with drifted types are validated individually."""
+        records = [
+            raw_pool(0),
+            raw_pool(1, tvlUsd="2500000.5"),  # numeric string, coerced by pydantic
+            raw_pool(2, symbol=None),  # missing required field, dropped
+        ]
+
+        opportunities, report = build_opportunities(records, sample_every=0)
+
+        assert [o.pool for o in opportunities] == ["pool-0", "pool-1"]
+        assert opportunities[1].tvl_usd == 2500000.5
+        assert report.fast == 1
+        assert report.validated == 2
+        assert report.dropped == 1
+        assert len(report.drift_reasons) == 2
+
+    def test_sample_mismatch_rebuilds_batch_with_validation(self, monkeypatch):
+        """Test a sampled mismatch falls back to full validation for the batch."""
+        records = [raw_pool(i) for i in range(10)]
+        monkeypatch.setattr(
+            "src.data.ingest.normalize_record",
+            lambda record: {**normalize_record(record), "apy": 99.0}
+        )
+
+        opportunities, report = build_opportunities(records, sample_every=5)
+
+        assert report.drift_detected
+        assert report.fast == 0
+        assert report.validated == 10
+        assert all(o.apy == 4.5 for o in opportunities)
+
+
+
+class TestConstructTrusted:
+    """Test cases for the unvalidated construct_trusted shortcut."""
+
+    def test_matches_model_validate(self):
+        """Test every pydantic instance attribute matches model_validate's."""
+        for record in (raw_pool(0), raw_pool(1, apyBase=None, underlyingTokens=None)):
+            trusted = construct_trusted(normalize_record(record))
+            validated = YieldOpportunity.model_validate(record)
+
+            assert trusted == validated
+            for slot in ingest.TRUSTED_SLOTS:
+                assert getattr(trusted, slot) == getattr(validated, slot)
+            assert trusted.model_dump(by_alias=True) == validated.model_dump(by_alias=True)
+
+    def test_layout_check_raises_on_mismatch(self, monkeypatch):
+        """Test the import-time check raises instead of relying on assert."""
+        ingest._check_trusted_layout()
+
+        monkeypatch.setitem(ingest.DEFAULTS, "apy_base", 0.0)
+        with pytest.raises(RuntimeError, match="apy_base"):
+            ingest._check_trusted_layout()
+
+        monkeypatch.setattr(ingest, "TRUSTED_SLOTS", ("__dict__",))
+        with pytest.raises(RuntimeError, match="slots changed"):
+            ingest._check_trusted_layout()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
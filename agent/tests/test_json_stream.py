@@ -0,0 +1,95 @@
+"""Tests for incremental JSON array parsing."""
+
+import json
+import httpx
+import pytest
+from src.utils.json_stream import iter_json_array
+from src.data.defillama_fetcher import DefiLlamaFetcher
+
+
+async def chunked(payload: bytes, size: int):
+    """Yield payload in fixed-size byte chunks."""
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+
+
+async def collect(chunks, key="data"):
+    return [item async for item in iter_json_array(chunks, key=key)]
+
+
+PAYLOAD = {
+    "status": "success",
+    "meta": {"nested": [1, 2, {"x": "y"}]},
+    "data": [
+        {"pool": "a", "symbol": "USDC-€", "apy": 1.5e-3, "tvlUsd": 12345678901},
+        {"pool": "b", "apy": -0.25, "flags": [True, False, None]},
+        {"pool": "c", "name": "quote \" and \\ backslash ☃"},
+    ],
+    "trailing": 1234567,
+}
+
+
+class TestIterJsonArray:
+    """Test cases for iter_json_array."""
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+    async def test_items_match_json_loads_for_any_chunking(self, size):
+        """Test chunk boundaries (mid-number, mid-escape, mid-UTF-8) do not matter."""
+        payload = json.dumps(PAYLOAD, ensure_ascii=False, indent=1).encode()
+
+        items = await collect(chunked(payload, size))
+
+        assert items == PAYLOAD["data"]
+
+    async def test_empty_array_and_missing_key(self):
+        """Test empty or absent arrays yield nothing."""
+        assert await collect(chunked(b'{"data": []}', 3)) == []
+        assert await collect(chunked(b'{"other": [1, 2]}', 3)) == []
+
+    async def test_truncated_payload_raises(self):
+        """Test a payload cut off mid-item is reported."""
+        with pytest.raises(ValueError):
+            await collect(chunked(b'{"data": [{"pool": "a"}, {"pool": ', 4))
+
+    async def test_trailing_data_raises(self):
+        """Test the body is read to the end and only whitespace may follow."""
+        assert await collect(chunked(b'{"data": [1]}  \n', 3)) == [1]
+        with pytest.raises(ValueError):
+            await collect(chunked(b'{"data": [1]} {}', 3))
+
+
+class TestDefiLlamaStreaming:
+    """Test cases for DefiLlamaFetcher.stream_pools."""
+
+    async def test_stream_matches_fetch_pools(self):
+        """Test streaming yields the same scored opportunities as fetch_pools."""
+        pools = [
+            {
+                "chain": "Ethereum" if i % 3 else "Stellar", "project": "p", "symbol": "S",
+                "pool": f"pool-{i}", "tvlUsd": 1000 * i, "apy": (i % 25) * 1.0,
+                "ilRisk": "no", "exposure": "single",
+                "predictions": {"predictedClass": "Stable/Up", "predictedProbability": 90},
+            }
+            for i in range(1, 60)
+        ]
+        payload = json.dumps({"status": "success", "data": pools}).encode()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=chunked(payload, 97))
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        fetcher = DefiLlamaFetcher(client=client)
+        try:
+            streamed = [
+                opp async for opp in fetcher.stream_pools(chain="ethereum", batch_size=8)
+            ]
+            fetched = await fetcher.fetch_pools(chain="ethereum")
+        finally:
+            await client.aclose()
+
+        assert [o.model_dump() for o in streamed] == [o.model_dump() for o in fetched]
+        assert len(streamed) == 40
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
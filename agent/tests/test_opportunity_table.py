@@ -0,0 +1,186 @@
+"""Tests for the columnar opportunity table."""
+
+import random
+import numpy as np
+import pytest
+from src.models.yield_opportunity import YieldOpportunity, RiskTier
+from src.data.risk_scorer import RiskScorer
+from src.data.opportunity_table import OpportunityTable
+from src.data.aggregator import DataAggregator
+
+
+RISK_ORDER = {RiskTier.A: 0, RiskTier.B: 1, RiskTier.C: 2, RiskTier.D: 3}
+
+
+def reference_rank(opportunities, strategy):
+    """Row-at-a-time ranking the vectorized version must match."""
+    if strategy == "max_yield":
+        return sorted(opportunities, key=lambda x: x.apy or 0, reverse=True)
+    if strategy == "min_risk":
+        return sorted(
+            opportunities,
+            key=lambda x: (RISK_ORDER.get(x.risk_tier, 4), -(x.apy or 0))
+        )
+    if strategy == "sharpe":
+        def sharpe_score(opp):
+            apy = opp.apy or 0
+            volatility = abs(opp.apy_pct_7d or 1) if opp.apy_pct_7d else 1
+            return apy / max(volatility, 0.1)
+        return sorted(opportunities, key=sharpe_score, reverse=True)
+
+    def risk_adjusted_score(opp):
+        return ((opp.apy or 0) * 0.7) + ((opp.risk_score or 0) * 3 * 0.3)
+    return sorted(opportunities, key=risk_adjusted_score, reverse=True)
+
+
+def make_pools(n: int, seed: int = 7):
+    """Random pools with missing values and deliberate ties."""
+    rng = random.Random(seed)
+    pools = []
+    for i in range(n):
+        pool = YieldOpportunity(
+            chain=rng.choice(["Ethereum", "Stellar", "Arbitrum"]),
+            project=f"proj{rng.randint(0, 20)}",
+            symbol="USDC",
+            pool=f"pool-{i}",
+            tvlUsd=rng.choice([None, 1e4, 5e4, 1e6, rng.uniform(0, 1e7)]),
+            apy=rng.choice([None, 0.0, 5.0, 12.0, round(rng.uniform(0, 40), 1)]),
+            apyPct7D=rng.choice([None, 0.0, -3.0, round(rng.uniform(-10, 10), 1)]),
+            apyMean30d=rng.choice([None, round(rng.uniform(0, 40), 1)]),
+            stablecoin=rng.choice([None, True, False]),
+            ilRisk=rng.choice([None, "yes", "no"]),
+            exposure=rng.choice([None, "single", "multi"]),
+            predictedClass=rng.choice([None, "Stable/Up", "Down"]),
+            predictedProbability=rng.choice([None, 90, 50]),
+        )
+        if rng.random() > 0.1:
+            pool.risk_score = RiskScorer.calculate_risk_score(pool)
+            pool.risk_tier = RiskScorer.classify_risk_tier(pool)
+        pools.append(pool)
+    return pools
+
+
+class TestOpportunityTable:
+    """Test cases for OpportunityTable."""
+
+    @pytest.mark.parametrize("strategy", ["risk_adjusted", "max_yield", "min_risk", "sharpe"])
+    def test_rank_matches_reference_sort(self, strategy):
+        """Test vectorized ranking reproduces sorted(), ties included."""
+        pools = make_pools(500)
+        table = OpportunityTable.from_opportunities(pools)
+
+        ranked = table.materialize(table.rank_order(strategy))
+
+        assert [p.pool for p in ranked] == [p.pool for p in reference_rank(pools, strategy)]
+
+    def test_filter_mask_matches_list_filters(self):
+        """Test vectorized filters treat missing values like the list filters."""
+        pools = make_pools(500)
+        table = OpportunityTable.from_opportunities(pools)
+
+        mask = table.filter_mask(
+            chains=["stellar", "ETHEREUM"],
+            min_tvl_usd=5e4,
+            min_apy=5.0,
+            max_risk_tier=RiskTier.B
+        )
+        expected = [
+            p.pool for p in pools
+            if p.chain.lower() in ("stellar", "ethereum")
+            and p.tvl_usd is not None and p.tvl_usd >= 5e4
+            and p.apy is not None and p.apy >= 5.0
+            and p.risk_tier is not None and RISK_ORDER[p.risk_tier] <= 1
+        ]
+
+        assert [p.pool for p in table.materialize(np.flatnonzero(mask))] == expected
+
+    def test_concat_and_source_filter(self):
+        """Test concatenated tables keep per-source membership."""
+        pools = make_pools(10)
+        table = OpportunityTable.concat([
+            OpportunityTable.from_opportunities(pools[:6], source="defillama"),
+            OpportunityTable.from_opportunities(pools[6:], source="stellar_dex"),
+        ])
+
+        only_defillama = table.take(table.filter_mask(sources=["defillama"]))
+
+        assert len(table) == 10
+        assert [p.pool for p in only_defillama.materialize()] == [p.pool for p in pools[:6]]
+
+    def test_from_records_materializes_lazily_with_risk_columns(self):
+        """Test raw records become models only when materialized."""
+        records = [
+            {"chain": "Ethereum", "project": "aave", "symbol": "USDC", "tvlUsd": 1e6,
+             "apy": 4.0, "ilRisk": "NO", "exposure": "Single"},
+            {"chain": "Stellar", "project": "blend", "symbol": "XLM", "tvlUsd": 2e6,
+             "apy": 9.0},
+        ]
+        table = OpportunityTable.from_records(
+            records,
+            risk_scores=np.array([3.5, 0.0]),
+            risk_tiers=np.array([0, 2])
+        )
+
+        top = table.materialize(table.rank_order("max_yield")[:1])
+
+        assert top[0].project == "blend"
+        assert top[0].risk_score == 0.0
+        assert top[0].risk_tier == RiskTier.C
+        assert table.categoricals["il_risk"].values() == ["no", None]
+
+
+class TestTopK:
+    """Test cases for partial top-k selection."""
+
+    @pytest.mark.parametrize("strategy", ["risk_adjusted", "max_yield", "min_risk", "sharpe"])
+    @pytest.mark.parametrize("k", [0, 1, 5, 20, 137, 499, 500, 800])
+    def test_top_k_is_prefix_of_full_rank(self, strategy, k):
+        """Test top_k equals the first k rows of the full stable ranking."""
+        table = OpportunityTable.from_opportunities(make_pools(500, seed=3))
+
+        assert table.top_k(k, strategy).tolist() == table.rank_order(strategy)[:k].tolist()
+
+    @pytest.mark.parametrize("strategy", ["risk_adjusted", "max_yield", "min_risk", "sharpe"])
+    def test_heavy_ties_keep_input_order(self, strategy):
+        """Test a threshold shared by many rows still breaks ties by input order."""
+        pools = make_pools(300, seed=5)
+        for pool in pools[::2]:
+            pool.apy = 5.0
+            pool.apy_pct_7d = None
+            pool.risk_score = 1.0
+            pool.risk_tier = RiskTier.B
+        table = OpportunityTable.from_opportunities(pools)
+
+        for k in (1, 10, 100, 160):
+            expected = [p.pool for p in reference_rank(pools, strategy)[:k]]
+            assert [p.pool for p in table.materialize(table.top_k(k, strategy))] == expected
+
+    def test_take_reuses_precomputed_keys(self):
+        """Test filtered views slice the parent's key arrays."""
+        table = OpportunityTable.from_opportunities(make_pools(50))
+        table.precompute_rank_keys()
+
+        view = table.take(table.filter_mask(chains=["stellar"]))
+
+        assert set(view._rank_keys) == {"max_yield", "sharpe", "risk_adjusted"}
+        np.testing.assert_array_equal(view.rank_keys("sharpe"), view._compute_rank_keys("sharpe"))
+
+
+class TestAggregatorRanking:
+    """Test that DataAggregator list APIs keep their behavior."""
+
+    @pytest.mark.parametrize("strategy", ["risk_adjusted", "max_yield", "min_risk", "sharpe"])
+    async def test_rank_opportunities_unchanged(self, strategy):
+        """Test rank_opportunities matches the reference ordering."""
+        pools = make_pools(200, seed=11)
+        aggregator = DataAggregator()
+        try:
+            ranked = aggregator.rank_opportunities(pools, strategy=strategy)
+        finally:
+            await aggregator.close()
+
+        assert [p.pool for p in ranked] == [p.pool for p in reference_rank(pools, strategy)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
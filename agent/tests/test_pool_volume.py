@@ -0,0 +1,206 @@
+"""Tests for Stellar pool trade volume and fee APY."""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+import httpx
+import pytest
+from src.data.pool_volume import PoolVolumeTracker
+from src.data.price_resolver import AssetPriceResolver
+from src.data.stellar_fetcher import StellarFetcher
+from src.models.yield_opportunity import RiskTier
+from src.utils.rate_limit import RateLimiter
+
+HORIZON_URL = "https://horizon.test"
+USDC = "USDC:GA5Z"
+
+
+def pool(pool_id: str, xlm: str = "1000.0", fee_bp: int = 30):
+    return {
+        "id": pool_id,
+        "fee_bp": fee_bp,
+        "total_shares": "100.0",
+        "reserves": [{"asset": "native", "amount": xlm}, {"asset": USDC, "amount": "120.0"}],
+    }
+
+
+def trade(token: str, pool_id: str, hours_ago: float, xlm: float, xlm_side: str = "base"):
+    usdc_side = "counter" if xlm_side == "base" else "base"
+    closed_at = datetime.fromtimestamp(time.time() - hours_ago * 3600, timezone.utc)
+    return {
+        "paging_token": token,
+        "ledger_close_time": closed_at.isoformat().replace("+00:00", "Z"),
+        "trade_type": "liquidity_pool",
+        f"{xlm_side}_liquidity_pool_id": pool_id,
+        f"{xlm_side}_asset_type": "native",
+        f"{xlm_side}_amount": str(xlm),
+        f"{usdc_side}_asset_type": "credit_alphanum4",
+        f"{usdc_side}_asset_code": "USDC",
+        f"{usdc_side}_asset_issuer": "GA5Z",
+        f"{usdc_side}_amount": str(xlm * 0.12),
+    }
+
+
+def token_key(token: str):
+    return tuple(int(part) for part in token.split("-"))
+
+
+class TradeFeed:
+    """Horizon /trades and /liquidity_pools/{id}/trades stand-in with cursor paging."""
+
+    def __init__(self, trades):
+        self.trades = trades
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        params = request.url.params
+        if path == "/order_book":
+            return httpx.Response(200, json={"bids": [], "asks": []})
+        trades = sorted(self.trades, key=lambda t: token_key(t["paging_token"]))
+        if path.startswith("/liquidity_pools/"):
+            pool_id = path.split("/")[2]
+            trades = [
+                t for t in trades
+                if pool_id in (t.get("base_liquidity_pool_id"), t.get("counter_liquidity_pool_id"))
+            ]
+        descending = params.get("order") == "desc"
+        if descending:
+            trades.reverse()
+        cursor = params.get("cursor")
+        if cursor:
+            trades = [
+                t for t in trades
+                if (token_key(t["paging_token"]) < token_key(cursor)) == descending
+                and t["paging_token"] != cursor
+            ]
+        records = trades[:int(params.get("limit", 10))]
+        return httpx.Response(200, json={"_embedded": {"records": records}})
+
+    def paths(self):
+        return [(r.url.path, r.url.params.get("cursor")) for r in self.requests]
+
+
+class TestPoolVolumeTracker:
+    """Test cases for PoolVolumeTracker."""
+
+    async def test_backfill_then_incremental_updates(self):
+        """Test history is backfilled once and later updates only fetch newer trades."""
+        feed = TradeFeed([
+            trade("1-1", "lp-a", hours_ago=40 * 24, xlm=999),
+            trade("5-1", "lp-a", hours_ago=3 * 24, xlm=20),
+            trade("8-1", "lp-other", hours_ago=3, xlm=500),
+            trade("10-1", "lp-a", hours_ago=2, xlm=50, xlm_side="counter"),
+        ])
+        async with httpx.AsyncClient(transport=httpx.MockTransport(feed)) as client:
+            tracker = PoolVolumeTracker(client, HORIZON_URL, limiter=RateLimiter())
+            first = await tracker.update([pool("lp-a")])
+            # New trades arrive: one for the tracked pool, one for an untracked pool
+            feed.trades += [
+                trade("12-1", "lp-a", hours_ago=1, xlm=30),
+                trade("12-2", "lp-other", hours_ago=1, xlm=700),
+            ]
+            feed.requests.clear()
+            second = await tracker.update([pool("lp-a")])
+
+        assert first.cursor == "10-1"
+        assert first.backfilled_pools == 1
+        assert second.trades == 1
+        assert second.cursor == "12-2"
+        assert feed.paths() == [("/trades", "10-1")]
+
+        fee_yield = tracker.pool_yield(pool("lp-a"))
+        assert fee_yield.volume_24h == pytest.approx(80)
+        assert fee_yield.volume_7d == pytest.approx(100)
+        # fee x volume / (2 x XLM reserve), annualized, in percent
+        assert fee_yield.apy == pytest.approx(0.003 * 80 / 2000 * 365 * 100)
+        assert fee_yield.apy_mean_30d == pytest.approx(0.003 * 100 / 30 / 2000 * 365 * 100)
+        assert fee_yield.apy_pct_7d == pytest.approx(fee_yield.apy)
+        assert tracker.pool_yield(pool("lp-other")) is None
+
+    async def test_backfill_is_sized_to_the_rate_budget(self):
+        """Test an update backfills only as many pools as its request budget allows."""
+        feed = TradeFeed([trade(f"{i}-1", f"lp-{i}", hours_ago=5, xlm=10) for i in range(1, 5)])
+        async with httpx.AsyncClient(transport=httpx.MockTransport(feed)) as client:
+            # 20 requests/s x 0.1s: two requests per update
+            tracker = PoolVolumeTracker(
+                client, HORIZON_URL, limiter=RateLimiter(requests_per_second=20),
+                interval_seconds=0.1, rate_share=1.0
+            )
+            tracker.track([pool(f"lp-{i}") for i in range(1, 5)])
+            first = await tracker.update()
+            second = await tracker.update()
+
+        assert tracker.request_budget == 2
+        # The first update also spends a request finding the feed's cursor
+        assert (first.backfilled_pools, first.pending_backfill) == (1, 3)
+        assert (second.backfilled_pools, second.pending_backfill) == (1, 2)
+        assert len(feed.requests) == 4
+
+    async def test_background_updates(self):
+        """Test a started tracker backfills tracked pools without being asked."""
+        feed = TradeFeed([trade("3-1", "lp-a", hours_ago=5, xlm=10)])
+        async with httpx.AsyncClient(transport=httpx.MockTransport(feed)) as client:
+            tracker = PoolVolumeTracker(
+                client, HORIZON_URL, limiter=RateLimiter(), interval_seconds=0.01
+            )
+            tracker.track([pool("lp-a")])
+            tracker.start()
+            for _ in range(100):
+                if "lp-a" in tracker:
+                    break
+                await asyncio.sleep(0.01)
+            await tracker.stop()
+
+        assert "lp-a" in tracker
+        assert tracker.last_report is not None
+
+    async def test_young_history_has_no_trend(self):
+        """Test 30d mean and 7d change stay unset until enough history is tracked."""
+        feed = TradeFeed([trade("3-1", "lp-new", hours_ago=5, xlm=10)])
+        async with httpx.AsyncClient(transport=httpx.MockTransport(feed)) as client:
+            tracker = PoolVolumeTracker(client, HORIZON_URL, limiter=RateLimiter())
+            await tracker.update([pool("lp-new")])
+
+        fee_yield = tracker.pool_yield(pool("lp-new"))
+        assert fee_yield.apy > 0
+        assert fee_yield.apy_mean_30d is None
+        assert fee_yield.apy_pct_7d is None
+
+
+class TestStellarFeeApy:
+    """Test cases for volume-based APY on parsed Stellar pools."""
+
+    async def test_parsed_pools_get_fee_apy_and_risk(self):
+        """Test pools above the TVL floor get fee APY and a risk tier; others no APY."""
+        feed = TradeFeed([
+            trade("1-1", "lp-big", hours_ago=20 * 24, xlm=4000),
+            trade("2-1", "lp-big", hours_ago=2, xlm=40000),
+        ])
+        async with httpx.AsyncClient(transport=httpx.MockTransport(feed)) as client:
+            prices = AssetPriceResolver(client, HORIZON_URL, quote_asset=USDC)
+            prices.cache.set("native", 0.12)
+            fetcher = StellarFetcher(
+                HORIZON_URL, client=client, prices=prices, apy_min_tvl_usd=10000
+            )
+            pools = [pool("lp-big", xlm="1000000.0"), pool("lp-small")]
+            before = await fetcher.parse_stellar_pools(pools)
+            # Parsing only reads the tracker; its background update fetches trades
+            assert feed.paths() == []
+            await fetcher.volumes.update()
+            opportunities = await fetcher.parse_stellar_pools(pools)
+
+        assert [opp.apy for opp in before] == [None, None]
+        big, small = opportunities
+        assert big.apy == pytest.approx(0.003 * 40000 / 2000000 * 365 * 100)
+        assert big.apy_base == big.apy
+        assert big.apy_mean_30d == pytest.approx(0.003 * 44000 / 20 / 2000000 * 365 * 100, rel=0.01)
+        assert big.apy_pct_7d is not None
+        assert big.risk_tier in RiskTier
+        assert small.apy is None
+        assert not any("lp-small" in path for path, _ in feed.paths())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,104 @@
+"""Tests for the local portfolio optimizer."""
+
+import pytest
+from src.agent.portfolio_optimizer import PortfolioOptimizer, describe_portfolio
+from src.models.yield_opportunity import RiskTier
+from tests.conftest import make_opportunity
+
+
+def shares(portfolio, key):
+    totals = {}
+    for position in portfolio.positions:
+        name = key(position.opportunity)
+        totals[name] = totals.get(name, 0.0) + position.weight
+    return totals
+
+
+class TestPortfolioOptimizer:
+    """Test cases for PortfolioOptimizer."""
+
+    def test_caps_bind_and_weights_sum_to_one(self):
+        """Test protocol, chain, tier and position caps hold while all capital is placed."""
+        opportunities = [
+            make_opportunity("usdc", "aave-v3", 6.0),
+            make_opportunity("usdt", "aave-v3", 5.5),
+            make_opportunity("dai", "aave-v3", 5.0),
+            make_opportunity("frax", "curve", 4.0),
+            make_opportunity("arb", "compound", 9.0, RiskTier.B, chain="Arbitrum"),
+            make_opportunity("xlm", "Stellar DEX", 30.0, RiskTier.B, chain="Stellar"),
+            make_opportunity("risky", "degen", 80.0, RiskTier.C, chain="Stellar"),
+        ]
+        optimizer = PortfolioOptimizer(
+            max_positions=5, min_weight=0.05, max_position_share=0.35,
+            max_protocol_share=0.4, max_chain_share=0.6, max_tvl_share=0.01
+        )
+
+        portfolio = optimizer.optimize(opportunities, 100000, RiskTier.B)
+
+        weights = [position.weight for position in portfolio.positions]
+        assert sum(weights) == pytest.approx(1.0)
+        assert len(weights) <= 5
+        assert min(weights) >= 0.05
+        assert max(weights) <= 0.35 + 1e-6
+        assert max(shares(portfolio, lambda opp: opp.project).values()) <= 0.4 + 1e-6
+        assert max(shares(portfolio, lambda opp: opp.chain).values()) <= 0.6 + 1e-6
+        assert shares(portfolio, lambda opp: opp.risk_tier).get(RiskTier.B, 0) <= 0.6 + 1e-6
+        # Tier C is above the requested maximum
+        assert "risky" not in {position.opportunity.pool for position in portfolio.positions}
+        assert portfolio.total_allocated_usd == pytest.approx(100000)
+        assert portfolio.projected_returns["365d"] == pytest.approx(
+            100000 * portfolio.weighted_expected_apy / 100
+        )
+        assert 0 < portfolio.diversification_score <= 100
+
+    def test_pool_size_limit_leaves_capital_unallocated(self):
+        """Test the TVL cap is never relaxed and smaller pools are weighted by mean-variance."""
+        opportunities = [
+            make_opportunity("small", "aave-v3", 10.0, tvl=2e6),
+            make_opportunity("steady", "curve", 8.0, apyMean30d=8.0),
+            make_opportunity("noisy", "compound", 12.0, apyMean30d=4.0),
+        ]
+        optimizer = PortfolioOptimizer(max_tvl_share=0.01, max_chain_share=1.0)
+
+        portfolio = optimizer.optimize(opportunities, 100000, RiskTier.A)
+        by_pool = {position.opportunity.pool: position for position in portfolio.positions}
+
+        # 1% of a $2M pool is $20k
+        assert by_pool["small"].allocation_usd == pytest.approx(20000)
+        # Same expected APY (8%) but noisy's APY moved 8 points: it gets less
+        assert by_pool["noisy"].expected_apy == pytest.approx(8.0)
+        assert by_pool["noisy"].weight < by_pool["steady"].weight
+        assert portfolio.risk_grade == "A"
+
+        tiny = optimizer.optimize(opportunities[:1], 100000, RiskTier.A)
+        assert tiny.total_allocated_usd == pytest.approx(20000)
+        assert "unallocated" in " ".join(describe_portfolio(tiny)["key_risks"])
+
+    def test_conflicting_caps_are_loosened_in_steps(self):
+        """Test capital is still fully placed when the caps cannot all hold."""
+        # Two Ethereum pools can take at most 60%; Arbitrum's one pool at most 35%
+        opportunities = [
+            make_opportunity("usdc", "aave-v3", 6.0),
+            make_opportunity("frax", "curve", 4.0),
+            make_opportunity("arb", "compound", 9.0, RiskTier.B, chain="Arbitrum"),
+        ]
+        optimizer = PortfolioOptimizer(max_position_share=0.35, max_chain_share=0.6)
+
+        portfolio = optimizer.optimize(opportunities, 10000, RiskTier.B)
+
+        assert portfolio.total_allocated_usd == pytest.approx(10000)
+        assert max(p.weight for p in portfolio.positions) <= 0.35 * 1.25 + 1e-6
+
+    def test_no_positive_apy_gives_empty_portfolio(self):
+        """Test candidates without a positive APY are never allocated."""
+        portfolio = PortfolioOptimizer().optimize(
+            [make_opportunity("flat", "aave-v3", 0.0)], 1000, RiskTier.B
+        )
+
+        assert portfolio.positions == []
+        assert portfolio.total_allocated_usd == 0
+        assert portfolio.weighted_expected_apy == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
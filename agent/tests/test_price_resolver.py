@@ -0,0 +1,214 @@
+"""Tests for Stellar asset pricing and reserve TVL."""
+
+import asyncio
+import math
+import httpx
+import numpy as np
+import pytest
+from src.data.filters import FilterSpec
+from src.data.price_resolver import AssetPriceResolver, compute_reserve_tvl
+from src.data.stellar_fetcher import StellarFetcher
+from src.utils.cache import LRUCache
+from src.utils.rate_limit import RateLimiter
+
+HORIZON_URL = "https://horizon.test"
+USDC = "USDC:GUSDC"
+AQUA = "AQUA:GAQUA"
+YXLM = "yXLM:GYXLM"
+
+
+def asset_of(params, prefix):
+    if params[f"{prefix}_asset_type"] == "native":
+        return "native"
+    return f"{params[f'{prefix}_asset_code']}:{params[f'{prefix}_asset_issuer']}"
+
+
+class OrderBooks:
+    """Horizon /order_book stand-in with fixed (bid, ask) per pair."""
+
+    def __init__(self, books):
+        self.books = books
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        pair = (asset_of(params, "selling"), asset_of(params, "buying"))
+        self.requests.append(pair)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.005)
+        self.in_flight -= 1
+        bid, ask = self.books.get(pair, (None, None))
+        return httpx.Response(200, json={
+            "bids": [{"price": str(bid), "amount": "10"}] if bid else [],
+            "asks": [{"price": str(ask), "amount": "10"}] if ask else [],
+        })
+
+
+def resolver_for(books: OrderBooks, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(books))
+    kwargs.setdefault("limiter", RateLimiter(max_concurrency=2))
+    return client, AssetPriceResolver(client, HORIZON_URL, quote_asset=USDC, **kwargs)
+
+
+class TestAssetPriceResolver:
+    """Test cases for AssetPriceResolver."""
+
+    async def test_prices_each_distinct_asset_once(self):
+        """Test mid prices, the XLM hop, dedup, caching and bounded concurrency."""
+        books = OrderBooks({
+            ("native", USDC): (0.10, 0.12),
+            (AQUA, "native"): (0.004, 0.006),
+            (YXLM, USDC): (None, 0.2),
+        })
+        client, resolver = resolver_for(books)
+        try:
+            prices = await resolver.resolve([AQUA, "native", USDC, AQUA, YXLM, "BAD:GBAD", "native"])
+            again = await resolver.resolve(["native", AQUA, "BAD:GBAD"])
+        finally:
+            await client.aclose()
+
+        assert prices["native"] == pytest.approx(0.11)
+        assert prices[USDC] == 1.0
+        assert prices[AQUA] == pytest.approx(0.005 * 0.11)
+        assert prices[YXLM] == pytest.approx(0.2)
+        assert math.isnan(prices["BAD:GBAD"])
+        assert again == pytest.approx(
+            {k: prices[k] for k in ("native", AQUA)} | {"BAD:GBAD": math.nan}, nan_ok=True
+        )
+        # native once, AQUA and BAD via USDC then XLM, yXLM once; nothing on the second call
+        assert sorted(books.requests) == sorted([
+            ("native", USDC), (AQUA, USDC), (AQUA, "native"),
+            (YXLM, USDC), ("BAD:GBAD", USDC), ("BAD:GBAD", "native"),
+        ])
+        assert books.peak <= 2
+
+    async def test_errors_are_not_cached(self):
+        """Test a failed lookup returns NaN and is retried next time."""
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"bids": [{"price": "0.1"}], "asks": []})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            resolver = AssetPriceResolver(
+                client, HORIZON_URL, quote_asset=USDC, limiter=RateLimiter()
+            )
+            assert math.isnan(await resolver.price("native"))
+            assert await resolver.price("native") == pytest.approx(0.1)
+
+
+    async def test_reserves_priced_with_fewest_assets(self):
+        """Test USDC/XLM pools need no other price and others get one shared asset."""
+        books = OrderBooks({
+            ("native", USDC): (0.1, 0.1),
+            (AQUA, USDC): (0.002, 0.002),
+        })
+        client, resolver = resolver_for(books)
+        reserves = [
+            [{"asset": "native", "amount": "100"}, {"asset": YXLM, "amount": "90"}],
+            [{"asset": AQUA, "amount": "5000"}, {"asset": YXLM, "amount": "1"}],
+            [{"asset": AQUA, "amount": "5000"}, {"asset": "BAD:GBAD", "amount": "7"}],
+            [{"asset": "EMPTY:GE", "amount": "0"}, {"asset": "NONE:GN", "amount": "0.0000000"}],
+        ]
+        try:
+            prices = await resolver.resolve_reserves(reserves)
+        finally:
+            await client.aclose()
+
+        tvl = compute_reserve_tvl(reserves, prices)
+        assert tvl.tolist() == pytest.approx([20.0, 20.0, 20.0, 0.0])
+        # yXLM and BAD are never looked up; USDC itself needs no request
+        assert sorted(books.requests) == sorted([("native", USDC), (AQUA, USDC)])
+
+    def test_ttl_outlives_a_snapshot_refresh(self, monkeypatch):
+        """Test a short configured TTL is raised so the next build still hits the cache."""
+        monkeypatch.setenv("PRICE_CACHE_TTL_SECONDS", "60")
+        monkeypatch.setenv("SNAPSHOT_REFRESH_SECONDS", "300")
+        resolver = AssetPriceResolver(httpx.AsyncClient(), HORIZON_URL)
+
+        assert resolver.cache.default_ttl == 600
+
+    def test_injected_empty_cache_is_used(self):
+        """Test a caller's cache is kept even while it is still empty."""
+        cache = LRUCache(default_ttl=5)
+        resolver = AssetPriceResolver(httpx.AsyncClient(), HORIZON_URL, cache=cache)
+
+        assert resolver.cache is cache
+
+
+class TestReserveTvl:
+    """Test cases for compute_reserve_tvl."""
+
+    def test_vectorized_tvl(self):
+        """Test full, partial and unpriced pools."""
+        reserves = [
+            [{"asset": "native", "amount": "1000"}, {"asset": USDC, "amount": "120"}],
+            [{"asset": "native", "amount": "500"}, {"asset": AQUA, "amount": "9"}],
+            [{"asset": AQUA, "amount": "1"}, {"asset": YXLM, "amount": "2"}],
+        ]
+        prices = {"native": 0.11, USDC: 1.0, AQUA: math.nan}
+
+        tvl = compute_reserve_tvl(reserves, prices)
+
+        assert tvl[0] == pytest.approx(1000 * 0.11 + 120)
+        # Constant-product pools hold equal value per side
+        assert tvl[1] == pytest.approx(2 * 500 * 0.11)
+        assert np.isnan(tvl[2])
+        assert len(compute_reserve_tvl([], prices)) == 0
+
+
+class TestStellarTvl:
+    """Test cases for TVL on parsed Stellar pools."""
+
+    async def test_parsed_pools_have_tvl(self):
+        """Test parse_stellar_pools fills tvlUsd so min-liquidity filters keep pools."""
+        books = OrderBooks({("native", USDC): (0.1, 0.1)})
+        client, resolver = resolver_for(books)
+        pools = [
+            {"id": f"lp-{i}", "fee_bp": 30,
+             "reserves": [{"asset": "native", "amount": "1000000"},
+                          {"asset": USDC, "amount": str(100000 * (i + 1))}]}
+            for i in range(3)
+        ]
+        try:
+            fetcher = StellarFetcher(
+                HORIZON_URL, client=client, prices=resolver, apy_min_tvl_usd=math.inf
+            )
+            opportunities = await fetcher.parse_stellar_pools(pools)
+        finally:
+            await client.aclose()
+
+        assert [o.tvl_usd for o in opportunities] == pytest.approx([200000, 300000, 400000])
+        assert books.requests == [("native", USDC)]
+
+    async def test_ingest_floor_is_pushed_down(self):
+        """Test the aggregator's floor drops Stellar pools below it once they are valued."""
+        books = OrderBooks({("native", USDC): (0.1, 0.1)})
+        client, resolver = resolver_for(books)
+        pools = [
+            {"id": "lp-big", "reserves": [{"asset": "native", "amount": "1000000"},
+                                          {"asset": AQUA, "amount": "5"}]},
+            {"id": "lp-small", "reserves": [{"asset": "native", "amount": "10"},
+                                            {"asset": AQUA, "amount": "5"}]},
+        ]
+        try:
+            fetcher = StellarFetcher(
+                HORIZON_URL, client=client, prices=resolver, apy_min_tvl_usd=math.inf
+            )
+            fetcher._fetch_stellar_yields = lambda limit: fetcher.parse_stellar_pools(pools)
+            kept = await fetcher.fetch_stellar_yields(spec=FilterSpec.create(min_tvl_usd=1000))
+        finally:
+            await client.aclose()
+
+        assert [o.pool for o in kept] == ["lp-big"]
+        assert books.requests == [("native", USDC)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
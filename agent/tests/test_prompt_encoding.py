@@ -0,0 +1,96 @@
+"""Tests for compact prompt encoding of opportunities."""
+
+import csv
+import io
+import json
+import pytest
+from src.agent.gemini_client import GeminiClient
+from src.agent.prompt_encoding import encode_opportunities, estimate_tokens
+from src.models.yield_opportunity import YieldOpportunity
+from tests.conftest import make_opportunity
+
+
+# Fields shared by every encoded row
+ROW = dict(
+    apy=5.104, tvl=12_345_678, symbol="USDC", apyBase=5.0, risk_score=3.25,
+    stablecoin=True, ilRisk="no", apyPct7D=-0.04
+)
+
+
+def row(i: int, **overrides) -> YieldOpportunity:
+    return make_opportunity(**{"pool": f"pool-{i}", "project": f"proj{i}", **ROW, **overrides})
+
+
+class TestPromptEncoding:
+    """Test cases for encode_opportunities and estimate_tokens."""
+
+    def test_rows_are_compact_csv(self):
+        """Test short keys, rounded numbers, numbered rows and quoted commas."""
+        text, included = encode_opportunities([
+            row(1),
+            row(2, symbol="WETH,USDC", apy=None, stablecoin=None),
+        ])
+
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert included == 2
+        assert rows[0]["n"] == "1"
+        assert (rows[0]["apy"], rows[0]["tvl"], rows[0]["score"]) == ("5.1", "12.35", "3.2")
+        assert (rows[0]["stbl"], rows[0]["d7"], rows[0]["tier"]) == ("1", "0", "A")
+        assert rows[1]["sym"] == "WETH,USDC"
+        assert (rows[1]["apy"], rows[1]["stbl"]) == ("", "")
+
+    def test_budget_chooses_how_many_rows(self):
+        """Test rows are added in rank order until the token budget is spent."""
+        opportunities = [row(i) for i in range(50)]
+        full, _ = encode_opportunities(opportunities)
+
+        small, small_count = encode_opportunities(opportunities, token_budget=200)
+        large, large_count = encode_opportunities(opportunities, token_budget=800)
+        capped, capped_count = encode_opportunities(opportunities, max_rows=3)
+
+        assert 0 < small_count < large_count < 50
+        assert estimate_tokens(small) <= 200
+        assert estimate_tokens(large) <= 800
+        assert full.startswith(large)
+        assert capped_count == 3
+        assert estimate_tokens(full) > estimate_tokens(large)
+
+    def test_row_numbers_map_back_to_pool_ids(self):
+        """Test a row number returned as pool_id becomes that row's pool id."""
+        opportunities = [row(1), row(2, pool=None)]
+        recommendation = {"allocations": [
+            {"pool_id": "2"}, {"pool_id": "#1"}, {"pool_id": "9"}, {"pool_id": "pool-7"},
+        ]}
+
+        GeminiClient._resolve_row_references(recommendation, opportunities)
+
+        assert [a["pool_id"] for a in recommendation["allocations"]] == [
+            "proj2-USDC", "pool-1", "9", "pool-7"
+        ]
+
+    async def test_rows_past_the_prompt_stay_unresolved(self):
+        """Test only rows actually sent to the model are mapped to pool ids."""
+        opportunities = [row(i) for i in range(1, 51)]
+        client = GeminiClient(api_key="test-key", prompt_token_budget=200)
+        _, included = client._build_recommendation_prompt(opportunities, 1000, "low")
+        assert 0 < included < 50
+
+        class Response:
+            text = json.dumps({"allocations": [
+                {"pool_id": "1"}, {"pool_id": str(included)}, {"pool_id": str(included + 1)},
+            ]})
+
+        class Model:
+            async def generate_content_async(self, prompt, generation_config=None):
+                return Response()
+
+        client.model = Model()
+        recommendation = await client.get_recommendation(opportunities, 1000, "low")
+
+        assert [a["pool_id"] for a in recommendation["allocations"]] == [
+            "pool-1", f"pool-{included}", str(included + 1)
+        ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
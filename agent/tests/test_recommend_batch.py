@@ -0,0 +1,202 @@
+"""Tests for batch recommendations."""
+
+import asyncio
+import pytest
+from src.agent.portfolio_optimizer import PortfolioOptimizer
+from src.agent.recommendation_engine import RecommendationEngine
+from src.data.snapshot import OpportunitySnapshot
+from src.models.yield_opportunity import RiskTier
+from tests.conftest import make_opportunity
+
+
+OPPORTUNITIES = [
+    make_opportunity("usdc", "aave-v3", 5.0, RiskTier.A, "Ethereum"),
+    make_opportunity("dai", "spark", 6.0, RiskTier.A, "Ethereum"),
+    make_opportunity("frax", "curve", 4.0, RiskTier.A, "Arbitrum"),
+    make_opportunity("arb", "compound", 9.0, RiskTier.B, "Arbitrum"),
+    make_opportunity("xlm", "Stellar DEX", 25.0, RiskTier.C, "Stellar"),
+]
+
+
+@pytest.fixture
+async def engine():
+    engine = RecommendationEngine(gemini_api_key="test-key", narrative_timeout_seconds=5)
+    builds = []
+
+    async def build(version):
+        builds.append(version)
+        return OpportunitySnapshot.build(version, {"defillama": OPPORTUNITIES})
+
+    engine.snapshots._build = build
+    engine.builds = builds
+    yield engine
+    await engine.close()
+
+
+class TestRecommendBatch:
+    """Test cases for RecommendationEngine.recommend_batch."""
+
+    async def test_shared_snapshot_and_shortlists_in_input_order(self, engine):
+        """Test one snapshot, one shortlist per distinct filter, results in order."""
+        shortlists = []
+        shortlist = engine._shortlist
+
+        def counting_shortlist(*args, **kwargs):
+            shortlists.append(kwargs["max_risk_tier"])
+            return shortlist(*args, **kwargs)
+
+        async def no_narrative(*args):
+            raise RuntimeError("Gemini unavailable")
+
+        engine._shortlist = counting_shortlist
+        engine.gemini.get_narrative = no_narrative
+        profiles = [
+            {"amount_usd": 1000, "risk_tolerance": "low", "mode": "numbers"},
+            {"amount_usd": 5000, "risk_tolerance": "high", "mode": "numbers"},
+            {"amount_usd": 2000, "risk_tolerance": "low", "mode": "local"},
+            {"amount_usd": 3000, "risk_tolerance": "medium", "mode": "bogus"},
+            {"risk_tolerance": "medium"},
+        ]
+
+        responses = await engine.recommend_batch(profiles)
+
+        assert engine.builds == [1]
+        assert sorted(shortlists) == [RiskTier.A, RiskTier.C]
+        assert [r.success for r in responses] == [True, True, True, False, False]
+        assert [r.recommendation.requested_amount_usd for r in responses[:3]] == [1000, 5000, 2000]
+        low = {a.opportunity.pool for a in responses[0].recommendation.allocations}
+        assert low <= {"usdc", "dai", "frax"}
+        assert "mode" in responses[3].error
+        assert "Invalid profile" in responses[4].error
+
+    async def test_narratives_run_concurrently(self, engine):
+        """Test narrative calls for distinct profiles overlap instead of queueing."""
+        active, peak = 0, 0
+
+        async def narrative(portfolio, risk_tolerance, preferred_chains):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return {"summary": f"{risk_tolerance} portfolio"}
+
+        engine.gemini.get_narrative = narrative
+        responses = await engine.recommend_batch([
+            {"amount_usd": 1000, "risk_tolerance": risk, "mode": "local"}
+            for risk in ("low", "medium", "high")
+        ])
+
+        assert peak == 3
+        assert [r.recommendation.summary for r in responses] == [
+            "low portfolio", "medium portfolio", "high portfolio"
+        ]
+
+
+class TestOptimizedModeCaching:
+    """Test cases for caching in the "local" and "numbers" modes."""
+
+    async def test_numbers_are_computed_per_amount(self, engine):
+        """Test amounts in one cache bucket each respect the pool size cap."""
+        engine.optimizer = PortfolioOptimizer(max_tvl_share=0.01, max_chain_share=1.0)
+
+        async def build(version):
+            return OpportunitySnapshot.build(version, {"defillama": [
+                make_opportunity("small", "aave-v3", 9.0, RiskTier.A, "Ethereum", tvl=100000),
+                make_opportunity("big", "curve", 5.0, RiskTier.A, "Ethereum"),
+            ]})
+
+        engine.snapshots._build = build
+        responses = [
+            await engine.recommend(amount, risk_tolerance="low", mode="numbers")
+            for amount in (3000, 3400)
+        ]
+
+        for amount, response in zip((3000, 3400), responses):
+            allocations = {
+                a.opportunity.pool: a.allocation_usd for a in response.recommendation.allocations
+            }
+            # 1% of a $100k pool is $1,000 whatever the amount
+            assert allocations["small"] == pytest.approx(1000)
+            assert sum(allocations.values()) == pytest.approx(amount)
+
+    async def test_local_caches_only_the_narrative(self, engine):
+        """Test one Gemini call per portfolio while numbers follow the exact amount."""
+        calls = []
+
+        async def narrative(portfolio, risk_tolerance, preferred_chains):
+            calls.append(portfolio.amount_usd)
+            await asyncio.sleep(0.01)
+            return {"summary": "steady portfolio"}
+
+        engine.gemini.get_narrative = narrative
+        first, second = await asyncio.gather(
+            engine.recommend(1000, risk_tolerance="low", mode="local"),
+            engine.recommend(1000, risk_tolerance="low", mode="local"),
+        )
+        third = await engine.recommend(1200, risk_tolerance="low", mode="local")
+
+        assert calls == [1000]
+        assert [r.recommendation.summary for r in (first, second, third)] == ["steady portfolio"] * 3
+        assert third.recommendation.total_allocated_usd == pytest.approx(1200)
+
+
+class TestAiModeMatching:
+    """Test cases for matching Gemini allocations in "ai" mode."""
+
+    async def test_look_alike_outside_filters_is_not_picked(self, engine):
+        """Test an allocation naming a filtered-out near-duplicate resolves inside the filters."""
+        bridged = make_opportunity(
+            "usdc-e", "aave-v3", 12.0, RiskTier.C, "Ethereum", symbol="USDC.E"
+        )
+
+        async def build(version):
+            return OpportunitySnapshot.build(version, {"defillama": OPPORTUNITIES + [bridged]})
+
+        async def get_recommendation(opportunities, **kwargs):
+            assert bridged not in opportunities
+            return {"allocations": [{
+                "pool_id": "aave-v3-usdc.e", "project": "Aave V3", "symbol": "USDC.e",
+                "allocation_percentage": 100, "allocation_usd": 1000, "risk_tier": "A",
+            }]}
+
+        engine.snapshots._build = build
+        engine.gemini.get_recommendation = get_recommendation
+        response = await engine.recommend(amount_usd=1000, risk_tolerance="low", mode="ai")
+
+        assert response.success
+        [allocation] = response.recommendation.allocations
+        assert allocation.opportunity.pool == "usdc"
+        assert allocation.match_confidence < 0.7
+
+    async def test_prompt_budget_sets_the_shortlist_size(self, engine):
+        """Test the token budget, not a fixed 20, decides how many candidates Gemini sees."""
+        pools = [
+            make_opportunity(f"pool{i}", f"proj{i}", 5.0 + i / 100, RiskTier.A, "Ethereum")
+            for i in range(60)
+        ]
+        offered = []
+
+        async def build(version):
+            return OpportunitySnapshot.build(version, {"defillama": pools})
+
+        async def get_recommendation(opportunities, **kwargs):
+            offered.append(len(opportunities))
+            return {"allocations": []}
+
+        engine.snapshots._build = build
+        engine.gemini.get_recommendation = get_recommendation
+        request = dict(amount_usd=1000, risk_tolerance="low", mode="ai")
+
+        engine.gemini.prompt_token_budget = 100_000
+        await engine.recommend(**request)
+        await engine.recommend(**request, max_opportunities=30)
+        engine.gemini.prompt_token_budget = 1000
+        await engine.recommend(**{**request, "amount_usd": 5000})
+
+        assert offered[:2] == [60, 30]
+        assert 20 < offered[2] < 60
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
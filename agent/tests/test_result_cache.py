@@ -0,0 +1,105 @@
+"""Tests for the recommendation result cache."""
+
+import pytest
+from src.models.yield_opportunity import YieldOpportunity, RiskTier
+from src.models.recommendation import PortfolioAllocation, Recommendation
+from src.agent.result_cache import RecommendationCache
+
+
+def make_recommendation(amount: float = 10000) -> Recommendation:
+    """Create a single-allocation recommendation for cache tests."""
+    opp = YieldOpportunity(
+        chain="Ethereum", project="Aave", symbol="USDC", apy=5.0, tvlUsd=10000000
+    )
+    return Recommendation(
+        requested_amount_usd=amount,
+        risk_tolerance="medium",
+        allocations=[
+            PortfolioAllocation(
+                opportunity=opp,
+                allocation_percentage=100,
+                allocation_usd=amount,
+                expected_apy=5.0,
+                risk_tier=RiskTier.A,
+                reasoning="Safe stablecoin yield"
+            )
+        ],
+        total_allocated_usd=amount,
+        weighted_expected_apy=5.0,
+        overall_risk_grade="A",
+        diversification_score=20,
+        summary="Conservative portfolio",
+        key_risks=["Smart contract risk"],
+        opportunities=["Stable returns"],
+        rationale="Focus on safety",
+        projected_returns={"365d_usd": amount * 0.05},
+        estimated_fees={"gas_usd": 5},
+        confidence_score=90,
+        timestamp="2025-11-02T08:00:00",
+        data_freshness_seconds=0
+    )
+
+
+def make_key(cache: RecommendationCache, amount: float, chains=None, version: int = 1):
+    """Build a key with default filters."""
+    return cache.make_key(
+        risk_tier="B",
+        chains=chains,
+        min_liquidity_usd=50000,
+        min_apy=None,
+        amount_usd=amount,
+        max_opportunities=20,
+        ranking_strategy="risk_adjusted",
+        snapshot_version=version
+    )
+
+
+class TestRecommendationCache:
+    """Test cases for RecommendationCache."""
+
+    def test_key_canonicalizes_chains_and_amount(self):
+        """Test chain order/case and amounts in one bucket share a key."""
+        cache = RecommendationCache(amount_granularity_usd=1000, ttl_seconds=60)
+
+        assert make_key(cache, 10000, ["Stellar", "Ethereum"]) == make_key(
+            cache, 10200, ["ethereum", "STELLAR"]
+        )
+        assert make_key(cache, 10000) != make_key(cache, 12000)
+
+    def test_hit_rescales_to_exact_amount(self):
+        """Test dollar fields are rescaled on a bucket hit."""
+        cache = RecommendationCache(amount_granularity_usd=1000, ttl_seconds=60)
+        cache.set(make_key(cache, 10000), make_recommendation(10000))
+
+        hit = cache.get(
+            make_key(cache, 10200),
+            amount_usd=10200,
+            risk_tolerance="moderate",
+            preferred_chains=None,
+            data_age_seconds=42
+        )
+
+        assert hit is not None
+        assert hit.requested_amount_usd == 10200
+        assert hit.risk_tolerance == "moderate"
+        assert hit.allocations[0].allocation_usd == pytest.approx(10200)
+        assert hit.allocations[0].allocation_percentage == 100
+        assert hit.total_allocated_usd == pytest.approx(10200)
+        assert hit.projected_returns["365d_usd"] == pytest.approx(510)
+        assert hit.data_freshness_seconds == 42
+
+    def test_new_snapshot_expires_entries(self):
+        """Test entries from an older snapshot version are dropped."""
+        cache = RecommendationCache(amount_granularity_usd=1000, ttl_seconds=60)
+        cache.set(make_key(cache, 10000, version=1), make_recommendation())
+
+        assert cache.get(
+            make_key(cache, 10000, version=2), 10000, "medium", None, 0
+        ) is None
+        assert cache.get(
+            make_key(cache, 10000, version=1), 10000, "medium", None, 0
+        ) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
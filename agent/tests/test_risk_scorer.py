@@ -1,8 +1,16 @@
 """Tests for risk scoring functionality."""
 
+import itertools
 import pytest
 from src.models.yield_opportunity import YieldOpportunity, RiskTier
-from src.data.risk_scorer import RiskScorer, classify_risk_tier, compute_risk_distribution
+from src.data.risk_scorer import (
+    RiskScorer,
+    RiskDistributionAccumulator,
+    classify_risk_tier,
+    compute_risk_distribution,
+    _score_for_key,
+)
+from src.data.opportunity_table import TIER_ORDER
 
 
 class TestRiskScorer:
@@ -163,5 +171,130 @@ class TestRiskScorer:
         assert stable_score > non_stable_score, "Stablecoin should have better risk score"
 
 
+class TestBatchRiskScorer:
+    """Test cases for vectorized batch scoring."""
+    
+    @staticmethod
+    def _grid_pools():
+        """Pools covering every branch of the scalar rules, None values included."""
+        pools = []
+        for i, (apy, mean, pct, cls, prob, il, exposure, stable) in enumerate(itertools.product(
+            [None, 0.0, 7.9, 8.0, 12.0, 20.0, 55.0],
+            [None, 7.0],
+            [None, 0.0, -1.0, 2.5, 6.0],
+            [None, "Stable/Up", "Down", "other"],
+            [None, 10, 20, 35, 50, 70, 85],
+            [None, "yes", "NO"],
+            [None, "multi", "single"],
+            [None, True, False],
+        )):
+            if i % 7:
+                continue
+            pools.append(YieldOpportunity(
+                chain="Ethereum", project="p", symbol="S", apy=apy,
+                apyMean30d=mean, apyPct7D=pct, predictedClass=cls,
+                predictedProbability=prob, ilRisk=il, exposure=exposure,
+                stablecoin=stable
+            ))
+        return pools
+    
+    def test_batch_matches_scalar(self):
+        """Test score_opportunities reproduces calculate_risk_score and tiers."""
+        pools = self._grid_pools()
+        
+        scores, tiers = RiskScorer.score_opportunities(pools)
+        
+        assert scores.tolist() == [RiskScorer.calculate_risk_score(p) for p in pools]
+        assert [TIER_ORDER[t] for t in tiers] == [classify_risk_tier(p) for p in pools]
+    
+    def test_records_match_models(self):
+        """Test raw records score like the models built from them."""
+        records = [
+            {"chain": "Ethereum", "project": "p", "symbol": "S", "apy": 15.0,
+             "apyMean30d": 9.0, "predictedClass": "Stable/Up", "predictedProbability": 90,
+             "ilRisk": "no", "stablecoin": True},
+            {"chain": "Ethereum", "project": "p", "symbol": "S", "apy": None,
+             "apyPct7D": -6.0, "ilRisk": "YES", "exposure": "Multi"},
+        ]
+        
+        scores, _ = RiskScorer.score_records(records)
+        expected = [
+            RiskScorer.calculate_risk_score(YieldOpportunity(**r)) for r in records
+        ]
+        
+        assert scores.tolist() == expected
+    
+    def test_apply_scores_sets_fields(self):
+        """Test apply_scores writes score and tier onto each pool."""
+        pools = self._grid_pools()[:20]
+        
+        RiskScorer.apply_scores(pools)
+        
+        for pool in pools:
+            assert pool.risk_score == RiskScorer.calculate_risk_score(pool)
+            assert pool.risk_tier == classify_risk_tier(pool)
+    
+    def test_empty_batch(self):
+        """Test scoring zero pools returns empty arrays."""
+        scores, tiers = RiskScorer.score_opportunities([])
+        
+        assert scores.shape == (0,)
+        assert tiers.shape == (0,)
+
+
+class TestRiskDistributionAccumulator:
+    """Test cases for incremental risk distributions."""
+    
+    def _pools(self):
+        pools = TestBatchRiskScorer._grid_pools()[:200]
+        RiskScorer.apply_scores(pools)
+        return pools
+    
+    def test_matches_full_recount(self):
+        """Test incremental add/remove equals recomputing from scratch."""
+        pools = self._pools()
+        accumulator = RiskDistributionAccumulator(pools)
+        for pool in pools[:50]:
+            accumulator.remove(pool)
+        
+        expected = compute_risk_distribution(pools[50:])
+        
+        assert accumulator.to_distribution() == expected
+        assert accumulator.total == 150
+    
+    def test_reuses_stored_tiers(self, monkeypatch):
+        """Test scored pools are not rescored when computing a distribution."""
+        pools = self._pools()
+        
+        def fail(pool):
+            raise AssertionError("pool was rescored")
+        
+        monkeypatch.setattr(RiskScorer, "calculate_risk_score", staticmethod(fail))
+        
+        assert compute_risk_distribution(pools).total == len(pools)
+    
+    def test_empty_and_remove_errors(self):
+        """Test empty accumulator grade and over-removal."""
+        accumulator = RiskDistributionAccumulator()
+        
+        assert accumulator.grade == "N/A"
+        assert accumulator.to_distribution() == compute_risk_distribution([])
+        with pytest.raises(ValueError):
+            accumulator.remove_tier(RiskTier.A)
+    
+    def test_scoring_is_memoized(self):
+        """Test identical scoring inputs hit the score memo."""
+        pool = YieldOpportunity(
+            chain="Stellar", project="memo-test", symbol="XLM",
+            apy=13.37, apyPct7D=0.42, ilRisk="yes"
+        )
+        RiskScorer.calculate_risk_score(pool)
+        hits = _score_for_key.cache_info().hits
+        
+        RiskScorer.calculate_risk_score(pool.model_copy())
+        
+        assert _score_for_key.cache_info().hits == hits + 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,167 @@
+"""Tests for the FastAPI server."""
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from src.agent.recommendation_engine import RecommendationEngine
+from src.api import server
+from src.api.server import app, run_until_disconnect
+from src.data.snapshot import OpportunitySnapshot
+from tests.conftest import make_opportunity
+
+OPPORTUNITIES = [
+    make_opportunity("usdc", "aave-v3", 5.0),
+    make_opportunity("dai", "spark", 6.0),
+]
+
+
+class FakeRequest:
+    """Request stand-in whose client disconnects after a number of checks."""
+
+    def __init__(self, connected_checks: int):
+        self.connected_checks = connected_checks
+        self.checks = 0
+
+    async def is_disconnected(self) -> bool:
+        self.checks += 1
+        return self.checks > self.connected_checks
+
+
+class HangingModel:
+    """generate_content_async stand-in that never answers."""
+
+    def __init__(self):
+        self.cancelled = asyncio.Event()
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+class TestRunUntilDisconnect:
+    """Test cases for run_until_disconnect."""
+
+    async def test_returns_result_while_connected(self):
+        """Test finished work is returned to a connected client."""
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        request = FakeRequest(connected_checks=100)
+
+        assert await run_until_disconnect(request, work(), poll_interval=0.005) == "done"
+
+    async def test_disconnect_gives_499_and_cancels_work(self):
+        """Test a client going away answers 499 and cancels the task doing its work."""
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        request = FakeRequest(connected_checks=2)
+
+        with pytest.raises(HTTPException) as raised:
+            await run_until_disconnect(request, work(), poll_interval=0.005)
+
+        assert raised.value.status_code == 499
+        assert request.checks == 3
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    @pytest.mark.parametrize("mode", ["ai", "local"])
+    async def test_disconnect_cancels_unshared_gemini_call(self, mode):
+        """Test the only caller disconnecting cancels its Gemini call, even when coalesced."""
+        engine = RecommendationEngine(gemini_api_key="test-key", narrative_timeout_seconds=30)
+
+        async def build(version):
+            return OpportunitySnapshot.build(version, {"defillama": OPPORTUNITIES})
+
+        engine.snapshots._build = build
+        engine.gemini.model = HangingModel()
+        request = FakeRequest(connected_checks=3)
+
+        with pytest.raises(HTTPException) as raised:
+            await run_until_disconnect(
+                request,
+                engine.recommend(amount_usd=1000, risk_tolerance="low", mode=mode),
+                poll_interval=0.01
+            )
+
+        assert raised.value.status_code == 499
+        await asyncio.wait_for(engine.gemini.model.cancelled.wait(), timeout=1)
+        await asyncio.sleep(0.01)
+        assert len(engine._inflight) == 0
+        await engine.close()
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Engines created by the app's lifespan, serving a fixed snapshot."""
+    created = []
+
+    class RecordingEngine(RecommendationEngine):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.closed = False
+            self.served = 0
+
+            async def build(version):
+                return OpportunitySnapshot.build(version, {"defillama": OPPORTUNITIES})
+
+            self.snapshots._build = build
+            created.append(self)
+
+        async def recommend(self, **kwargs):
+            self.served += 1
+            return await super().recommend(**kwargs)
+
+        async def close(self):
+            self.closed = True
+            await super().close()
+
+    monkeypatch.setattr(server, "RecommendationEngine", RecordingEngine)
+    return created
+
+
+class TestLifespan:
+    """Test cases for the app lifespan and get_engine."""
+
+    def test_one_engine_is_shared_and_closed(self, engines, monkeypatch):
+        """Test startup creates one engine, every request uses it and shutdown closes it."""
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        body = {"amount_usd": 1000, "risk_tolerance": "low", "mode": "numbers"}
+
+        with TestClient(app) as client:
+            assert len(engines) == 1
+            assert app.state.engine is engines[0]
+            responses = [client.post("/api/recommendations", json=body) for _ in range(3)]
+            assert not engines[0].closed
+
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert responses[0].json()["recommendation"]["total_allocated_usd"] == pytest.approx(1000)
+        assert len(engines) == 1
+        assert engines[0].served == 3
+        assert engines[0].closed
+
+    def test_missing_api_key_gives_503(self, engines, monkeypatch):
+        """Test the app still starts without GEMINI_API_KEY but recommendations are 503."""
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+
+        with TestClient(app) as client:
+            health = client.get("/health")
+            response = client.post("/api/recommendations", json={"amount_usd": 1000})
+
+        assert engines == []
+        assert health.status_code == 200
+        assert response.status_code == 503
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
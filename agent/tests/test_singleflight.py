@@ -0,0 +1,115 @@
+"""Tests for in-flight call coalescing."""
+
+import asyncio
+import pytest
+from src.utils.cache import SimpleCache
+from src.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test cases for SingleFlight."""
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test identical concurrent calls run the work once."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"value": 42}
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(20)))
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert flight.coalesced == 19
+        assert len(flight) == 0
+
+    async def test_exceptions_are_shared_and_key_released(self):
+        """Test waiters all see the failure and the next call retries."""
+        flight = SingleFlight()
+        attempts = 0
+
+        async def failing():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("key", failing) for _ in range(3)),
+            return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert attempts == 1
+
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+        assert attempts == 2
+
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        """Test one waiter going away leaves the shared call running."""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("key", work))
+        follower = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "done"
+
+    async def test_last_waiter_cancelled_cancels_the_call(self):
+        """Test the shared call is cancelled once nobody is waiting for it."""
+        flight = SingleFlight()
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await started.wait()
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+
+        waiters[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert len(flight) == 0
+
+
+class TestCachedDecorator:
+    """Test cases for SimpleCache.cached stampede protection."""
+
+    async def test_concurrent_misses_call_function_once(self):
+        """Test a burst of misses results in one underlying call."""
+        cache = SimpleCache(default_ttl=60)
+        calls = 0
+
+        @cache.cached()
+        async def expensive(x):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return x * 2
+
+        results = await asyncio.gather(*(expensive(21) for _ in range(10)))
+
+        assert results == [42] * 10
+        assert calls == 1
+        assert await expensive(21) == 42
+        assert calls == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,95 @@
+"""Tests for opportunity snapshots and background refresh."""
+
+import asyncio
+import pytest
+from src.data.snapshot import OpportunitySnapshot, SnapshotRefresher
+from tests.conftest import make_opportunity
+
+
+class TestOpportunitySnapshot:
+    """Test cases for OpportunitySnapshot."""
+
+    def test_select_by_chain_and_source(self):
+        """Test chain and source selection on a snapshot."""
+        snapshot = OpportunitySnapshot.build(
+            version=1,
+            by_source={
+                "defillama": [make_opportunity("a"), make_opportunity("b", chain="Stellar")],
+                "stellar_dex": [make_opportunity("c", chain="Stellar")],
+            }
+        )
+
+        assert len(snapshot) == 3
+        assert [o.pool for o in snapshot.select(chains=["stellar"])] == ["b", "c"]
+        assert [o.pool for o in snapshot.select(sources=["defillama"])] == ["a", "b"]
+
+    def test_id_index_lookup(self):
+        """Test single and batch lookups by pool id."""
+        a, b = make_opportunity("a"), make_opportunity("b")
+        c = make_opportunity("c", chain="Stellar")
+        snapshot = OpportunitySnapshot.build(
+            version=1, by_source={"defillama": [a, b], "stellar_dex": [c]}
+        )
+
+        assert snapshot.get("c") is c
+        assert snapshot.get("missing") is None
+        assert snapshot.get_many(["b", "missing", "a"]) == {"b": b, "missing": None, "a": a}
+
+    def test_snapshot_is_read_only(self):
+        """Test that snapshot fields cannot be reassigned."""
+        snapshot = OpportunitySnapshot.build(version=1, by_source={"defillama": []})
+
+        with pytest.raises(Exception):
+            snapshot.version = 2
+        with pytest.raises(TypeError):
+            snapshot.by_source["other"] = ()
+
+
+class TestSnapshotRefresher:
+    """Test cases for SnapshotRefresher."""
+
+    async def test_stale_read_returns_current_and_refreshes_in_background(self):
+        """Test stale-while-revalidate semantics."""
+        release = asyncio.Event()
+        builds = []
+
+        async def build(version: int) -> OpportunitySnapshot:
+            builds.append(version)
+            if version > 1:
+                await release.wait()
+            return OpportunitySnapshot.build(
+                version=version, by_source={"defillama": [make_opportunity(str(version))]}
+            )
+
+        refresher = SnapshotRefresher(build, interval_seconds=0)
+
+        first = await refresher.get()
+        assert first.version == 1
+
+        # Snapshot is immediately stale; the read must not wait for the rebuild
+        stale = await refresher.get()
+        assert stale is first
+        await asyncio.sleep(0)
+        assert builds == [1, 2]
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert refresher.current.version == 2
+        await refresher.stop()
+
+    async def test_empty_refresh_keeps_previous_snapshot(self):
+        """Test that an empty rebuild does not replace good data."""
+        async def build(version: int) -> OpportunitySnapshot:
+            pools = [make_opportunity("a")] if version == 1 else []
+            return OpportunitySnapshot.build(version=version, by_source={"defillama": pools})
+
+        refresher = SnapshotRefresher(build, interval_seconds=300)
+        first = await refresher.refresh()
+        second = await refresher.refresh()
+
+        assert second is first
+        assert refresher.current.version == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])